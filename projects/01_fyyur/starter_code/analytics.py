@@ -0,0 +1,316 @@
+#----------------------------------------------------------------------------#
+# Booking analytics rollups.
+#
+# Three tables hold show counts so that stats pages never aggregate Show:
+#
+#   VenueDayStats        shows per venue per day (and the venue's city)
+#   CityMonthStats       shows per city per month
+#   GenreCityMonthStats  shows per venue genre per city per month
+#
+# Cities are rolled up by month: most hold a few venues, so city days would
+# be nearly as many rows as venue days.
+#
+# Writes to Show queue the venue days they touch in AnalyticsChange, in the
+# writer's transaction:
+#
+#   record_shows()   after inserting shows
+#   forget_shows()   before deleting the shows matching a condition
+#   touch_venues()   after a venue moved city or changed genres
+#
+# refresh() (flask analytics-refresh, run periodically) claims the queued
+# changes, recomputes those venue days from Show, then the city months they
+# were or are now in from VenueDayStats, all set-based; nothing else is
+# read. rebuild() recomputes everything, after bulk loads.
+#----------------------------------------------------------------------------#
+
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import Date
+from sqlalchemy.sql import and_, cast, func, literal, select, tuple_, union
+
+from models import db, Venue, Show, Genre, venue_genre, \
+  VenueDayStats, CityMonthStats, GenreCityMonthStats, AnalyticsChange
+
+PERIODS = ('day', 'week', 'month')
+DEFAULT_PAST_DAYS = 365
+DEFAULT_FUTURE_DAYS = 365
+MAX_DAYS = 3 * 366
+CITIES_LIMIT = 20
+MAX_CITIES = 100
+
+
+def show_day(column=Show.start_date):
+  # The calendar day of a show start, as stored in the Date columns.
+  return func.date(column)
+
+
+def month_start(column):
+  # First day of the month of a date or timestamp column.
+  if db.session.bind.dialect.name == 'postgresql':
+    return cast(func.date_trunc('month', column), Date)
+  return func.date(column, 'start of month')
+
+
+#  Change queue
+#  ----------------------------------------------------------------
+
+def record_shows(shows):
+  # Queues the days of new shows, given as (venue_id, start_date) tuples.
+  days = {(venue_id, start_date.date()) for venue_id, start_date in shows if venue_id is not None}
+  if days:
+    db.session.execute(AnalyticsChange.__table__.insert(), [
+      {'venue_id': venue_id, 'day': day} for venue_id, day in days
+    ])
+
+
+def forget_shows(condition):
+  # Queues the days of the shows matching `condition`, before they are
+  # deleted.
+  db.session.execute(
+    AnalyticsChange.__table__.insert().from_select(
+      ['venue_id', 'day'],
+      select([Show.venue_id, show_day()]).where(and_(condition, Show.venue_id.isnot(None))).distinct()
+    )
+  )
+
+
+def touch_venues(ids):
+  # Queues every day of these venues, whose city or genres changed.
+  db.session.execute(
+    AnalyticsChange.__table__.insert().from_select(
+      ['venue_id', 'day'],
+      select([VenueDayStats.venue_id, VenueDayStats.day]).where(VenueDayStats.venue_id.in_(ids))
+    )
+  )
+
+
+#  Refresh
+#  ----------------------------------------------------------------
+
+def refresh():
+  # Applies the changes queued up to now. Returns the number processed;
+  # changes committed meanwhile wait for the next run.
+  batch = uuid.uuid4().hex
+  changes = AnalyticsChange.__table__
+  claimed = db.session.execute(
+    changes.update().where(changes.c.batch.is_(None)).values(batch=batch)
+  ).rowcount
+  if not claimed:
+    db.session.commit()
+    return 0
+
+  venue_days = select([changes.c.venue_id, changes.c.day]) \
+    .where(and_(changes.c.batch == batch, changes.c.venue_id.isnot(None)))
+  city_months = select([changes.c.state, changes.c.city, changes.c.day]) \
+    .where(and_(changes.c.batch == batch, changes.c.venue_id.is_(None)))
+  venue_key = tuple_(VenueDayStats.venue_id, VenueDayStats.day)
+
+  try:
+    # The city months to recompute: where the changed venue days were
+    # counted, and where their venues are now.
+    queued = venue_days.alias('queued')
+    db.session.execute(
+      changes.insert().from_select(['state', 'city', 'day', 'batch'], union(
+        select([VenueDayStats.state, VenueDayStats.city, VenueDayStats.month, literal(batch)])
+          .where(venue_key.in_(venue_days)),
+        select([Venue.state, Venue.city, month_start(queued.c.day), literal(batch)])
+          .select_from(queued.join(Venue, Venue.id == queued.c.venue_id)),
+      ))
+    )
+
+    db.session.execute(VenueDayStats.__table__.delete().where(venue_key.in_(venue_days)))
+    insert_venue_days(and_(
+      Show.venue_id.in_(select([queued.c.venue_id])),
+      tuple_(Show.venue_id, show_day()).in_(venue_days),
+    ))
+
+    for model in (CityMonthStats, GenreCityMonthStats):
+      db.session.execute(
+        model.__table__.delete().where(tuple_(model.state, model.city, model.month).in_(city_months))
+      )
+    insert_city_months(tuple_(VenueDayStats.state, VenueDayStats.city, VenueDayStats.month).in_(city_months))
+
+    db.session.execute(changes.delete().where(changes.c.batch == batch))
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+  return claimed
+
+
+def rebuild():
+  # Recomputes every rollup from Show and empties the queue.
+  try:
+    for model in (AnalyticsChange, GenreCityMonthStats, CityMonthStats, VenueDayStats):
+      db.session.execute(model.__table__.delete())
+    insert_venue_days(Show.venue_id.isnot(None))
+    insert_city_months(None)
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+  return db.session.query(func.count()).select_from(VenueDayStats).scalar()
+
+
+def insert_venue_days(condition):
+  day = show_day()
+  month = month_start(Show.start_date)
+  db.session.execute(
+    VenueDayStats.__table__.insert().from_select(
+      ['venue_id', 'day', 'month', 'city', 'state', 'shows'],
+      select([Show.venue_id, day, month, Venue.city, Venue.state, func.count(Show.id)])
+        .select_from(Show.__table__.join(Venue, Venue.id == Show.venue_id))
+        .where(condition)
+        .group_by(Show.venue_id, day, month, Venue.city, Venue.state)
+    )
+  )
+
+
+def insert_city_months(condition):
+  # CityMonthStats and GenreCityMonthStats of the city months matching
+  # `condition` on VenueDayStats (all when None).
+  stats = VenueDayStats.__table__
+  city_month = (stats.c.state, stats.c.city, stats.c.month)
+  query = select(city_month + (func.sum(stats.c.shows),)).group_by(*city_month)
+  by_genre = select((venue_genre.c.genre_id,) + city_month + (func.sum(stats.c.shows),)) \
+    .select_from(stats.join(venue_genre, venue_genre.c.venue_id == stats.c.venue_id)) \
+    .group_by(venue_genre.c.genre_id, *city_month)
+  if condition is not None:
+    query = query.where(condition)
+    by_genre = by_genre.where(condition)
+  db.session.execute(
+    CityMonthStats.__table__.insert().from_select(['state', 'city', 'month', 'shows'], query)
+  )
+  db.session.execute(
+    GenreCityMonthStats.__table__.insert().from_select(['genre_id', 'state', 'city', 'month', 'shows'], by_genre)
+  )
+
+
+#  Reading
+#  ----------------------------------------------------------------
+
+def parse_day(value, default):
+  if not value:
+    return default
+  try:
+    return date(*(int(part) for part in value.split('-')))
+  except (TypeError, ValueError):
+    raise ValueError('dates must be YYYY-MM-DD')
+
+
+def date_range(args, today=None):
+  # (first day, last day) from the `from` and `to` arguments. Raises
+  # ValueError when invalid.
+  today = today or date.today()
+  start = parse_day(args.get('from'), today - timedelta(days=DEFAULT_PAST_DAYS))
+  end = parse_day(args.get('to'), today + timedelta(days=DEFAULT_FUTURE_DAYS))
+  if end < start:
+    raise ValueError('to is before from')
+  if (end - start).days >= MAX_DAYS:
+    raise ValueError('at most {} days'.format(MAX_DAYS))
+  return start, end
+
+
+def bucket_start(day, period):
+  if period == 'week':
+    return day - timedelta(days=day.weekday())
+  if period == 'month':
+    return day.replace(day=1)
+  return day
+
+
+def next_bucket(start, period):
+  if period == 'week':
+    return start + timedelta(days=7)
+  if period == 'month':
+    return (start + timedelta(days=32)).replace(day=1)
+  return start + timedelta(days=1)
+
+
+def venue_stats(venue_id, args, today=None):
+  # Shows of the venue per day, week (from Monday) or month between two
+  # days, empty buckets included. None when the venue does not exist.
+  period = args.get('period', 'month')
+  if period not in PERIODS:
+    raise ValueError('period must be one of {}'.format(', '.join(PERIODS)))
+  start, end = date_range(args, today)
+  rows = db.session.query(VenueDayStats.day, VenueDayStats.shows, Venue.id) \
+    .select_from(Venue) \
+    .outerjoin(VenueDayStats, and_(
+      VenueDayStats.venue_id == Venue.id,
+      VenueDayStats.day.between(start, end),
+    )) \
+    .filter(Venue.id == venue_id) \
+    .all()
+  if not rows:
+    return None
+
+  counts = {}
+  for day, shows, _ in rows:
+    if day is not None:
+      key = bucket_start(day, period)
+      counts[key] = counts.get(key, 0) + shows
+  buckets = []
+  current = bucket_start(start, period)
+  while current <= end:
+    buckets.append({'start': current.isoformat(), 'shows': counts.get(current, 0)})
+    current = next_bucket(current, period)
+  return {
+    'venue_id': venue_id,
+    'period': period,
+    'from': start.isoformat(),
+    'to': end.isoformat(),
+    'total': sum(counts.values()),
+    'buckets': buckets,
+  }
+
+
+def city_stats(args, today=None):
+  # The cities with the most shows in the months between two days, with
+  # their shows per venue genre; only venues of `genre` when given.
+  start, end = date_range(args, today)
+  first, last = bucket_start(start, 'month'), bucket_start(end, 'month')
+  try:
+    limit = int(args.get('limit', CITIES_LIMIT))
+  except ValueError:
+    raise ValueError('limit must be a number')
+  if not 0 < limit <= MAX_CITIES:
+    raise ValueError('limit must be between 1 and {}'.format(MAX_CITIES))
+
+  genre = args.get('genre')
+  stats = GenreCityMonthStats if genre else CityMonthStats
+  total = func.sum(stats.shows)
+  top = db.session.query(stats.state, stats.city, total).filter(stats.month.between(first, last))
+  if genre:
+    top = top.join(Genre, Genre.id == stats.genre_id).filter(Genre.name == genre)
+  top = top.group_by(stats.state, stats.city) \
+    .order_by(total.desc(), stats.state, stats.city) \
+    .limit(limit) \
+    .all()
+
+  breakdown = {(state, city): {} for state, city, _ in top}
+  if genre:
+    for state, city, shows in top:
+      breakdown[(state, city)][genre] = shows
+  elif top:
+    rows = db.session.query(GenreCityMonthStats.state, GenreCityMonthStats.city, Genre.name,
+                            func.sum(GenreCityMonthStats.shows)) \
+      .join(Genre, Genre.id == GenreCityMonthStats.genre_id) \
+      .filter(
+        tuple_(GenreCityMonthStats.state, GenreCityMonthStats.city).in_(list(breakdown)),
+        GenreCityMonthStats.month.between(first, last),
+      ) \
+      .group_by(GenreCityMonthStats.state, GenreCityMonthStats.city, Genre.name)
+    for state, city, name, shows in rows:
+      breakdown[(state, city)][name] = shows
+
+  return {
+    'from': first.isoformat(),
+    'to': (next_bucket(last, 'month') - timedelta(days=1)).isoformat(),
+    'genre': genre or None,
+    'cities': [
+      {'city': city, 'state': state, 'shows': shows, 'genres': breakdown[(state, city)]}
+      for state, city, shows in top
+    ],
+  }
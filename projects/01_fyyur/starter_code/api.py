@@ -0,0 +1,217 @@
+#----------------------------------------------------------------------------#
+# JSON API, mounted at /api/v1.
+#
+# Built on the same query layer as the HTML views. Collections are streamed
+# as NDJSON (one object per line) in keyset batches, so memory stays flat
+# however large they are. Every response carries an ETag made of the
+# collection versions it depends on (versions.py); a matching If-None-Match
+# costs a single primary key lookup and returns 304. Query budgets of the
+# streamed collections only cover the statements run before streaming.
+#
+# Past and upcoming shows are split at the counters watermark rather than
+# the current time, so that responses only change when data is written or
+# counters.roll_over() moves shows to the past.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, request, stream_with_context, abort, jsonify
+
+import bookings
+import counters
+import geo
+import queries
+import versions
+from instrumentation import query_budget
+from models import db, Venue, Artist, Show
+
+STREAM_CHUNK_SIZE = 500
+MAX_SLOT_DAYS = 366
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def to_json(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def dumps(data):
+  return json.dumps(data, default=to_json, separators=(',', ':'))
+
+
+def as_of():
+  state = counters.watermark()
+  return state.rolled_at if state is not None else datetime.now()
+
+
+def conditional(etag, build):
+  # 304 when the client already has `etag`, otherwise the response from
+  # build(), tagged.
+  if etag in request.if_none_match:
+    response = Response(status=304)
+  else:
+    response = build()
+  response.set_etag(etag)
+  return response
+
+
+def ndjson(rows):
+  def generate():
+    lines = []
+    for row in rows:
+      lines.append(dumps(row))
+      if len(lines) == STREAM_CHUNK_SIZE:
+        yield '\n'.join(lines) + '\n'
+        lines = []
+    if lines:
+      yield '\n'.join(lines) + '\n'
+  return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def document(data):
+  return Response(dumps(data), mimetype='application/json')
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+  return jsonify({'error': error.code, 'message': error.description}), error.code
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+@query_budget(1)
+def venues():
+  return conditional(
+    versions.etag(versions.VENUES),
+    lambda: ndjson(queries.iter_venues()),
+  )
+
+
+@api.route('/venues/nearby')
+@query_budget(2)
+def venues_nearby():
+  # Same arguments as /venues/nearby.
+  def build():
+    try:
+      results = geo.search(request.args)
+    except ValueError as error:
+      abort(400, str(error))
+    if results is None:
+      abort(400, 'give bbox, lat and lon, or city and state')
+    return document(results)
+  arguments = hashlib.sha1(request.query_string).hexdigest()[:16]
+  return conditional(versions.etag('nearby', arguments, versions.VENUES), build)
+
+
+@api.route('/venues/<int:venue_id>')
+@query_budget(5)
+def venue(venue_id):
+  def build():
+    data = queries.venue_detail(venue_id, now=as_of())
+    if data is None:
+      abort(404)
+    return document(data)
+  return conditional(
+    versions.etag('venue', venue_id, versions.VENUES, versions.ARTISTS, versions.SHOWS),
+    build,
+  )
+
+
+@api.route('/venues/<int:venue_id>/free-slots')
+@query_budget(3)
+def venue_free_slots(venue_id):
+  return free_slots(Venue, Show.venue_id, venue_id)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+@query_budget(1)
+def artists():
+  return conditional(
+    versions.etag(versions.ARTISTS),
+    lambda: ndjson(queries.iter_artists()),
+  )
+
+
+@api.route('/artists/<int:artist_id>')
+@query_budget(5)
+def artist(artist_id):
+  def build():
+    data = queries.artist_detail(artist_id, now=as_of())
+    if data is None:
+      abort(404)
+    return document(data)
+  return conditional(
+    versions.etag('artist', artist_id, versions.VENUES, versions.ARTISTS, versions.SHOWS),
+    build,
+  )
+
+
+@api.route('/artists/<int:artist_id>/free-slots')
+@query_budget(3)
+def artist_free_slots(artist_id):
+  return free_slots(Artist, Show.artist_id, artist_id)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def slot_period():
+  # ?start=YYYY-MM-DD&end=YYYY-MM-DD, next calendar month by default.
+  today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+  next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+  try:
+    start = parse_day(request.args.get('start')) or next_month
+    end = parse_day(request.args.get('end')) or (start + timedelta(days=32)).replace(day=1)
+  except ValueError:
+    abort(400, 'start and end must be YYYY-MM-DD dates')
+  if not start < end <= start + timedelta(days=MAX_SLOT_DAYS):
+    abort(400, 'end must be after start, at most {} days later'.format(MAX_SLOT_DAYS))
+  return start, end
+
+
+def parse_day(value):
+  return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+def free_slots(model, column, entity_id):
+  # Start time ranges at which a show of bookings.SHOW_LENGTH can still be
+  # booked for the venue or artist, between start and end.
+  start, end = slot_period()
+
+  def build():
+    if db.session.query(model.id).filter(model.id == entity_id).scalar() is None:
+      abort(404)
+    slots = bookings.free_slots(column, [entity_id], start, end)[entity_id]
+    return document({
+      "id": entity_id,
+      "start": start,
+      "end": end,
+      "show_length_minutes": int(bookings.SHOW_LENGTH.total_seconds() // 60),
+      "free_slots": [{"first": first, "last": last} for first, last in slots],
+    })
+  return conditional(
+    versions.etag('slots', model.__tablename__, entity_id, start.date(), end.date(), versions.SHOWS),
+    build,
+  )
+
+
+@api.route('/shows')
+@query_budget(2)
+def shows():
+  when = request.args.get('when', 'all')
+  if when not in queries.SHOW_FILTERS:
+    abort(400, 'unknown show filter: {}'.format(when))
+  return conditional(
+    versions.etag('feed', when, versions.VENUES, versions.ARTISTS, versions.SHOWS),
+    lambda: ndjson(queries.iter_shows(when, now=as_of())),
+  )
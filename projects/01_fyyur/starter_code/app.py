@@ -3,18 +3,34 @@
 #----------------------------------------------------------------------------#
 
 import json
+import time
 import dateutil.parser
-import babel
-import sys
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort
+from flask import Flask, render_template, request, flash, redirect, url_for, abort, jsonify
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.sql import func, case
-import logging
-from logging import Formatter, FileHandler
-from flask_wtf import Form
+import click
 from forms import *
 from flask_migrate import Migrate
+from models import setup_db, db, Venue, Artist, Show
+from genre_registry import resolve_genres
+import queries
+import fulltext
+import counters
+import versions
+import importer
+import listings
+import seeder
+import bookings
+import geo
+import analytics
+import assets
+from datetimes import format_datetime, format_datetimes
+from cache import setup_cache, page_cache, venues_key, artists_key, venue_key, artist_key
+from api import api
+from instrumentation import setup_instrumentation, query_budget
+from logs import setup_logging
+from templating import setup_templates
+from assets import setup_assets
+from config import get_config
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -22,99 +38,24 @@ from flask_migrate import Migrate
 
 app = Flask(__name__)
 moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
+app.config.from_object(get_config())
+setup_logging(app)
+setup_db(app)
+setup_cache(app)
+setup_instrumentation(app)
+setup_assets(app)
 migrate = Migrate(app, db)
-logging.basicConfig(level=logging.DEBUG)
+app.register_blueprint(api)
 
 # TODO: connect to a local postgresql database
 
-#----------------------------------------------------------------------------#
-# Models.
-#----------------------------------------------------------------------------#
-
-
-
-artist_genre = db.Table('artist_genre',
-  db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'), primary_key=True),
-  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True)
-)
-
-venue_genre = db.Table('venue_genre',
-  db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'), primary_key=True),
-  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True)
-)
-
-class Show(db.Model):
-    __tablename__ = 'Show'
-  
-    id = db.Column('id', db.Integer, primary_key=True)
-    venue_id = db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'))
-    start_date = db.Column('date', db.DateTime(), nullable=False)
-    artist_id = db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'))
-
-
-
-class Venue(db.Model):
-    __tablename__ = 'Venue'
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    address = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120))
-    website = db.Column(db.String(500))
-    image_link = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120))
-    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
-    seeking_description = db.Column(db.String(1000))
-    genres = db.relationship('Genre', secondary=venue_genre, backref=db.backref('Venue', lazy=True))
-    shows = db.relationship('Show', backref='Venue', lazy=True)
-
-
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
-
-class Artist(db.Model):
-    __tablename__ = 'Artist'
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(), nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120))
-    website = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120))
-    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
-    seeking_description = db.Column(db.String(1000))
-    image_link = db.Column(db.String(500))
-    genres = db.relationship('Genre', secondary=artist_genre, backref=db.backref('Artist', lazy=True))
-    shows = db.relationship('Show', backref='Artist', lazy=True)
-
-
-    
-
-class Genre(db.Model):
-  __tablename__ = 'Genre'
-
-  id = db.Column(db.Integer, primary_key=True)
-  name = db.Column(db.String(), nullable=False)
-
-
-
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
-
 app.jinja_env.filters['datetime'] = format_datetime
+app.jinja_env.filters['datetimes'] = format_datetimes
+setup_templates(app)
 
 #----------------------------------------------------------------------------#
 # Controllers.
@@ -129,139 +70,53 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@query_budget(1)
+@page_cache.cached(venues_key)
 def venues():
-  # TODO: replace with real venues data.
-  #       num_shows should be aggregated based on number of upcoming shows per venue.
-  
-
-  venue_data = []
-  alt_data = []
-  condition = case(
-    [
-      (Show.start_date >= func.now(), 1)
-    ], else_ = None
-  )
+  areas = queries.venue_areas()
+  return render_template('pages/venues.html', areas=areas)
 
-  list_states = db.session.query(Venue.state).distinct().order_by(Venue.state).all()
-  for state in list_states:
-    list_cities = db.session.query(Venue.city).distinct().filter(Venue.state == state.state).order_by(Venue.city).all()
-    for city in list_cities:
-      list_venues = db.session.query(Venue, func.count(condition)).join(Show, isouter=True).filter(Venue.city == city.city).group_by(Venue.id).order_by(func.count(condition)).all()
-      for ven in list_venues:
-        venue_data.append(
-          {
-            "id": ven.Venue.id,
-            "name": ven.Venue.name,
-            "num_upcoming_shows": ven[1],            
-          }
-        )
-      alt_data.append(
-        {
-          "city": city.city,
-          "state": state.state,
-          "venues": venue_data
-        }
-      )
-      venue_data = []
-
-
-  return render_template('pages/venues.html', areas=alt_data)
+@app.route('/venues/nearby')
+@query_budget(1)
+def venues_nearby():
+  # venues within radius_km of a city or point, or inside a bbox
+  try:
+    results = geo.search(request.args)
+  except ValueError as error:
+    return render_template('pages/venues_nearby.html', results=None, error=str(error), args=request.args), 400
+  return render_template('pages/venues_nearby.html', results=results, error=None, args=request.args)
 
 @app.route('/venues/search', methods=['POST'])
+@query_budget(3)
 def search_venues():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for Hop should return "The Musical Hop".
-  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-  
-
-  condition = case(
-    [
-      (Show.start_date >= func.now(), 1)
-    ], else_ = None
+  results = fulltext.search_results(
+    Venue,
+    request.form.get('search_term', ''),
+    page=request.form.get('page', 1, type=int),
   )
-
-  search = request.form['search_term']
-  search_tag = "%{}%".format(search)
-  query = db.session.query(Venue).filter(func.upper(Venue.name).like(func.upper(search_tag))).all()
-  alt_response = []
-  for result in query:
-    alt_response.append(
-      {
-        "id": result.id,
-        "name": result.name,
-        "num_upcoming_shows": len(db.session.query(func.count(condition)).filter(result.id == Show.venue_id).group_by(Show.venue_id).all())
-      }
-    )
-  final_response = {
-    "count": len(query),
-    "data": alt_response,
-  }
-  return render_template('pages/search_venues.html', results=final_response, search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_venues.html', results=results, search_term=request.form.get('search_term', ''))
 
 @app.route('/venues/<int:venue_id>')
+@query_budget(3)
+@page_cache.cached(venue_key)
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-  
-  query = Venue.query.get(venue_id)
-  upcoming_show_count = 0
-  past_show_count = 0
-
-  if query:
-    past_shows = []
-    upcoming_shows = []
-    genres = []
-    upcoming_show_query = db.session.query(Show).filter(Show.start_date >= func.now(), query.id == Show.venue_id).all()
-    past_show_query = db.session.query(Show).filter(Show.start_date < func.now(), query.id == Show.venue_id).all()
-    for show in upcoming_show_query:
-      artist = Artist.query.get(show.artist_id)
-      upcoming_shows.append(
-        {
-          "artist_id": artist.id,
-          "artist_name": artist.name,
-          "artist_image_link": 'https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80',
-          "start_time": str(show.start_date),         
-        }
-      )
-      upcoming_show_count = upcoming_show_count + 1
-    for show in past_show_query:
-      artist = Artist.query.get(show.artist_id)
-      past_shows.append(
-        {
-          "artist_id": artist.id,
-          "artist_name": artist.name,
-          "artist_image_link": 'https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80',
-          "start_time": str(show.start_date),
-        }
-      )
-      past_show_count = past_show_count + 1
-    for genre in query.genres:
-      genres.append(genre.name)
-    data = {
-      "id": query.id,
-      "name": query.name,
-      "genres": genres,
-      "address": query.address,
-      "city": query.city, 
-      "state": query.state,
-      "phone": query.phone,
-      "website": query.website,
-      "facebook_link": query.facebook_link,
-      "seeking_talent": query.seeking_talent,
-      "image_link": 'https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80',
-      "past_shows": past_shows,
-      "upcoming_shows": upcoming_shows,
-      "past_shows_count": past_show_count,
-      "upcoming_shows_count": upcoming_show_count,
-    }
-       
-  else:
+  data = queries.venue_detail(venue_id)
+  if data is None:
     abort(404)
-
-  #data = list(filter(lambda d: d['id'] == venue_id, [data1, data2, data3]))[0]
   return render_template('pages/show_venue.html', venue=data)
 
-  
+@app.route('/venues/<int:venue_id>/stats')
+@query_budget(1)
+def venue_stats(venue_id):
+  # ?period=day|week|month&from=YYYY-MM-DD&to=YYYY-MM-DD, from the rollups
+  try:
+    stats = analytics.venue_stats(venue_id, request.args)
+  except ValueError as error:
+    return jsonify({'success': False, 'error': str(error)}), 400
+  if stats is None:
+    abort(404)
+  return jsonify(stats)
 
 #  Create Venue
 #  ----------------------------------------------------------------
@@ -272,6 +127,7 @@ def create_venue_form():
   return render_template('forms/new_venue.html', form=form)
 
 @app.route('/venues/create', methods=['POST'])
+@query_budget(10)
 def create_venue_submission():
   # TODO: insert form data as a new Venue record in the db, instead
   # TODO: modify data to be the data object returned from db insertion
@@ -283,28 +139,23 @@ def create_venue_submission():
   address = request.form['address']
   genres = request.form.getlist('genres')
   facebook_link = request.form['facebook_link']
-  genre_list = []
 
 
-  #If a selected genre is not in the database, add it
-  #Otherwise just retrieve it and append it to the list
-  for e in genres:
-   temp = Genre(name=e)
-   query = Genre.query.filter(Genre.name == e).first()
-   if not query:
-    db.session.add(temp)
-    genre_list.append(temp)
-   else:
-    genre_list.append(query)
+  #Resolve the selected genres in bulk, adding the ones not in the database
+  genre_list = resolve_genres(genres)
 
 
   venue = Venue(name = name, city = city, state = state, phone = phone, facebook_link = facebook_link, address = address)
   venue.genres = genre_list
+  geo.locate(venue)
   
 
   try:
     db.session.add(venue)
+    versions.bump(versions.VENUES)
     db.session.commit()
+    fulltext.refresh(Venue, [venue.id])
+    page_cache.invalidate(venues_key())
   except:
     error = True
     db.session.rollback()
@@ -323,18 +174,100 @@ def create_venue_submission():
 
 
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+#  Delete and bulk edit
+#  ----------------------------------------------------------------
+
+TRUE_VALUES = ('1', 'true', 'y', 'yes', 'on')
+
+def bulk_payload():
+  # The JSON body of a bulk request, or its form fields.
+  payload = request.get_json(silent=True)
+  if isinstance(payload, dict):
+    return payload
+  form = request.form.to_dict()
+  form['ids'] = request.form.getlist('ids')
+  return form
+
+def delete_response(model, ids, single=False):
+  # Deletes the venues or artists with their shows in one transaction.
+  try:
+    deleted = listings.delete_listings(model, ids)
+  except Exception:
+    app.logger.exception('delete of %s %s failed', model.__tablename__, ids)
+    return jsonify({'success': False, 'error': 'could not delete'}), 500
+  if single and not deleted:
+    abort(404)
+  return jsonify({'success': True, 'deleted': deleted})
+
+def seeking_response(model, flag):
+  # Sets the seeking flag (and description) of many venues or artists.
+  payload = bulk_payload()
+  try:
+    ids = listings.parse_ids(payload.get('ids'))
+    if flag not in payload:
+      raise ValueError('{} is required'.format(flag))
+  except ValueError as error:
+    return jsonify({'success': False, 'error': str(error)}), 400
+  seeking = payload[flag]
+  if isinstance(seeking, str):
+    seeking = seeking.lower() in TRUE_VALUES
+  try:
+    updated = listings.set_seeking(model, ids, seeking, payload.get('seeking_description'))
+  except Exception:
+    app.logger.exception('update of %s %s failed', model.__tablename__, ids)
+    return jsonify({'success': False, 'error': 'could not update'}), 500
+  return jsonify({'success': True, 'updated': updated})
+
+def bulk_ids():
+  return listings.parse_ids(bulk_payload().get('ids'))
+
+@app.route('/venues/<int:venue_id>', methods=['DELETE'])
+@query_budget(10)
 def delete_venue(venue_id):
-  # TODO: Complete this endpoint for taking a venue_id, and using
-  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+  # deletes the venue, its shows and genre links; the caller redirects
+  return delete_response(Venue, [venue_id], single=True)
 
-  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-  # clicking that button delete it from the db then redirect the user to the homepage
-  return None
+@app.route('/venues', methods=['DELETE'])
+@query_budget(10)
+def delete_venues():
+  # {"ids": [...]}: deletes many venues with their shows at once
+  try:
+    ids = bulk_ids()
+  except ValueError as error:
+    return jsonify({'success': False, 'error': str(error)}), 400
+  return delete_response(Venue, ids)
+
+@app.route('/venues', methods=['PATCH'])
+@query_budget(3)
+def update_venues():
+  # {"ids": [...], "seeking_talent": true, "seeking_description": "..."}
+  return seeking_response(Venue, 'seeking_talent')
+
+@app.route('/artists/<int:artist_id>', methods=['DELETE'])
+@query_budget(10)
+def delete_artist(artist_id):
+  return delete_response(Artist, [artist_id], single=True)
+
+@app.route('/artists', methods=['DELETE'])
+@query_budget(10)
+def delete_artists():
+  try:
+    ids = bulk_ids()
+  except ValueError as error:
+    return jsonify({'success': False, 'error': str(error)}), 400
+  return delete_response(Artist, ids)
+
+@app.route('/artists', methods=['PATCH'])
+@query_budget(3)
+def update_artists():
+  # {"ids": [...], "seeking_venue": true, "seeking_description": "..."}
+  return seeking_response(Artist, 'seeking_venue')
 
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@query_budget(1)
+@page_cache.cached(artists_key)
 def artists():
   # TODO: replace with real data returned from querying the database
 
@@ -350,228 +283,88 @@ def artists():
   return render_template('pages/artists.html', artists=artists)
 
 @app.route('/artists/search', methods=['POST'])
+@query_budget(3)
 def search_artists():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-  # search for "band" should return "The Wild Sax Band".
-  response={
-    "count": 1,
-    "data": [{
-      "id": 4,
-      "name": "Guns N Petals",
-      "num_upcoming_shows": 0,
-    }]
-  }
-
-  condition = case(
-    [
-      (Show.start_date >= func.now(), 1)
-    ], else_ = None
+  results = fulltext.search_results(
+    Artist,
+    request.form.get('search_term', ''),
+    page=request.form.get('page', 1, type=int),
   )
-
-  search = request.form['search_term']
-  search_tag = "%{}%".format(search)
-  query = db.session.query(Artist).filter(func.upper(Artist.name).like(func.upper(search_tag))).all()
-  alt_response = []
-  for result in query:
-    alt_response.append(
-      {
-        "id": result.id,
-        "name": result.name,
-        "num_upcoming_shows": len(db.session.query(func.count(condition)).filter(result.id == Show.artist_id).group_by(Show.artist_id).all())
-      }
-    )
-  final_response = {
-    "count": len(query),
-    "data": alt_response,
-  }
-  return render_template('pages/search_artists.html', results=final_response, search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_artists.html', results=results, search_term=request.form.get('search_term', ''))
 
 @app.route('/artists/<int:artist_id>')
+@query_budget(3)
+@page_cache.cached(artist_key)
 def show_artist(artist_id):
-  # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-  data1={
-    "id": 4,
-    "name": "Guns N Petals",
-    "genres": ["Rock n Roll"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "326-123-5000",
-    "website": "https://www.gunsnpetalsband.com",
-    "facebook_link": "https://www.facebook.com/GunsNPetals",
-    "seeking_venue": True,
-    "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
-    "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-    "past_shows": [{
-      "venue_id": 1,
-      "venue_name": "The Musical Hop",
-      "venue_image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-      "start_time": "2019-05-21T21:30:00.000Z"
-    }],
-    "upcoming_shows": [],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 0,
-  }
-  data2={
-    "id": 5,
-    "name": "Matt Quevedo",
-    "genres": ["Jazz"],
-    "city": "New York",
-    "state": "NY",
-    "phone": "300-400-5000",
-    "facebook_link": "https://www.facebook.com/mattquevedo923251523",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-    "past_shows": [{
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2019-06-15T23:00:00.000Z"
-    }],
-    "upcoming_shows": [],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 0,
-  }
-  data3={
-    "id": 6,
-    "name": "The Wild Sax Band",
-    "genres": ["Jazz", "Classical"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "432-325-5432",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "past_shows": [],
-    "upcoming_shows": [{
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2035-04-01T20:00:00.000Z"
-    }, {
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2035-04-08T20:00:00.000Z"
-    }, {
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2035-04-15T20:00:00.000Z"
-    }],
-    "past_shows_count": 0,
-    "upcoming_shows_count": 3,
-  }
-
-  upcoming_show_count = 0
-  past_show_count = 0
-
-  query = Artist.query.get(artist_id)
-  if query:
-    past_shows = []
-    upcoming_shows = []
-    genres = []
-    upcoming_show_query = db.session.query(Show).filter(Show.start_date >= func.now(), query.id == Show.venue_id).all()
-    past_show_query = db.session.query(Show).filter(Show.start_date < func.now(), query.id == Show.venue_id).all()
-    for show in upcoming_show_query:
-      venue = Venue.query.get(show.venue_id)
-      upcoming_shows.append(
-        {
-          "venue_id": venue.id,
-          "venue_name": venue.name,
-          "venue_image_link": 'https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80',
-          "start_time": str(show.start_date),         
-        }
-      )
-      upcoming_show_count = upcoming_show_count + 1
-    for show in past_show_query:
-      venue = Venue.query.get(show.venue_id)
-      past_shows.append(
-        {
-          "venue_id": venue.id,
-          "venue_name": venue.name,
-          "venue_image_link": 'https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80',
-          "start_time": str(show.start_date),         
-        }
-      )
-      past_show_count = past_show_count + 1
-    for genre in query.genres:
-      genres.append(genre.name)
-
-  else:
+  # shows the artist page with the given artist_id
+  data = queries.artist_detail(artist_id)
+  if data is None:
     abort(404)
-
-  data={
-    "id": query.id,
-    "name": query.name,
-    "genres": genres,
-    "city": query.city,
-    "state": query.state,
-    "phone": query.phone,
-    "seeking_venue": query.seeking_venue,
-    "image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "past_shows": past_shows,
-    "upcoming_shows": upcoming_shows,
-    "past_shows_count": past_show_count,
-    "upcoming_shows_count": upcoming_show_count,
-  }
-
   return render_template('pages/show_artist.html', artist=data)
 
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@query_budget(3)
 def edit_artist(artist_id):
-  form = ArtistForm()
-  artist={
-    "id": 4,
-    "name": "Guns N Petals",
-    "genres": ["Rock n Roll"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "326-123-5000",
-    "website": "https://www.gunsnpetalsband.com",
-    "facebook_link": "https://www.facebook.com/GunsNPetals",
-    "seeking_venue": True,
-    "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
-    "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80"
-  }
-  
-  # TODO: populate form with fields from artist with ID <artist_id>
+  # the artist with its genres, and the genre choices once every CHOICES_TTL
+  artist = listings.load_listing(Artist, artist_id)
+  if artist is None:
+    abort(404)
+  form = ArtistForm(obj=artist)
+  form.genres.data = [genre.name for genre in artist.genres]
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@query_budget(10)
 def edit_artist_submission(artist_id):
-  # TODO: take values from the form submitted, and update existing
-  # artist record with ID <artist_id> using the new attributes
-
-  return redirect(url_for('show_artist', artist_id=artist_id))
+  # updates the submitted fields of the artist, and its genres
+  return edit_submission(Artist, ArtistForm, artist_id, 'show_artist', artist_id=artist_id)
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@query_budget(3)
 def edit_venue(venue_id):
-  form = VenueForm()
-  venue={
-    "id": 1,
-    "name": "The Musical Hop",
-    "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-    "address": "1015 Folsom Street",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "123-123-1234",
-    "website": "https://www.themusicalhop.com",
-    "facebook_link": "https://www.facebook.com/TheMusicalHop",
-    "seeking_talent": True,
-    "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-    "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60"
-  }
-  # TODO: populate form with values from venue with ID <venue_id>
+  # the venue with its genres, and the genre choices once every CHOICES_TTL
+  venue = listings.load_listing(Venue, venue_id)
+  if venue is None:
+    abort(404)
+  form = VenueForm(obj=venue)
+  form.genres.data = [genre.name for genre in venue.genres]
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@query_budget(10)
 def edit_venue_submission(venue_id):
-  # TODO: take values from the form submitted, and update existing
-  # venue record with ID <venue_id> using the new attributes
-  return redirect(url_for('show_venue', venue_id=venue_id))
+  # updates the submitted fields of the venue, relocates it, and its genres
+  return edit_submission(Venue, VenueForm, venue_id, 'show_venue', venue_id=venue_id)
+
+def edit_submission(model, form_class, entity_id, endpoint, **values):
+  # Validates the submission with the form of the create page; on errors
+  # the edit page is shown again with them, and nothing is written.
+  form = form_class()
+  kind = model.__tablename__.lower()
+  if not form.validate():
+    entity = listings.load_listing(model, entity_id)
+    if entity is None:
+      abort(404)
+    for field, errors in form.errors.items():
+      flash('{}: {}'.format(field, ' '.join(errors)))
+    return render_template('forms/edit_{}.html'.format(kind), form=form, **{kind: entity}), 400
+
+  # Only the fields submitted are updated, with their validated values.
+  submitted = {name: field.data for name, field in form._fields.items() if name in request.form and name != 'genres'}
+  genres = form.genres.data if 'genres' in request.form else None
+  name = form.name.data
+  try:
+    found = listings.update_listing(model, entity_id, submitted, genres)
+  except Exception:
+    app.logger.exception('edit of %s %s failed', model.__tablename__, entity_id)
+    flash('An error occured. {} {} could not be updated.'.format(model.__tablename__, name))
+    return redirect(url_for(endpoint, **values))
+  if not found:
+    abort(404)
+  flash('{} {} was successfully updated!'.format(model.__tablename__, name))
+  return redirect(url_for(endpoint, **values))
 
 #  Create Artist
 #  ----------------------------------------------------------------
@@ -582,6 +375,7 @@ def create_artist_form():
   return render_template('forms/new_artist.html', form=form)
 
 @app.route('/artists/create', methods=['POST'])
+@query_budget(10)
 def create_artist_submission():
   # called upon submitting the new artist listing form
   # TODO: insert form data as a new Venue record in the db, instead
@@ -593,19 +387,10 @@ def create_artist_submission():
   phone = request.form['phone']
   genres = request.form.getlist('genres')
   facebook_link = request.form['facebook_link']
-  genre_list = []
 
 
-  #If a selected genre is not in the database, add it
-  #Otherwise just retrieve it and append it to the list
-  for e in genres:
-   temp = Genre(name=e)
-   query = Genre.query.filter(Genre.name == e).first()
-   if not query:
-    db.session.add(temp)
-    genre_list.append(temp)
-   else:
-    genre_list.append(query)
+  #Resolve the selected genres in bulk, adding the ones not in the database
+  genre_list = resolve_genres(genres)
 
 
 
@@ -615,7 +400,10 @@ def create_artist_submission():
  
   try:
     db.session.add(artist)
+    versions.bump(versions.ARTISTS)
     db.session.commit()
+    fulltext.refresh(Artist, [artist.id])
+    page_cache.invalidate(artists_key())
   except:
     error = True
     db.session.rollback()
@@ -637,29 +425,35 @@ def create_artist_submission():
   
 
 
+#  Analytics
+#  ----------------------------------------------------------------
+
+@app.route('/analytics/cities')
+@query_budget(2)
+def city_stats():
+  # ?from=&to=&genre=&limit=: cities with the most shows, from the rollups
+  try:
+    stats = analytics.city_stats(request.args)
+  except ValueError as error:
+    return jsonify({'success': False, 'error': str(error)}), 400
+  return jsonify(stats)
+
 #  Shows
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@query_budget(1)
 def shows():
-  # displays list of shows at /shows
-  # TODO: replace with real venues data.
-  #       num_shows should be aggregated based on number of upcoming shows per venue.
-  
-  data = []
-  query = db.session.query(Show).all()
-  for show in query:
-    data.append(
-      {
-        "venue_id": show.venue_id,
-        "venue_name": Venue.query.get(show.venue_id).name,
-        "artist_id": show.artist_id,
-        "artist_name": Artist.query.get(show.artist_id).name,
-        "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-        "start_time": str(show.start_date),
-      }
+  # displays list of shows at /shows, one keyset page at a time
+  try:
+    page = queries.shows_page(
+      after=request.args.get('after'),
+      per_page=request.args.get('per_page', queries.SHOWS_PER_PAGE, type=int),
+      when=request.args.get('when', 'all'),
     )
-  return render_template('pages/shows.html', shows=data)
+  except ValueError:
+    abort(400)
+  return render_template('pages/shows.html', shows=page['shows'], page=page)
 
 @app.route('/shows/create')
 def create_shows():
@@ -668,6 +462,7 @@ def create_shows():
   return render_template('forms/new_show.html', form=form)
 
 @app.route('/shows/create', methods=['POST'])
+@query_budget(8)
 def create_show_submission():
   # called to create new shows in the db, upon submitting new show listing form
   # TODO: insert form data as a new Show record in the db, instead
@@ -675,18 +470,26 @@ def create_show_submission():
   artist_id = request.form['artist_id']
   venue_id = request.form['venue_id']
   timeDate = request.form['start_time']
-  
-  show = Show(artist_id = artist_id, venue_id = venue_id, start_date = timeDate)
 
   try:
-    db.session.add(show)
-    db.session.commit()
-  except:
+    show = Show(artist_id = artist_id, venue_id = venue_id, start_date = dateutil.parser.parse(timeDate))
+    with bookings.reserve(show.venue_id, show.artist_id, show.start_date):
+      db.session.add(show)
+      counters.record_show(show.venue_id, show.artist_id, show.start_date)
+      analytics.record_shows([(show.venue_id, show.start_date)])
+      versions.bump(versions.SHOWS, versions.VENUES, versions.ARTISTS)
+      db.session.commit()
+    page_cache.invalidate(venues_key(), venue_key(venue_id), artist_key(artist_id))
+  except Exception as exception:
+    # A booking conflict is reported as such, anything else generically.
+    error = bookings.conflict_message(exception) or True
     db.session.rollback()
   finally:
     db.session.close()
   if not error:
       flash('Show was successfully listed!')
+  elif error is not True:
+      flash('Show could not be listed: ' + error + '.')
   else:
       flash('An error occured. Show could not be listed.')
   
@@ -701,15 +504,92 @@ def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+@app.cli.command('counters-rollover')
+def counters_rollover_command():
+  # Run periodically (e.g. from cron) to move passed shows to the past counters.
+  moved = counters.roll_over()
+  click.echo('{} shows moved from upcoming to past'.format(moved))
+
+@app.cli.command('counters-reconcile')
+def counters_reconcile_command():
+  # Rebuilds the venue and artist show counters from the Show table.
+  past = counters.reconcile()
+  click.echo('counters rebuilt, {} past shows'.format(past))
+
+@app.cli.command('analytics-refresh')
+@click.option('--rebuild', is_flag=True, help='Recompute every rollup from the Show table.')
+def analytics_refresh_command(rebuild):
+  # Run periodically (e.g. from cron) to apply show changes to the rollups.
+  if rebuild:
+    click.echo('analytics rebuilt, {} venue days'.format(analytics.rebuild()))
+  else:
+    click.echo('{} changes applied'.format(analytics.refresh()))
+
+@app.cli.command('geocode-venues')
+def geocode_venues_command():
+  # Locates the venues without coordinates from data/us_cities.csv.
+  located = geo.geocode_missing()
+  if located:
+    versions.bump(versions.VENUES)
+  db.session.commit()
+  page_cache.clear()
+  click.echo('{} venues located'.format(located))
+
+@app.cli.command('fyyur-import')
+@click.argument('kind', type=click.Choice(sorted(importer.KINDS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'format', type=click.Choice(importer.FORMATS),
+              help='Input format, guessed from the file name by default.')
+@click.option('--chunk-size', default=importer.CHUNK_SIZE, show_default=True,
+              help='Rows loaded per transaction.')
+@click.option('--rejects', type=click.File('w', encoding='utf-8'),
+              help='Write rejected rows here as JSON lines instead of printing them.')
+def import_command(kind, source, format, chunk_size, rejects):
+  # Bulk loads venues, artists or shows from CSV or JSON lines. Columns are
+  # the form field names; genres in a CSV cell are separated by ; or ,.
+  def on_reject(line_num, errors):
+    if rejects is not None:
+      rejects.write(json.dumps({'line': line_num, 'errors': errors}) + '\n')
+    else:
+      click.echo('line {}: {}'.format(line_num, errors), err=True)
+  report = importer.run_import(
+    kind, source,
+    format=format or importer.guess_format(source.name),
+    chunk_size=chunk_size,
+    on_reject=on_reject,
+  )
+  click.echo(str(report))
+
+@app.cli.command('assets-build')
+def assets_build_command():
+  # Run on deploy, before starting the new processes. See assets.py.
+  manifest = assets.build(app.static_folder)
+  click.echo('{} files built, {} precompressed'.format(len(manifest['files']), len(manifest['compressed'])))
+
+@app.cli.command('fyyur-seed')
+@click.option('--venues', default=1000, show_default=True)
+@click.option('--artists', default=2000, show_default=True)
+@click.option('--shows', default=20000, show_default=True)
+@click.option('--seed', default=0, show_default=True, help='Same seed, same data.')
+@click.option('--today', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Day the show dates are relative to, today by default.')
+def seed_command(venues, artists, shows, seed, today):
+  # Fills an empty database with generated venues, artists and shows, see
+  # seeder.py.
+  if db.session.query(Show.id).first() is not None:
+    raise click.UsageError('the Show table is not empty')
+  started = time.perf_counter()
+  try:
+    seeder.seed_database(venues, artists, shows, seed=seed, today=today)
+  except ValueError as error:
+    raise click.UsageError(str(error))
+  click.echo('{} venues, {} artists, {} shows in {:.1f}s'.format(
+    venues, artists, shows, time.perf_counter() - started))
+
 
 #----------------------------------------------------------------------------#
 # Launch.
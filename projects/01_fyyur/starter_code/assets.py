@@ -0,0 +1,291 @@
+#----------------------------------------------------------------------------#
+# Static asset build and serving.
+#
+# `flask assets-build` writes to static/dist/:
+#
+#   * every file of static/ under a name carrying a hash of its content
+#     (css/main.css -> css/main.3f9c0b21d4e7.css)
+#   * the BUNDLES below, their sources concatenated and minified, hashed
+#     the same way
+#   * a .gz and a .br variant of each text file, kept only when smaller
+#     (brotli is in requirements.txt; without it only .gz is written)
+#   * manifest.json, mapping original names to built ones, written last
+#
+# Stylesheet url()s are rewritten to the built names. Earlier builds are
+# left in place: running processes keep serving the names they loaded.
+#
+# With ASSET_MANIFEST on (production, see config.py) and a build present:
+#
+#   url_for('static', filename=...)   resolves to the built file
+#   asset_urls(bundle)                is the bundle; its sources otherwise
+#   built files                       are served with immutable far-future
+#                                     cache headers, precompressed when
+#                                     the client accepts it
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import tempfile
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+logger = logging.getLogger(__name__)
+
+BUILD_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = ('.css', '.js', '.map', '.json', '.svg', '.eot', '.ttf', '.otf')
+MIN_COMPRESS_SIZE = 512
+# Content-Encoding: file suffix, by preference.
+ENCODINGS = (('br', 'br'), ('gzip', 'gz'))
+
+# Bundle: its sources, in the order the layout loads them.
+BUNDLES = {
+  'css/site.css': (
+    'css/bootstrap.min.css',
+    'css/layout.main.css',
+    'css/main.css',
+    'css/main.responsive.css',
+    'css/main.quickfix.css',
+  ),
+  # Home page only, after site.css.
+  'css/home-page.css': (
+    'css/home.css',
+  ),
+  # Run in <head>, before the page renders.
+  'js/head.js': (
+    'js/libs/modernizr-2.8.2.min.js',
+    'js/libs/moment.min.js',
+  ),
+  # Deferred, after jQuery.
+  'js/site.js': (
+    'js/script.js',
+    'js/libs/bootstrap-3.1.1.min.js',
+    'js/plugins.js',
+  ),
+}
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_WHITESPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,])\s*')
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]*)\1\s*\)''')
+EXTERNAL_URL = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|/|#)', re.I)
+JS_LINE_COMMENT = re.compile(r'^\s*//.*$', re.M)
+JS_INDENT = re.compile(r'^[ \t]+', re.M)
+
+
+#  Minification
+#  ----------------------------------------------------------------
+
+def minify_css(text):
+  # Drops comments and the whitespace around { } ; and , (collapsed
+  # elsewhere, since it separates selectors and values).
+  text = CSS_COMMENT.sub('', text)
+  text = CSS_WHITESPACE.sub(' ', text)
+  text = CSS_PUNCTUATION.sub(r'\1', text)
+  return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+  # Only indentation, whole-line // comments and blank lines are dropped:
+  # without a parser nothing else is safe to touch. Minified sources pass
+  # through.
+  text = JS_LINE_COMMENT.sub('', text)
+  text = JS_INDENT.sub('', text)
+  return '\n'.join(line for line in text.splitlines() if line.strip())
+
+
+#  Build
+#  ----------------------------------------------------------------
+
+def hashed_name(name, data):
+  stem, extension = posixpath.splitext(name)
+  return '{}.{}{}'.format(stem, hashlib.sha256(data).hexdigest()[:HASH_LENGTH], extension)
+
+
+def rewrite_urls(text, source, target, files):
+  # Points the relative url()s of `source` at the built files, as seen from
+  # `target`; both are names under static/.
+  def replace(match):
+    quote, url = match.groups()
+    if not url or EXTERNAL_URL.match(url):
+      return match.group(0)
+    path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+    name = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+    built = files.get(name, name)
+    return 'url({0}{1}{2}{0})'.format(quote, posixpath.relpath(built, posixpath.dirname(target)), suffix)
+  return CSS_URL.sub(replace, text)
+
+
+def read_text(static_folder, name):
+  with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+    return f.read()
+
+
+def write_file(path, data):
+  # Atomic, so that a process serving the directory never reads half a file.
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+  with os.fdopen(fd, 'wb') as f:
+    f.write(data)
+  os.replace(temporary, path)
+
+
+def compress(data):
+  # {encoding: compressed data}, for the variants worth serving.
+  variants = {'gzip': gzip.compress(data, 9, mtime=0)}
+  if brotli is not None:
+    variants['br'] = brotli.compress(data, quality=11)
+  return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+def source_files(static_folder):
+  # Names under static/, with / separators, built output and dot files aside.
+  for directory, subdirectories, filenames in os.walk(static_folder):
+    relative = os.path.relpath(directory, static_folder)
+    if relative == '.':
+      subdirectories[:] = [d for d in subdirectories if d != BUILD_DIR]
+    subdirectories[:] = [d for d in subdirectories if not d.startswith('.')]
+    for filename in filenames:
+      if not filename.startswith('.'):
+        yield posixpath.normpath(posixpath.join(relative.replace(os.sep, '/'), filename))
+
+
+def build(static_folder):
+  # Builds static/dist/ and returns the manifest.
+  if brotli is None:
+    logger.warning('brotli is not installed, writing gzip variants only: pip install -r requirements.txt')
+  output = os.path.join(static_folder, BUILD_DIR)
+  files = {}
+  compressed = {}
+
+  def emit(name, data):
+    built = posixpath.join(BUILD_DIR, hashed_name(name, data))
+    path = os.path.join(static_folder, *built.split('/'))
+    if not os.path.exists(path):
+      write_file(path, data)
+    encodings = []
+    if name.endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+      variants = compress(data)
+      for encoding, suffix in ENCODINGS:
+        if encoding in variants:
+          write_file('{}.{}'.format(path, suffix), variants[encoding])
+          encodings.append(encoding)
+    files[name] = built
+    if encodings:
+      compressed[built] = encodings
+
+  # Stylesheets last: their content depends on the built names they refer to.
+  names = sorted(source_files(static_folder), key=lambda name: (name.endswith('.css'), name))
+  for name in names:
+    if name.endswith('.css'):
+      text = rewrite_urls(read_text(static_folder, name), name, posixpath.join(BUILD_DIR, name), files)
+      emit(name, text.encode('utf-8'))
+    else:
+      with open(os.path.join(static_folder, name), 'rb') as f:
+        emit(name, f.read())
+
+  for bundle, sources in sorted(BUNDLES.items()):
+    target = posixpath.join(BUILD_DIR, bundle)
+    if bundle.endswith('.css'):
+      text = '\n'.join(
+        minify_css(rewrite_urls(read_text(static_folder, source), source, target, files))
+        for source in sources
+      )
+    else:
+      # ; between sources, in case one ends without it.
+      text = '\n;'.join(
+        read_text(static_folder, source) if source.endswith('.min.js') else minify_js(read_text(static_folder, source))
+        for source in sources
+      )
+    emit(bundle, text.encode('utf-8'))
+
+  manifest = {'files': files, 'compressed': compressed}
+  write_file(os.path.join(output, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+  return manifest
+
+
+#  Serving
+#  ----------------------------------------------------------------
+
+
+class Assets(object):
+
+  def __init__(self):
+    self.files = {}
+    self.compressed = {}
+
+  def init_app(self, app):
+    self.files = {}
+    self.compressed = {}
+    if app.config.get('ASSET_MANIFEST'):
+      self.load(os.path.join(app.static_folder, BUILD_DIR, MANIFEST))
+    app.url_defaults(self.url_defaults)
+    app.view_functions['static'] = self.send_static_file
+    app.jinja_env.globals['asset_urls'] = self.urls
+
+  def load(self, path):
+    try:
+      with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    except FileNotFoundError:
+      logger.warning('%s not found, serving unbuilt assets: run flask assets-build', path)
+      return
+    self.files = manifest['files']
+    self.compressed = manifest['compressed']
+
+  def url_defaults(self, endpoint, values):
+    # url_for('static', filename=...) of a built file gives its built name.
+    if endpoint == 'static':
+      built = self.files.get(values.get('filename'))
+      if built is not None:
+        values['filename'] = built
+
+  def urls(self, bundle):
+    # The URLs to load for a bundle: the bundle once built, its sources
+    # otherwise.
+    if bundle in self.files:
+      return [url_for('static', filename=bundle)]
+    return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+  def send_static_file(self, filename):
+    # Replaces the view of the static endpoint.
+    if not filename.startswith(BUILD_DIR + '/') or filename == posixpath.join(BUILD_DIR, MANIFEST):
+      return current_app.send_static_file(filename)
+
+    available = self.compressed.get(filename, ())
+    for encoding, suffix in ENCODINGS:
+      if encoding in available and request.accept_encodings[encoding]:
+        response = send_from_directory(
+          current_app.static_folder, '{}.{}'.format(filename, suffix),
+          mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        )
+        response.headers['Content-Encoding'] = encoding
+        break
+    else:
+      response = send_from_directory(current_app.static_folder, filename)
+    if available:
+      response.vary.add('Accept-Encoding')
+    # Built names change with the content.
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.expires = None
+    return response
+
+
+assets = Assets()
+
+
+def setup_assets(app):
+  assets.init_app(app)
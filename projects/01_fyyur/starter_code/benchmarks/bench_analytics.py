@@ -0,0 +1,137 @@
+#----------------------------------------------------------------------------#
+# Analytics rollups: an incremental refresh must agree with a full rebuild
+# and cost far less, and the stats endpoints must beat aggregating Show.
+#
+#   python benchmarks/bench_analytics.py
+#----------------------------------------------------------------------------#
+
+import io
+import json
+import random
+from datetime import datetime, timedelta
+
+from support import create_bench_app, count_queries, timed
+
+VENUES = 2000
+ARTISTS = 4000
+SHOWS = 200000
+NEW_SHOWS = 500
+
+
+def snapshot(db, models):
+  return [
+    [tuple(row) for row in db.session.execute(
+      model.__table__.select().order_by(*model.__table__.primary_key.columns))]
+    for model in models
+  ]
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue, Show, Genre, venue_genre, VenueDayStats, CityMonthStats, GenreCityMonthStats
+  from seeder import Seeder
+  import analytics
+  import importer
+  client = app.test_client()
+  rollups = (VenueDayStats, CityMonthStats, GenreCityMonthStats)
+  now = datetime.now()
+
+  seeder = Seeder(7, today=now)
+  seeder.venues(VENUES)
+  seeder.artists(ARTISTS)
+  seeder.shows(SHOWS)
+  seeder.finish()
+  with app.test_request_context():
+    print('rebuild            %.1fms' % timed(analytics.rebuild, repeat=1))
+
+  # Changes through every writer: the show form, an import, a venue edit
+  # (new city and genres) and a bulk delete.
+  rng = random.Random(9)
+  for _ in range(20):
+    start = now + timedelta(days=rng.randint(-300, 300), hours=rng.choice((9, 12, 15)))
+    client.post('/shows/create', data={
+      'venue_id': rng.randint(1, VENUES),
+      'artist_id': rng.randint(1, ARTISTS),
+      'start_time': start.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+  with app.test_request_context():
+    lines = ['venue_id,artist_id,start_time']
+    for n in range(NEW_SHOWS):
+      start = now + timedelta(days=n % 700 - 350, hours=10)
+      lines.append('%d,%d,%s' % (rng.randint(1, VENUES), rng.randint(1, ARTISTS), start.strftime('%Y-%m-%d %H:%M:%S')))
+    importer.run_import('shows', io.StringIO('\n'.join(lines)), format='csv')
+  client.post('/venues/5/edit', data={
+    'name': 'The Moved Room', 'city': 'Denver', 'state': 'CO', 'address': '1 Main Street',
+    'genres': ['Jazz'],
+  })
+  client.delete('/venues', data=json.dumps({'ids': list(range(10, 60))}), content_type='application/json')
+
+  with app.test_request_context():
+    with count_queries() as counter:
+      elapsed = timed(analytics.refresh, repeat=1)
+    print('refresh            %.1fms (%d queries)' % (elapsed, counter.count))
+    refreshed = snapshot(db, rollups)
+    analytics.rebuild()
+    assert refreshed == snapshot(db, rollups), 'refresh drifted from rebuild'
+    assert analytics.refresh() == 0
+
+  # Reads: rollups against aggregating Show per request.
+  venue_id = db.session.query(Show.venue_id).group_by(Show.venue_id) \
+    .order_by(db.func.count(Show.id).desc()).first()[0]
+  with count_queries() as counter:
+    stats = client.get('/venues/%d/stats?period=week' % venue_id).get_json()
+  expected = db.session.query(db.func.count(Show.id)).filter(
+    Show.venue_id == venue_id,
+    db.func.date(Show.start_date).between(stats['from'], stats['to']),
+  ).scalar()
+  assert stats['total'] == expected == sum(b['shows'] for b in stats['buckets']), (stats['total'], expected)
+  assert counter.count == 1, counter.count
+
+  def from_shows():
+    rows = db.session.query(db.func.date(Show.start_date), db.func.count(Show.id)) \
+      .filter(Show.venue_id == venue_id) \
+      .group_by(db.func.date(Show.start_date)).all()
+    db.session.rollback()
+    return rows
+  def from_rollup():
+    stats = analytics.venue_stats(venue_id, {'period': 'month'})
+    db.session.rollback()
+    return stats
+  print('venue stats        rollup=%.2fms  from Show=%.2fms' % (
+    timed(from_rollup, repeat=20), timed(from_shows, repeat=20)))
+
+  cities = client.get('/analytics/cities?limit=5').get_json()
+  window = cities['from'], cities['to']
+  top = cities['cities'][0]
+  day = db.func.date(Show.start_date)
+  expected = db.session.query(db.func.count(Show.id)).join(Venue, Venue.id == Show.venue_id) \
+    .filter(Venue.city == top['city'], Venue.state == top['state'], day.between(*window)).scalar()
+  assert top['shows'] == expected, (top, expected)
+  jazz = client.get('/analytics/cities?genre=Jazz&limit=1').get_json()['cities'][0]
+  expected = db.session.query(db.func.count(Show.id)).join(Venue, Venue.id == Show.venue_id) \
+    .join(venue_genre, venue_genre.c.venue_id == Venue.id).join(Genre, Genre.id == venue_genre.c.genre_id) \
+    .filter(Genre.name == 'Jazz', Venue.city == jazz['city'], Venue.state == jazz['state'], day.between(*window)).scalar()
+  assert jazz['shows'] == expected, (jazz, expected)
+
+  def cities_from_shows():
+    rows = db.session.query(Venue.state, Venue.city, db.func.count(Show.id)) \
+      .join(Venue, Venue.id == Show.venue_id) \
+      .filter(day.between(*window)) \
+      .group_by(Venue.state, Venue.city) \
+      .order_by(db.func.count(Show.id).desc()).limit(20).all()
+    db.session.rollback()
+    return rows
+  def cities_from_rollup():
+    stats = analytics.city_stats({})
+    db.session.rollback()
+    return stats
+  print('cities             rollup=%.2fms  from Show=%.2fms' % (
+    timed(cities_from_rollup, repeat=5), timed(cities_from_shows, repeat=5)))
+
+  assert client.get('/venues/%d/stats' % (VENUES + 1)).status_code == 404
+  assert client.get('/venues/1/stats?period=year').status_code == 400
+  assert client.get('/analytics/cities?from=2026-13-01').status_code == 400
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,91 @@
+#----------------------------------------------------------------------------#
+# /api/v1: collections stream in constant memory with one query per batch,
+# and a revalidation with a current ETag is answered from a single lookup.
+#
+#   python benchmarks/bench_api.py
+#----------------------------------------------------------------------------#
+
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+from support import create_bench_app, count_queries, timed
+
+VENUES = ARTISTS = 1000
+SIZES = [10000, 50000]
+
+
+def streamed(client, url):
+  # (lines, peak traced memory in KiB) of consuming the response body.
+  tracemalloc.start()
+  response = client.get(url, buffered=False)
+  lines = 0
+  for chunk in response.response:
+    lines += chunk.count(b'\n')
+  response.close()
+  peak = tracemalloc.get_traced_memory()[1] / 1024
+  tracemalloc.stop()
+  return response, lines, peak
+
+
+def main():
+  app, db = create_bench_app()
+  from seeder import Seeder
+  import counters
+  import queries
+  client = app.test_client()
+  now = datetime.now()
+
+  seeder = Seeder(3, today=now)
+  seeder.venues(VENUES)
+  seeder.artists(ARTISTS)
+
+  seeded = 0
+  peaks = []
+  for size in SIZES:
+    seeder.shows(size - seeded)
+    seeded = size
+    counters.reconcile(now)
+
+    with count_queries() as counter:
+      response, lines, peak = streamed(client, '/api/v1/shows')
+    assert response.status_code == 200, response.status_code
+    assert lines == size, lines
+    batches = size // queries.EXPORT_BATCH_SIZE + 1
+    # versions, watermark, then one query per batch
+    assert counter.count == batches + 2, counter.count
+    peaks.append(peak)
+    ms = timed(lambda: client.get('/api/v1/shows').data, repeat=3)
+    print('shows=%-6d queries=%-3d peak=%.0fKiB best=%.1fms' % (size, counter.count, peak, ms))
+
+  assert peaks[-1] < peaks[0] * 2, 'streaming memory grew with data: %r' % peaks
+
+  # Revalidation: same ETag means 304 from one query; a write changes it.
+  for url in ('/api/v1/venues', '/api/v1/artists', '/api/v1/shows?when=upcoming',
+              '/api/v1/venues/1', '/api/v1/artists/1'):
+    response = client.get(url)
+    etag = response.headers['ETag']
+    # Consumed right away, so that a streamed body does not outlive its request.
+    body = response.data
+    if url.endswith('/1'):
+      json.loads(body)
+    with count_queries() as counter:
+      cached = client.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and not cached.data, cached.status_code
+    assert counter.count == 1, counter.count
+    full = timed(lambda: client.get(url).data, repeat=3)
+    revalidated = timed(lambda: client.get(url, headers={'If-None-Match': etag}), repeat=3)
+    print('%-28s 200=%.1fms 304=%.2fms' % (url, full, revalidated))
+
+  etag = client.get('/api/v1/venues/1').headers['ETag']
+  client.post('/shows/create', data={
+    'venue_id': 1, 'artist_id': 1,
+    'start_time': (now + timedelta(days=400)).strftime('%Y-%m-%d %H:%M:%S'),
+  })
+  response = client.get('/api/v1/venues/1', headers={'If-None-Match': etag})
+  assert response.status_code == 200, 'stale ETag after a new show'
+  assert client.get('/api/v1/venues/%d' % (VENUES + 1)).status_code == 404
+
+
+if __name__ == '__main__':
+  main()
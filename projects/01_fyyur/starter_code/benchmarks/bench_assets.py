@@ -0,0 +1,72 @@
+#----------------------------------------------------------------------------#
+# Static assets of a page, from the source files versus from the build of
+# assets.py: requests and bytes on a first visit (gzip and brotli
+# accepted), and requests a repeat visit makes once the browser cache has
+# expired the source files (the built ones never expire).
+#
+# Builds into a temporary copy of static/.
+#
+#   python benchmarks/bench_assets.py
+#----------------------------------------------------------------------------#
+
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from support import create_bench_app
+
+ACCEPT = {'Accept-Encoding': 'gzip, deflate, br'}
+LOCAL_URL = re.compile(r'''(?:href|src)="(/static/[^"]+)"''')
+
+
+def page_assets(client, path):
+  html = client.get(path).get_data(as_text=True)
+  # Assets the page loads in every browser (the IE fallbacks aside).
+  html = re.sub(r'<!--\[if.*?<!\[endif\]-->|document\.write\(.*?\)', '', html, flags=re.S)
+  return [url for url in LOCAL_URL.findall(html) if not url.startswith('/static/ico/')]
+
+
+def visit(client, urls):
+  # (bytes transferred, requests left after the cache expired)
+  transferred = 0
+  revalidated = 0
+  for url in urls:
+    response = client.get(url, headers=ACCEPT)
+    assert response.status_code == 200, (url, response.status_code)
+    transferred += len(response.get_data())
+    if 'immutable' not in response.headers.get('Cache-Control', ''):
+      revalidated += 1
+  return transferred, revalidated
+
+
+def main():
+  app, db = create_bench_app()
+  from assets import assets, build
+  client = app.test_client()
+
+  static = tempfile.mkdtemp(prefix='fyyur-static-')
+  try:
+    shutil.rmtree(static)
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns('dist'))
+    app.static_folder = static
+
+    sources = page_assets(client, '/venues')
+    started = time.perf_counter()
+    build(static)
+    build_time = time.perf_counter() - started
+    assets.load(os.path.join(static, 'dist', 'manifest.json'))
+    built = page_assets(client, '/venues')
+
+    print('%-8s %9s %12s %18s' % ('', 'requests', 'transferred', 'after expiry'))
+    for name, urls in (('sources', sources), ('built', built)):
+      transferred, revalidated = visit(client, urls)
+      print('%-8s %9d %10.1fkB %18d' % (name, len(urls), transferred / 1024.0, revalidated))
+    print('build: %.2fs' % build_time)
+  finally:
+    shutil.rmtree(static, ignore_errors=True)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,124 @@
+#----------------------------------------------------------------------------#
+# Booking conflicts: checking a new show costs two index range lookups
+# however many shows exist, overlapping bookings are refused by the form
+# handler and the importer, and a month of free slots is one query.
+#
+#   python benchmarks/bench_bookings.py
+#----------------------------------------------------------------------------#
+
+import io
+from datetime import datetime, timedelta
+
+from support import create_bench_app, count_queries, timed
+
+VENUES = ARTISTS = 500
+SIZES = [10000, 100000]
+SPACING = timedelta(hours=5)
+
+
+def seed(db, Venue, Artist, Show, start, stop, origin):
+  # Show i is at venue and artist i % VENUES, every SPACING * VENUES, so
+  # that no two bookings overlap.
+  db.session.bulk_insert_mappings(Show, [
+    {
+      'venue_id': i % VENUES + 1,
+      'artist_id': i % ARTISTS + 1,
+      'start_date': origin + SPACING * (i // VENUES) + timedelta(minutes=i % VENUES),
+    }
+    for i in range(start, stop)
+  ])
+  db.session.commit()
+
+
+def naive_conflict(db, Show, venue_id, artist_id, start_date, length):
+  # Every show of the venue and artist, compared in Python.
+  for show in Show.query.filter((Show.venue_id == venue_id) | (Show.artist_id == artist_id)):
+    if abs(show.start_date - start_date) < length:
+      return show
+  return None
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue, Artist, Show
+  import bookings
+  import counters
+  import importer
+  client = app.test_client()
+  origin = datetime(2026, 1, 1)
+
+  db.session.bulk_insert_mappings(Venue, [
+    {'id': i, 'name': 'Venue %d' % i, 'city': 'City', 'state': 'CA', 'address': 'Main Street', 'seeking_talent': False}
+    for i in range(1, VENUES + 1)
+  ])
+  db.session.bulk_insert_mappings(Artist, [
+    {'id': i, 'name': 'Artist %d' % i, 'city': 'City', 'state': 'CA', 'seeking_venue': False}
+    for i in range(1, ARTISTS + 1)
+  ])
+  db.session.commit()
+
+  seeded = 0
+  with app.test_request_context():
+    for size in SIZES:
+      seed(db, Venue, Artist, Show, seeded, size, origin)
+      seeded = size
+      middle = origin + SPACING * (size // VENUES // 2)
+      busy = middle + timedelta(minutes=30)
+      assert bookings.find_conflict(1, None, middle + timedelta(minutes=30))[0] == 'venue'
+      assert bookings.find_conflict(1, 2, middle - SPACING / 2) is None
+      assert naive_conflict(db, Show, 1, 1, busy, bookings.SHOW_LENGTH) is not None
+
+      with count_queries() as counter:
+        bookings.find_conflict(1, 2, middle - SPACING / 2)
+      assert counter.count == 2, counter.count
+      indexed = timed(lambda: bookings.find_conflict(1, 2, middle - SPACING / 2), repeat=20)
+      naive = timed(lambda: naive_conflict(db, Show, 1, 2, middle - SPACING / 2, bookings.SHOW_LENGTH), repeat=3)
+      print('shows=%-7d check queries=%d indexed=%.2fms naive=%.1fms' % (size, counter.count, indexed, naive))
+
+    start = origin + SPACING * (seeded // VENUES // 2)
+    end = start + timedelta(days=30)
+    with count_queries() as counter:
+      slots = bookings.free_slots(Show.venue_id, list(range(1, VENUES + 1)), start, end)
+    assert counter.count == 1, counter.count
+    # Venue 1 plays every SPACING * VENUES; no free slot overlaps a show.
+    shows = [row.start_date for row in Show.query.filter(Show.venue_id == 1, Show.start_date.between(start, end))]
+    for first, last in slots[1]:
+      assert all(show <= first - bookings.SHOW_LENGTH or show >= last + bookings.SHOW_LENGTH for show in shows)
+    ms = timed(lambda: bookings.free_slots(Show.venue_id, list(range(1, VENUES + 1)), start, end), repeat=3)
+    print('free slots venues=%d days=30 queries=%d best=%.1fms' % (VENUES, counter.count, ms))
+
+    counters.reconcile()
+
+  # The form handler refuses an overlapping show and accepts a free one.
+  taken = origin + timedelta(minutes=45)
+  before = Show.query.count()
+  response = client.post('/shows/create', data={
+    'venue_id': 1, 'artist_id': 3, 'start_time': taken.strftime('%Y-%m-%d %H:%M:%S'),
+  })
+  assert b'already booked' in response.data
+  assert Show.query.count() == before
+  client.post('/shows/create', data={
+    'venue_id': 1, 'artist_id': 3, 'start_time': (origin - SPACING).strftime('%Y-%m-%d %H:%M:%S'),
+  })
+  assert Show.query.count() == before + 1
+
+  response = client.get('/api/v1/venues/1/free-slots?start=2026-01-01&end=2026-01-02')
+  assert response.status_code == 200, response.status_code
+  assert client.get('/api/v1/venues/1/free-slots?start=2026-01-02&end=2026-01-01').status_code == 400
+
+  # So does the importer, against the database and within the file.
+  text = 'venue_id,artist_id,start_time\n' + ''.join(
+    '%d,%d,%s\n' % (venue_id, artist_id, start.strftime('%Y-%m-%d %H:%M:%S'))
+    for venue_id, artist_id, start in [
+      (2, 7, origin + timedelta(minutes=30)),        # venue 2 is booked
+      (7, 7, origin - timedelta(days=10)),           # free
+      (8, 7, origin - timedelta(days=10, hours=-1)), # artist 7 is now booked
+    ]
+  )
+  with app.app_context():
+    report = importer.run_import('shows', io.StringIO(text))
+  assert (report.loaded, report.rejected) == (1, 2), report
+
+
+if __name__ == '__main__':
+  main()
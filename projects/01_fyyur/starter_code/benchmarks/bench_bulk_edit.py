@@ -0,0 +1,135 @@
+#----------------------------------------------------------------------------#
+# Deletes and bulk edits run the same number of statements however many
+# venues, artists and shows they touch, keep the show counters equal to a
+# rebuild, and beat deleting ORM objects one at a time.
+#
+#   python benchmarks/bench_bulk_edit.py
+#----------------------------------------------------------------------------#
+
+import json
+import time
+
+from support import create_bench_app, count_queries
+
+VENUES = ARTISTS = 2000
+SHOWS = 50000
+BATCHES = [10, 100, 500]
+ORM_DELETES = 100
+
+
+def snapshot(db, Venue, Artist):
+  return (
+    db.session.query(Venue.id, Venue.upcoming_shows_count, Venue.past_shows_count).order_by(Venue.id).all(),
+    db.session.query(Artist.id, Artist.upcoming_shows_count, Artist.past_shows_count).order_by(Artist.id).all(),
+  )
+
+
+def orm_delete(db, Venue, Show, counters, venue_id):
+  # The one-object-at-a-time way: load the venue and its shows, forget and
+  # delete every show, then the venue.
+  venue = Venue.query.get(venue_id)
+  for show in Show.query.filter(Show.venue_id == venue_id).all():
+    counters.forget_show(None, show.artist_id, show.start_date)
+    db.session.delete(show)
+  venue.genres = []
+  db.session.delete(venue)
+  db.session.commit()
+
+
+def main():
+  app, db = create_bench_app(page_cache=True)
+  from models import Venue, Artist, Show, venue_genre
+  from seeder import Seeder
+  import counters
+  client = app.test_client()
+
+  seeder = Seeder(11)
+  seeder.venues(VENUES)
+  seeder.artists(ARTISTS)
+  seeder.shows(SHOWS)
+  seeder.finish()
+
+  # Bulk delete: constant statement count, counters still exact.
+  next_id = 1
+  counts = []
+  for batch in BATCHES:
+    ids = list(range(next_id, next_id + batch))
+    next_id += batch
+    shows = Show.query.filter(Show.venue_id.in_(ids)).count()
+    with count_queries() as counter:
+      started = time.perf_counter()
+      response = client.delete('/venues', data=json.dumps({'ids': ids}), content_type='application/json')
+      elapsed = (time.perf_counter() - started) * 1000
+    assert response.status_code == 200 and response.get_json()['deleted'] == batch, response.data
+    counts.append(counter.count)
+    print('DELETE /venues ids=%-4d shows=%-5d queries=%-3d %.1fms' % (batch, shows, counter.count, elapsed))
+
+    assert Show.query.filter(Show.venue_id.in_(ids)).count() == 0
+    assert db.session.query(venue_genre).filter(venue_genre.c.venue_id.in_(ids)).count() == 0
+    bulk = snapshot(db, Venue, Artist)
+    counters.reconcile()
+    assert bulk == snapshot(db, Venue, Artist), 'bulk delete drifted from rebuild'
+  assert len(set(counts)) == 1, 'query count grew with batch size: %r' % counts
+
+  ids = list(range(next_id, next_id + ORM_DELETES))
+  next_id += ORM_DELETES
+  started = time.perf_counter()
+  with count_queries() as counter:
+    for venue_id in ids:
+      orm_delete(db, Venue, Show, counters, venue_id)
+  orm_ms = (time.perf_counter() - started) * 1000
+  ids = list(range(next_id, next_id + ORM_DELETES))
+  next_id += ORM_DELETES
+  with count_queries() as bulk_counter:
+    started = time.perf_counter()
+    client.delete('/venues', data=json.dumps({'ids': ids}), content_type='application/json')
+    bulk_ms = (time.perf_counter() - started) * 1000
+  print('%d venues: one by one=%.1fms (%d queries) bulk=%.1fms (%d queries)' % (
+    ORM_DELETES, orm_ms, counter.count, bulk_ms, bulk_counter.count))
+
+  ids = list(range(1, 201))
+  with count_queries() as counter:
+    response = client.delete('/artists', data=json.dumps({'ids': ids}), content_type='application/json')
+  assert response.get_json()['deleted'] == len(ids), response.data
+  assert Show.query.filter(Show.artist_id.in_(ids)).count() == 0
+  bulk = snapshot(db, Venue, Artist)
+  counters.reconcile()
+  assert bulk == snapshot(db, Venue, Artist), 'artist delete drifted from rebuild'
+  print('DELETE /artists ids=%d queries=%d' % (len(ids), counter.count))
+
+  # Seeking flags of many artists with one UPDATE.
+  ids = list(range(201, 1201))
+  with count_queries() as counter:
+    response = client.patch('/artists', data=json.dumps({
+      'ids': ids, 'seeking_venue': True, 'seeking_description': 'Booking now',
+    }), content_type='application/json')
+  assert response.get_json()['updated'] == len(ids), response.data
+  assert Artist.query.filter(Artist.id.in_(ids), Artist.seeking_venue.is_(False)).count() == 0
+  print('PATCH /artists ids=%d queries=%d' % (len(ids), counter.count))
+  assert client.patch('/artists', data=json.dumps({'ids': ['x'], 'seeking_venue': True}),
+                      content_type='application/json').status_code == 400
+
+  # Editing a venue relocates it, replaces its genres and drops its pages.
+  venue_id = next_id
+  client.get('/venues/%d' % venue_id)
+  assert client.get('/venues/%d' % venue_id).headers['X-Cache'] == 'HIT'
+  assert client.get('/venues/%d/edit' % venue_id).status_code == 200
+  response = client.post('/venues/%d/edit' % venue_id, data={
+    'name': 'The Renamed Room', 'city': 'Denver', 'state': 'CO', 'address': '1 Main Street',
+    'phone': '555-555-5555', 'genres': ['Jazz', 'Blues'], 'facebook_link': '',
+  })
+  assert response.status_code == 302, response.status_code
+  venue = Venue.query.get(venue_id)
+  db.session.refresh(venue)
+  assert venue.name == 'The Renamed Room' and venue.geohash.startswith('9x'), (venue.name, venue.geohash)
+  assert sorted(genre.name for genre in venue.genres) == ['Blues', 'Jazz']
+  # The first page view renders the flashed message, bypassing the cache.
+  assert b'The Renamed Room' in client.get('/venues/%d' % venue_id).data
+  assert client.get('/venues/%d' % venue_id).headers['X-Cache'] == 'MISS'
+  assert client.get('/venues/%d/edit' % (VENUES + 1)).status_code == 404
+  assert client.delete('/venues/%d' % (VENUES + 1)).status_code == 404
+  print('edit ok')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,64 @@
+#----------------------------------------------------------------------------#
+# Show counters: incremental maintenance and roll-over must agree with a
+# full rebuild, and a roll-over must cost far less than the rebuild.
+#
+#   python benchmarks/bench_counters.py
+#----------------------------------------------------------------------------#
+
+import random
+from datetime import datetime, timedelta
+
+from support import create_bench_app, timed
+
+VENUES = ARTISTS = 2000
+SHOWS = 100000
+
+
+def snapshot(db, Venue, Artist):
+  return (
+    db.session.query(Venue.id, Venue.upcoming_shows_count, Venue.past_shows_count).order_by(Venue.id).all(),
+    db.session.query(Artist.id, Artist.upcoming_shows_count, Artist.past_shows_count).order_by(Artist.id).all(),
+  )
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue, Artist, Show
+  from seeder import Seeder
+  import counters
+  client = app.test_client()
+  now = datetime.now()
+  seeder = Seeder(3, today=now)
+  seeder.venues(VENUES)
+  seeder.artists(ARTISTS)
+  seeder.shows(SHOWS)
+
+  with app.test_request_context():
+    print('reconcile   %.1fms' % timed(lambda: counters.reconcile(now), repeat=3))
+
+  # Shows booked through the form are counted as they are created.
+  rng = random.Random(5)
+  for _ in range(50):
+    start = now + timedelta(hours=rng.randint(-24 * 30, 24 * 30))
+    client.post('/shows/create', data={
+      'venue_id': rng.randint(1, VENUES),
+      'artist_id': rng.randint(1, ARTISTS),
+      'start_time': start.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+  with app.test_request_context():
+    # A day passes: roll over, then compare with a rebuild at the same time.
+    later = now + timedelta(days=1)
+    elapsed = timed(lambda: counters.roll_over(later), repeat=1)
+    rolled = snapshot(db, Venue, Artist)
+    print('roll_over   %.1fms' % elapsed)
+    counters.reconcile(later)
+    assert rolled == snapshot(db, Venue, Artist), 'roll-over drifted from rebuild'
+
+    # A few of the random bookings may have been refused as overlapping.
+    total = db.session.query(db.func.sum(Venue.upcoming_shows_count + Venue.past_shows_count)).scalar()
+    assert SHOWS < total == db.session.query(Show).count(), total
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,70 @@
+#----------------------------------------------------------------------------#
+# The datetime filter over 10k show times, and the render time of
+# pages/shows.html with 10k shows, before and after the formatter cache.
+#
+#   python benchmarks/bench_datetime_format.py
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+from flask import render_template
+
+from support import create_bench_app, timed
+
+ROWS = 10000
+
+
+def legacy_format_datetime(value, format='medium'):
+  # The filter as it was: views passed str(start_date) and it parsed it back.
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format)
+
+
+def main():
+  app, db = create_bench_app()
+  from datetimes import format_datetime, format_datetimes
+
+  start = datetime(2020, 5, 21, 21, 30)
+  times = [start + timedelta(minutes=37 * i) for i in range(ROWS)]
+  strings = [str(value) for value in times]
+
+  for format in ('full', 'medium'):
+    expected = [legacy_format_datetime(value, format) for value in strings]
+    assert [format_datetime(value, format) for value in times] == expected
+    assert format_datetimes(times, format) == expected
+    assert format_datetimes(strings, format) == expected
+
+    legacy = timed(lambda: [legacy_format_datetime(value, format) for value in strings], repeat=3)
+    single = timed(lambda: [format_datetime(value, format) for value in times], repeat=3)
+    batch = timed(lambda: format_datetimes(times, format), repeat=3)
+    print('%-6s x%d legacy=%.1fms filter=%.1fms batch=%.1fms' % (format, ROWS, legacy, single, batch))
+
+  shows = [
+    {
+      'venue_id': 1, 'venue_name': 'The Musical Hop',
+      'artist_id': 1, 'artist_name': 'Guns N Petals',
+      'artist_image_link': '', 'start_time': value,
+    }
+    for value in times
+  ]
+  page = {'when': 'all', 'per_page': ROWS, 'next_cursor': None}
+  legacy_shows = [dict(show, start_time=str(show['start_time'])) for show in shows]
+
+  with app.test_request_context('/shows'):
+    filters = app.jinja_env.filters
+    new_filter = filters['datetime']
+    filters['datetime'] = legacy_format_datetime
+    legacy = timed(lambda: render_template('pages/shows.html', shows=legacy_shows, page=page), repeat=3)
+    filters['datetime'] = new_filter
+    current = timed(lambda: render_template('pages/shows.html', shows=shows, page=page), repeat=3)
+  print('render pages/shows.html x%d legacy=%.1fms current=%.1fms' % (ROWS, legacy, current))
+
+
+if __name__ == '__main__':
+  main()
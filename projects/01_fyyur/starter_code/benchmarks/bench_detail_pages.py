@@ -0,0 +1,75 @@
+#----------------------------------------------------------------------------#
+# Venue and artist detail pages must cost a constant number of queries
+# however many shows they list.
+#
+#   python benchmarks/bench_detail_pages.py
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from support import create_bench_app, count_queries, timed
+
+SHOWS = [10, 100, 500]
+MAX_QUERIES = 3
+
+
+def seed(db, Venue, Artist, Show, Genre, shows):
+  now = datetime.now()
+  # In place of the genres create_all() seeds.
+  db.session.query(Genre).delete()
+  db.session.bulk_insert_mappings(Genre, [{'id': 1, 'name': 'Jazz'}, {'id': 2, 'name': 'Folk'}])
+  db.session.bulk_insert_mappings(Venue, [
+    {'id': i, 'name': 'Venue %d' % i, 'city': 'City', 'state': 'CA', 'address': 'Main Street'}
+    for i in range(1, shows + 1)
+  ])
+  db.session.bulk_insert_mappings(Artist, [
+    {'id': i, 'name': 'Artist %d' % i, 'city': 'City', 'state': 'CA'}
+    for i in range(1, shows + 1)
+  ])
+  # Venue 1 hosts every artist once and artist 1 plays every venue once.
+  db.session.bulk_insert_mappings(Show, [
+    {'venue_id': 1, 'artist_id': i, 'start_date': now + timedelta(days=i - shows // 2)}
+    for i in range(1, shows + 1)
+  ] + [
+    {'venue_id': i, 'artist_id': 1, 'start_date': now + timedelta(days=shows // 2 - i)}
+    for i in range(2, shows + 1)
+  ])
+  db.session.execute("INSERT INTO venue_genre VALUES (1, 1), (1, 2)")
+  db.session.execute("INSERT INTO artist_genre VALUES (1, 1), (1, 2)")
+  db.session.commit()
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue, Artist, Show, Genre
+  import queries
+  client = app.test_client()
+
+  for shows in SHOWS:
+    db.drop_all()
+    db.create_all()
+    seed(db, Venue, Artist, Show, Genre, shows)
+
+    for path in ('/venues/1', '/artists/1'):
+      with count_queries() as counter:
+        response = client.get(path)
+      assert response.status_code == 200, response.status_code
+      assert counter.count <= MAX_QUERIES, (path, counter.count)
+
+      ms = timed(lambda: client.get(path))
+      print('%-11s shows=%-4d queries=%-3d best=%.1fms' % (path, shows, counter.count, ms))
+
+    with app.test_request_context():
+      venue = queries.venue_detail(1)
+      artist = queries.artist_detail(1)
+      assert venue['past_shows_count'] + venue['upcoming_shows_count'] == shows
+      assert artist['past_shows_count'] + artist['upcoming_shows_count'] == shows
+      assert sorted(venue['genres']) == sorted(artist['genres']) == ['Folk', 'Jazz']
+      assert queries.venue_detail(shows + 1) is None
+
+  assert client.get('/venues/%d' % (SHOWS[-1] + 1)).status_code == 404
+  assert client.get('/artists/%d' % (SHOWS[-1] + 1)).status_code == 404
+
+
+if __name__ == '__main__':
+  main()
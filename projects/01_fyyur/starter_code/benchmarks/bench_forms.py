@@ -0,0 +1,95 @@
+#----------------------------------------------------------------------------#
+# Cost of building, validating and rendering the venue and artist forms per
+# request, with the shared choice sets against per-form inline choice lists
+# (the forms as they were), and the genre choices following the Genre table.
+#
+#   python benchmarks/bench_forms.py
+#----------------------------------------------------------------------------#
+
+from flask_wtf import Form
+from werkzeug.datastructures import MultiDict
+from wtforms import StringField, SelectField, SelectMultipleField
+from wtforms.validators import DataRequired, URL
+from wtforms.widgets import Select
+
+from support import create_bench_app, count_queries, timed
+
+ROUNDS = 2000
+
+
+def inline_form_class(states, genres):
+  # VenueForm with its choices inline, copied into every instance.
+  state_choices = [(state, state) for state in states]
+  genre_choices = [(genre, genre) for genre in genres]
+
+  class InlineVenueForm(Form):
+    name = StringField('name', validators=[DataRequired()])
+    city = StringField('city', validators=[DataRequired()])
+    state = SelectField('state', validators=[DataRequired()], choices=state_choices)
+    address = StringField('address', validators=[DataRequired()])
+    phone = StringField('phone')
+    image_link = StringField('image_link')
+    genres = SelectMultipleField('genres', validators=[DataRequired()], choices=genre_choices)
+    facebook_link = StringField('facebook_link', validators=[URL()])
+  return InlineVenueForm
+
+
+def use(form_class, formdata):
+  # One request's worth of form work: build, validate, render the selects.
+  form = form_class(formdata=formdata)
+  assert form.validate(), form.errors
+  form.state()
+  form.genres()
+
+
+def main():
+  app, db = create_bench_app()
+  import warnings
+  from forms import VenueForm, ArtistForm
+  from choices import STATES, DEFAULT_GENRES
+  from genre_registry import genre_choices, resolve_ids
+  warnings.simplefilter('ignore')
+  client = app.test_client()
+
+  formdata = MultiDict([
+    ('name', 'The Hall'), ('city', 'Denver'), ('state', 'WY'), ('address', '1 Main Street'),
+    ('phone', '555-555-5555'), ('genres', 'Soul'), ('genres', 'Other'), ('genres', 'Rock n Roll'),
+    ('facebook_link', 'https://www.facebook.com/hall'),
+  ])
+  inline = inline_form_class([value for value, _ in STATES.choices], DEFAULT_GENRES)
+
+  with app.test_request_context(method='POST'):
+    with count_queries() as counter:
+      use(VenueForm, formdata)
+    print('first form         %d queries (loads, here seeds, the genres)' % counter.count)
+    with count_queries() as counter:
+      use(VenueForm, formdata)
+      use(ArtistForm, formdata)
+    assert counter.count == 0, counter.count
+
+    # Same markup as the stock widget.
+    form = VenueForm(formdata=formdata)
+    for field in (form.state, form.genres):
+      assert field() == Select(multiple=field.type == 'MultipleChoiceField')(field)
+
+    shared_ms = timed(lambda: [use(VenueForm, formdata) for _ in range(ROUNDS)], repeat=3)
+    inline_ms = timed(lambda: [use(inline, formdata) for _ in range(ROUNDS)], repeat=3)
+    print('build+validate+render  shared=%.1fus  inline=%.1fus per form' % (
+      shared_ms * 1000 / ROUNDS, inline_ms * 1000 / ROUNDS))
+
+    # Both forms follow genres inserted through the registry.
+    resolve_ids(['Zydeco'])
+    assert 'Zydeco' in genre_choices()
+    zydeco = MultiDict(formdata)
+    zydeco.setlist('genres', ['Zydeco'])
+    assert VenueForm(formdata=zydeco).validate() and ArtistForm(formdata=zydeco).validate()
+    zydeco.setlist('genres', ['Polka'])
+    assert not VenueForm(formdata=zydeco).validate()
+
+  page = client.get('/venues/create')
+  assert page.status_code == 200 and b'Zydeco' in page.data
+  print('GET /venues/create %.2fms' % timed(lambda: client.get('/venues/create').data, repeat=50))
+
+
+if __name__ == '__main__':
+  main()
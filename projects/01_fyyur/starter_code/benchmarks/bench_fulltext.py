@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# Full-text venue search against the LIKE scan it replaces, on 100k venues.
+#
+#   python benchmarks/bench_fulltext.py
+#----------------------------------------------------------------------------#
+
+import random
+
+from support import create_bench_app, timed
+
+VENUES = 100000
+WORDS = ['musical', 'hop', 'park', 'square', 'live', 'music', 'coffee', 'hall',
+         'lounge', 'garden', 'theatre', 'cellar', 'club', 'basement', 'arena']
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Seattle', 'WA')]
+GENRES = ['Jazz', 'Folk', 'Blues', 'Reggae', 'Swing', 'Classical']
+TERMS = ['hop', 'mus', 'square coff', 'jazz', 'austin club']
+
+
+def seed(db, Venue, Genre):
+  rng = random.Random(7)
+  # In place of the genres create_all() seeds.
+  db.session.query(Genre).delete()
+  db.session.bulk_insert_mappings(Genre, [
+    {'id': i + 1, 'name': name} for i, name in enumerate(GENRES)
+  ])
+  venues = []
+  links = []
+  for i in range(1, VENUES + 1):
+    city, state = rng.choice(CITIES)
+    venues.append({
+      'id': i,
+      'name': ' '.join(rng.sample(WORDS, 3)).title(),
+      'city': city,
+      'state': state,
+      'address': 'Main Street',
+      'seeking_talent': False,
+    })
+    links.extend({'venue_id': i, 'genre_id': g} for g in rng.sample(range(1, len(GENRES) + 1), 2))
+  db.session.bulk_insert_mappings(Venue, venues)
+  db.session.execute('INSERT INTO venue_genre (venue_id, genre_id) VALUES (:venue_id, :genre_id)', links)
+  db.session.commit()
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue, Genre
+  import fulltext
+  import queries
+  client = app.test_client()
+  seed(db, Venue, Genre)
+
+  with app.test_request_context():
+    fulltext.refresh(Venue)
+    print('index built in %.1fms' % timed(lambda: fulltext.search_results(Venue, 'hop'), repeat=1))
+
+    for term in TERMS:
+      like = timed(lambda: queries.search_results(Venue, term))
+      full = timed(lambda: fulltext.search_results(Venue, term))
+      count = fulltext.search_results(Venue, term)['count']
+      print('%-12s matches=%-6d like=%.1fms fulltext=%.1fms' % (term, count, like, full))
+
+    # Every word has to match, the last one as a prefix, and name matches
+    # outrank genre or city matches.
+    results = fulltext.search_results(Venue, 'square coff', per_page=50)
+    for row in results['data']:
+      name = row['name'].lower().split()
+      assert 'square' in name and any(word.startswith('coff') for word in name), row
+
+  client.post('/venues/create', data={
+    'name': 'Jazz Corner', 'city': 'Austin', 'state': 'TX', 'address': '1 Main Street',
+    'phone': '', 'genres': ['Folk'], 'facebook_link': '',
+  })
+  with app.test_request_context():
+    results = fulltext.search_results(Venue, 'jazz corn')
+    assert [row['name'] for row in results['data']] == ['Jazz Corner'], results
+    results = fulltext.search_results(Venue, 'jazz')
+    assert results['data'][0]['name'] == 'Jazz Corner', results['data'][0]
+
+
+if __name__ == '__main__':
+  main()
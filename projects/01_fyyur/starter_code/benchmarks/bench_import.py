@@ -0,0 +1,128 @@
+#----------------------------------------------------------------------------#
+# fyyur-import: throughput of the chunked bulk loader against the per-row
+# form handlers, and correctness of what it loads (rejects, genre links,
+# show counters).
+#
+#   python benchmarks/bench_import.py
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import random
+from datetime import datetime, timedelta
+
+from support import create_bench_app, timed
+
+VENUES = ARTISTS = 10000
+SHOWS = 50000
+FORM_ROWS = 200
+BAD_EVERY = 97
+GENRES = ['Jazz', 'Blues', 'Folk', 'Rock n Roll', 'Hip-Hop', 'R&B', 'Soul']
+STATES = ['CA', 'NY', 'TX', 'WA']
+
+
+def listing(rng, i, kind):
+  row = {
+    'name': '%s %d' % (kind, i),
+    'city': 'City %d' % rng.randrange(100),
+    'state': rng.choice(STATES),
+    'phone': '555-%04d' % i,
+    'image_link': '',
+    'facebook_link': 'https://www.facebook.com/%s%d' % (kind.lower(), i),
+    'genres': rng.sample(GENRES, rng.randint(1, 3)),
+  }
+  if kind == 'Venue':
+    row['address'] = '%d Main Street' % i
+  if i % BAD_EVERY == 0:
+    row['state'] = 'XX'
+  return row
+
+
+def venues_csv(rng):
+  buffer = io.StringIO()
+  fields = ['name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link', 'genres']
+  writer = csv.DictWriter(buffer, fields)
+  writer.writeheader()
+  for i in range(1, VENUES + 1):
+    row = listing(rng, i, 'Venue')
+    writer.writerow(dict(row, genres=';'.join(row['genres'])))
+  return buffer.getvalue()
+
+
+def artists_jsonl(rng):
+  lines = [json.dumps(listing(rng, i, 'Artist')) for i in range(1, ARTISTS + 1)]
+  lines.insert(10, '{not json')
+  return '\n'.join(lines) + '\n'
+
+
+def shows_csv(rng, now, venues, artists):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(['venue_id', 'artist_id', 'start_time'])
+  for i in range(1, SHOWS + 1):
+    # Shows are 150 minutes apart, so no booking overlaps another.
+    start = now + timedelta(minutes=150 * (i - SHOWS // 2))
+    venue_id = venues + 1 if i % BAD_EVERY == 0 else rng.randint(1, venues)
+    writer.writerow([venue_id, rng.randint(1, artists), start.strftime('%Y-%m-%d %H:%M:%S')])
+  return buffer.getvalue()
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue, Artist, Show, venue_genre
+  import counters
+  import importer
+  client = app.test_client()
+  rng = random.Random(11)
+  now = datetime.now()
+
+  def load(kind, text, format):
+    rejected = []
+    report = importer.run_import(kind, io.StringIO(text), format=format,
+                                 on_reject=lambda line, errors: rejected.append((line, errors)))
+    print(report)
+    assert report.rejected == len(rejected)
+    assert report.loaded + report.rejected == report.read
+    return report
+
+  with app.app_context():
+    counters.reconcile(now)
+    load('venues', venues_csv(rng), 'csv')
+    load('artists', artists_jsonl(rng), 'jsonl')
+    venues = db.session.query(Venue).count()
+    artists = db.session.query(Artist).count()
+    # Every BAD_EVERY-th row has an invalid state, the artists file one
+    # unparsable line.
+    assert venues == VENUES - VENUES // BAD_EVERY, venues
+    assert artists == ARTISTS - ARTISTS // BAD_EVERY, artists
+
+    # Every BAD_EVERY-th show points at a missing venue.
+    report = load('shows', shows_csv(rng, now, venues, artists), 'csv')
+    assert report.rejected == SHOWS // BAD_EVERY, report.rejected
+    assert db.session.query(Show).count() == report.loaded
+    assert db.session.query(venue_genre).count() >= venues
+
+    imported = (
+      db.session.query(Venue.id, Venue.upcoming_shows_count, Venue.past_shows_count).order_by(Venue.id).all(),
+      db.session.query(Artist.id, Artist.upcoming_shows_count, Artist.past_shows_count).order_by(Artist.id).all(),
+    )
+    counters.reconcile(now)
+    rebuilt = (
+      db.session.query(Venue.id, Venue.upcoming_shows_count, Venue.past_shows_count).order_by(Venue.id).all(),
+      db.session.query(Artist.id, Artist.upcoming_shows_count, Artist.past_shows_count).order_by(Artist.id).all(),
+    )
+    assert imported == rebuilt, 'imported counters drifted from rebuild'
+
+  # The per-row path, for comparison.
+  rows = [listing(rng, i, 'Venue') for i in range(1, FORM_ROWS + 1)]
+
+  def post_all():
+    for row in rows:
+      client.post('/venues/create', data=row)
+  ms = timed(post_all, repeat=1)
+  print('form handler: %d venues in %.2fs (%.0f rows/s)' % (FORM_ROWS, ms / 1000, FORM_ROWS / (ms / 1000)))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# SQL instrumentation: a view issuing one query per row is reported as a
+# repeated fingerprint and fails its query budget under test, and the
+# per-statement hooks add little to a request.
+#
+#   python benchmarks/bench_instrumentation.py
+#----------------------------------------------------------------------------#
+
+import json
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from support import create_bench_app, timed
+
+VENUES = 50
+
+
+class Records(logging.Handler):
+  def __init__(self):
+    logging.Handler.__init__(self)
+    self.records = []
+
+  def emit(self, record):
+    self.records.append(record)
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue
+  import instrumentation
+  from instrumentation import query_budget, QueryBudgetExceeded
+
+  # The genres of every venue, loaded lazily one venue at a time.
+  @app.route('/_bench/venue-genres')
+  @query_budget(2)
+  def venue_genres():
+    return json.dumps({venue.id: [genre.name for genre in venue.genres] for venue in Venue.query.all()})
+
+  client = app.test_client()
+  for i in range(1, VENUES + 1):
+    client.post('/venues/create', data={
+      'name': 'Venue %d' % i, 'city': 'San Francisco', 'state': 'CA', 'address': 'Main Street',
+      'phone': '555', 'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/venue%d' % i,
+    })
+
+  try:
+    client.get('/_bench/venue-genres')
+  except QueryBudgetExceeded as error:
+    print(str(error).splitlines()[0])
+  else:
+    raise AssertionError('N+1 view passed its query budget')
+
+  records = Records()
+  instrumentation.logger.addHandler(records)
+  app.config['QUERY_BUDGET_ENFORCE'] = False
+  response = client.get('/_bench/venue-genres')
+  app.config['QUERY_BUDGET_ENFORCE'] = None
+  instrumentation.logger.removeHandler(records)
+  assert response.status_code == 200
+  assert 'desc="%d queries"' % (VENUES + 1) in response.headers['Server-Timing'], response.headers['Server-Timing']
+  entry = json.loads(records.records[-1].getMessage())
+  assert records.records[-1].levelno == logging.WARNING
+  assert entry['repeated'][0]['count'] == VENUES, entry
+  print('logged: %s' % json.dumps(entry['repeated'][0]))
+
+  response = client.get('/venues/1')
+  assert 'desc="3 queries"' in response.headers['Server-Timing']
+  assert instrumentation.fingerprint('SELECT a FROM t WHERE id IN (?, ?, ?) AND b = 5') == \
+    instrumentation.fingerprint('SELECT a FROM t WHERE id IN (?)  AND b = 7')
+
+  with_hooks = timed(lambda: client.get('/venues/1'), repeat=200)
+  event.remove(Engine, 'before_cursor_execute', instrumentation.before_cursor_execute)
+  event.remove(Engine, 'after_cursor_execute', instrumentation.after_cursor_execute)
+  without_hooks = timed(lambda: client.get('/venues/1'), repeat=200)
+  print('/venues/1 with hooks=%.2fms without=%.2fms' % (with_hooks, without_hooks))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,96 @@
+#----------------------------------------------------------------------------#
+# /venues/nearby: radius and bounding-box queries read a few geohash index
+# ranges instead of every venue, and match a brute-force scan.
+#
+#   python benchmarks/bench_nearby.py
+#----------------------------------------------------------------------------#
+
+import random
+
+from sqlalchemy import text
+
+from support import create_bench_app, count_queries, timed
+
+SIZES = [10000, 100000]
+# Continental US
+SOUTH, NORTH, WEST, EAST = 25.0, 49.0, -124.0, -67.0
+QUERIES = [
+  ('San Francisco', 37.7749, -122.4194, 20),
+  ('Chicago', 41.8781, -87.6298, 5),
+  ('Denver', 39.7392, -104.9903, 100),
+]
+
+
+def seed(db, Venue, geo, start, stop):
+  rng = random.Random(start)
+  rows = []
+  for i in range(start + 1, stop + 1):
+    latitude, longitude = rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+    rows.append({
+      'id': i, 'name': 'Venue %d' % i, 'city': 'City', 'state': 'CA', 'address': 'Main Street',
+      'seeking_talent': False, 'latitude': latitude, 'longitude': longitude,
+      'geohash': geo.encode(latitude, longitude),
+    })
+  db.session.bulk_insert_mappings(Venue, rows)
+  db.session.commit()
+
+
+def brute_force(db, Venue, geo, latitude, longitude, radius_km):
+  return sorted(
+    row.id
+    for row in db.session.query(Venue.id, Venue.latitude, Venue.longitude)
+    if geo.distance_km(latitude, longitude, row.latitude, row.longitude) <= radius_km
+  )
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue
+  import geo
+  client = app.test_client()
+
+  seeded = 0
+  with app.test_request_context():
+    for size in SIZES:
+      seed(db, Venue, geo, seeded, size)
+      seeded = size
+      for name, latitude, longitude, radius_km in QUERIES:
+        with count_queries() as counter:
+          result = geo.nearby(latitude, longitude, radius_km, limit=size)
+        assert counter.count == 1, counter.count
+        assert sorted(venue['id'] for venue in result['data']) == \
+          brute_force(db, Venue, geo, latitude, longitude, radius_km), name
+        indexed = timed(lambda: geo.nearby(latitude, longitude, radius_km), repeat=5)
+        scan = timed(lambda: brute_force(db, Venue, geo, latitude, longitude, radius_km), repeat=1)
+        print('venues=%-6d %-13s r=%-3dkm found=%-4d indexed=%.1fms scan=%.1fms' % (
+          size, name, radius_km, result['count'], indexed, scan))
+
+    box = geo.in_box(37.0, -123.0, 38.5, -121.5, limit=seeded)
+    expected = db.session.query(Venue.id) \
+      .filter(Venue.latitude.between(37.0, 38.5), Venue.longitude.between(-123.0, -121.5)) \
+      .count()
+    assert box['count'] == expected, (box['count'], expected)
+
+    if db.engine.dialect.name == 'sqlite':
+      query = db.session.query(Venue.id) \
+        .filter(geo.in_cells(geo.cover(*geo.radius_box(37.7749, -122.4194, 20))))
+      statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+      plan = ' '.join(row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN %s' % statement)))
+      assert 'ix_Venue_geohash' in plan, plan
+
+  # Created venues are geocoded from their city.
+  client.post('/venues/create', data={
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+    'phone': '123-123-1234', 'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/TheMusicalHop',
+  })
+  venue = Venue.query.filter_by(name='The Musical Hop').one()
+  assert venue.geohash and venue.geohash.startswith('9q8yy'), venue.geohash
+  response = client.get('/venues/nearby?city=San+Francisco&state=CA&radius_km=1')
+  assert b'The Musical Hop' in response.data
+  assert client.get('/venues/nearby?city=Atlantis&state=XX').status_code == 400
+  response = client.get('/api/v1/venues/nearby?lat=37.7749&lon=-122.4194&radius_km=1')
+  assert response.json['data'][0]['id'] == venue.id
+
+
+if __name__ == '__main__':
+  main()
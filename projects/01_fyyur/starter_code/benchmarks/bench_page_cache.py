@@ -0,0 +1,65 @@
+#----------------------------------------------------------------------------#
+# Cached versus uncached list and detail pages, and precise invalidation by
+# the create handlers.
+#
+#   python benchmarks/bench_page_cache.py
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from support import create_bench_app, count_queries, timed
+
+VENUES = ARTISTS = 2000
+SHOWS = 10000
+PAGES = ['/venues', '/artists', '/venues/1', '/artists/1']
+
+
+def cache_status(client, path):
+  return client.get(path).headers.get('X-Cache')
+
+
+def main():
+  app, db = create_bench_app(page_cache=True)
+  from seeder import Seeder
+  from cache import page_cache
+  client = app.test_client()
+  # No seeded show after 60 days, so the booking below is free.
+  seeder = Seeder(0, future_days=60)
+  seeder.venues(VENUES)
+  seeder.artists(ARTISTS)
+  seeder.shows(SHOWS)
+  seeder.finish()
+
+  for path in PAGES:
+    page_cache.enabled = False
+    uncached = timed(lambda: client.get(path))
+    page_cache.enabled = True
+    client.get(path)
+    with count_queries() as counter:
+      cached = timed(lambda: client.get(path))
+    assert counter.count == 0, counter.count
+    print('%-11s uncached=%.1fms cached=%.2fms' % (path, uncached, cached))
+
+  # A new show at venue 1 by artist 2 touches /venues, /venues/1 and
+  # /artists/2 only.
+  client.get('/artists/2')
+  client.post('/shows/create', data={
+    'venue_id': 1, 'artist_id': 2, 'start_time': (datetime.now() + timedelta(days=90)).strftime('%Y-%m-%d %H:%M:%S'),
+  })
+  assert cache_status(client, '/venues') == 'MISS'
+  assert cache_status(client, '/venues/1') == 'MISS'
+  assert cache_status(client, '/artists/2') == 'MISS'
+  assert cache_status(client, '/artists') == 'HIT'
+  assert cache_status(client, '/artists/1') == 'HIT'
+
+  client.post('/artists/create', data={
+    'name': 'New Artist', 'city': 'City', 'state': 'CA', 'phone': '', 'genres': ['Jazz'], 'facebook_link': '',
+  })
+  assert cache_status(client, '/artists') == 'MISS'
+  assert cache_status(client, '/venues') == 'HIT'
+
+  print('stats %r' % page_cache.stats())
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,96 @@
+#----------------------------------------------------------------------------#
+# Throughput of concurrent requests per connection pool size.
+#
+# THREADS threads, each with its own test client, request list and detail
+# pages for DURATION seconds against each pool size (DB_POOL_SIZE, with no
+# overflow). Requests that cannot get a connection wait for one, so a pool
+# smaller than the number of threads caps throughput.
+#
+#   python benchmarks/bench_pool.py
+#
+# SQLite runs inside the process, so every statement is made to hold its
+# connection FYYUR_BENCH_LATENCY_MS longer (default 2), standing in for the
+# network round trip to a database server. Set it to 0 with
+# FYYUR_BENCH_DATABASE_URL pointing at Postgres to measure the real one.
+#----------------------------------------------------------------------------#
+
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from flask_sqlalchemy import get_state
+
+from support import create_bench_app
+
+VENUES = ARTISTS = 200
+SHOWS = 1000
+THREADS = 16
+DURATION = 3.0
+POOL_SIZES = [1, 2, 4, 8, 16]
+PAGES = ['/venues', '/venues/1', '/artists/1', '/api/v1/venues/2', '/shows']
+
+
+def use_pool(app, db, size):
+  # Recreates the engine with a pool of `size` connections.
+  db.session.remove()
+  for connector in get_state(app).connectors.values():
+    connector.get_engine().dispose()
+  get_state(app).connectors.clear()
+  app.config['DB_POOL_SIZE'] = size
+  app.config['DB_MAX_OVERFLOW'] = 0
+  with app.app_context():
+    return db.engine
+
+
+def run(app):
+  # (requests, errors, seconds) of THREADS clients for DURATION seconds.
+  counts = [0] * THREADS
+  errors = [0] * THREADS
+  start = threading.Barrier(THREADS + 1)
+
+  def client_loop(n):
+    client = app.test_client()
+    start.wait()
+    deadline = time.perf_counter() + DURATION
+    i = n
+    while time.perf_counter() < deadline:
+      response = client.get(PAGES[i % len(PAGES)])
+      if response.status_code != 200:
+        errors[n] += 1
+      counts[n] += 1
+      i += 1
+
+  threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(THREADS)]
+  for thread in threads:
+    thread.start()
+  start.wait()
+  began = time.perf_counter()
+  for thread in threads:
+    thread.join()
+  return sum(counts), sum(errors), time.perf_counter() - began
+
+
+def main():
+  app, db = create_bench_app()
+  from seeder import seed_database
+  seed_database(VENUES, ARTISTS, SHOWS)
+
+  latency = float(os.environ.get('FYYUR_BENCH_LATENCY_MS', 2)) / 1000
+  if latency:
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def round_trip(conn, cursor, statement, parameters, context, executemany):
+      time.sleep(latency)
+
+  print('%d threads, %.0fms simulated latency per statement' % (THREADS, latency * 1000))
+  for size in POOL_SIZES:
+    engine = use_pool(app, db, size)
+    requests, failed, seconds = run(app)
+    assert failed == 0, '%d requests failed with pool_size=%d' % (failed, size)
+    print('pool_size=%-3d %-10s %6.0f req/s (%d requests)' % (
+      size, type(engine.pool).__name__, requests / seconds, requests))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,92 @@
+#----------------------------------------------------------------------------#
+# /venues/search and /artists/search must cost a constant number of queries
+# and report the real upcoming show count of every match.
+#
+#   python benchmarks/bench_search.py
+#----------------------------------------------------------------------------#
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from support import create_bench_app, count_queries, timed
+
+SIZES = [100, 1000, 5000]
+SHOWS_PER_ROW = 4
+
+
+def seed(db, Venue, Artist, Show, start, stop):
+  rng = random.Random(start)
+  now = datetime.now()
+  db.session.bulk_insert_mappings(Venue, [
+    {'id': i, 'name': 'Venue %d' % i, 'city': 'City', 'state': 'CA', 'address': 'Main Street'}
+    for i in range(start + 1, stop + 1)
+  ])
+  db.session.bulk_insert_mappings(Artist, [
+    {'id': i, 'name': 'Artist %d' % i, 'city': 'City', 'state': 'CA'}
+    for i in range(start + 1, stop + 1)
+  ])
+  db.session.bulk_insert_mappings(Show, [
+    {
+      'venue_id': rng.randint(1, stop),
+      'artist_id': rng.randint(1, stop),
+      'start_date': now + timedelta(days=rng.randint(-365, 365)),
+    }
+    for _ in range(start * SHOWS_PER_ROW, stop * SHOWS_PER_ROW)
+  ])
+  db.session.commit()
+
+
+def check_counts(db, Show, results, fk):
+  # Recomputes the upcoming show counts of a result page the slow way.
+  now = datetime.now()
+  ids = [row['id'] for row in results['data']]
+  expected = Counter(
+    getattr(show, fk) for show in Show.query.filter(getattr(Show, fk).in_(ids)).all()
+    if show.start_date >= now
+  )
+  for row in results['data']:
+    assert row['num_upcoming_shows'] == expected[row['id']], row
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue, Artist, Show
+  import counters
+  import fulltext
+  import queries
+  client = app.test_client()
+
+  seeded = 0
+  counts = []
+  for size in SIZES:
+    seed(db, Venue, Artist, Show, seeded, size)
+    counters.reconcile()
+    seeded = size
+    with app.test_request_context():
+      fulltext.refresh(Venue)
+      fulltext.refresh(Artist)
+
+    for path, term in (('/venues/search', 'venue'), ('/artists/search', 'artist')):
+      client.post(path, data={'search_term': term})
+      with count_queries() as counter:
+        response = client.post(path, data={'search_term': term, 'page': 2})
+      assert response.status_code == 200, response.status_code
+      counts.append(counter.count)
+
+      ms = timed(lambda: client.post(path, data={'search_term': term}))
+      print('%-16s rows=%-6d queries=%-3d best=%.1fms' % (path, size, counter.count, ms))
+
+    with app.test_request_context():
+      for search_results in (queries.search_results, fulltext.search_results):
+        venues = search_results(Venue, 'venue', page=2)
+        artists = search_results(Artist, 'ARTIST', page=2)
+        assert venues['count'] == size and artists['count'] == size
+        check_counts(db, Show, venues, 'venue_id')
+        check_counts(db, Show, artists, 'artist_id')
+
+  assert len(set(counts)) == 1, 'query count grew with data: %r' % counts
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,216 @@
+#----------------------------------------------------------------------------#
+# Latency and throughput of the app behind each worker model.
+#
+# The database is seeded once, then every available server is started on it
+# in turn with the production settings and driven by CONCURRENCY keep-alive
+# HTTP clients (asyncio, no dependencies) for DURATION seconds, over list,
+# search and detail pages. Reports p50/p95/p99 and requests per second:
+#
+#   python benchmarks/bench_serving.py
+#
+#   werkzeug          the development server of app.run(), a thread per request
+#   gunicorn-sync     WORKERS processes, one request each
+#   gunicorn-gthread  WORKERS processes of THREADS threads
+#   gunicorn-gevent   WORKERS processes of greenlets
+#
+# The gunicorn models are skipped when gunicorn (or gevent) is not installed,
+# or when CACHE_REDIS_URL is not set: several workers share the page cache
+# through Redis. The development server keeps it in memory.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import importlib.util
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+from support import create_bench_app
+
+VENUES = ARTISTS = 1000
+SHOWS = 10000
+WORKERS = 2
+THREADS = 4
+CONCURRENCY = 32
+WARMUP = 1.0
+DURATION = 10.0
+SEED = 0
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def requests(rng):
+  # An endless mix of (method, path, form body) requests.
+  from seeder import ADJECTIVES, VENUE_NOUNS, ARTIST_NOUNS
+  while True:
+    yield 'GET', '/venues', None
+    yield 'GET', '/shows', None
+    yield 'GET', '/venues/%d' % rng.randint(1, VENUES), None
+    yield 'GET', '/artists/%d' % rng.randint(1, ARTISTS), None
+    yield 'POST', '/venues/search', {'search_term': rng.choice(VENUE_NOUNS)}
+    yield 'POST', '/artists/search', {'search_term': '%s %s' % (rng.choice(ADJECTIVES), rng.choice(ARTIST_NOUNS))}
+
+
+def servers(port):
+  # (name, command, extra environment) of every available worker model.
+  address = '127.0.0.1:%d' % port
+  found = [('werkzeug', [
+    sys.executable, '-c',
+    'from werkzeug.serving import run_simple; from wsgi import app; '
+    'run_simple("127.0.0.1", %d, app, threaded=True)' % port,
+  ], {'CACHE_BACKEND': 'memory'})]
+  if importlib.util.find_spec('gunicorn') is None or 'CACHE_REDIS_URL' not in os.environ:
+    return found
+  models = ['sync', 'gthread']
+  if importlib.util.find_spec('gevent') is not None:
+    models.append('gevent')
+  for model in models:
+    found.append(('gunicorn-' + model, [
+      sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', address, 'wsgi:app',
+    ], {
+      'CACHE_BACKEND': 'redis',
+      'FYYUR_WORKER_CLASS': model,
+      'WEB_CONCURRENCY': str(WORKERS),
+      'FYYUR_THREADS': str(THREADS),
+    }))
+  return found
+
+
+def free_port():
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+
+#  HTTP client
+#  ----------------------------------------------------------------
+
+class Client(object):
+  # One HTTP/1.1 connection, reopened when the server closes it.
+
+  def __init__(self, port):
+    self.port = port
+    self.reader = self.writer = None
+
+  async def request(self, method, path, form=None):
+    if self.writer is None:
+      self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+    body = urlencode(form).encode() if form else b''
+    head = '%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n' % (method, path, len(body))
+    if form:
+      head += 'Content-Type: application/x-www-form-urlencoded\r\n'
+    self.writer.write(head.encode() + b'\r\n' + body)
+
+    version, status = (await self.reader.readline()).split()[:2]
+    headers = {}
+    while True:
+      line = await self.reader.readline()
+      if line in (b'\r\n', b''):
+        break
+      name, _, value = line.decode('latin-1').partition(':')
+      headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+      while True:
+        size = int((await self.reader.readline()).split(b';')[0], 16)
+        await self.reader.readexactly(size + 2)
+        if not size:
+          break
+    elif 'content-length' in headers:
+      await self.reader.readexactly(int(headers['content-length']))
+    else:
+      await self.reader.read()
+      headers['connection'] = 'close'
+
+    if version != b'HTTP/1.1' or headers.get('connection') == 'close':
+      self.close()
+    return int(status)
+
+  def close(self):
+    if self.writer is not None:
+      self.writer.close()
+    self.reader = self.writer = None
+
+
+async def drive(port, seconds, seed):
+  # (latencies in ms, errors) of CONCURRENCY clients for `seconds`.
+  latencies = []
+  errors = [0]
+  deadline = time.perf_counter() + seconds
+
+  async def client_loop(n):
+    client = Client(port)
+    for method, path, form in requests(random.Random(seed * 1000 + n)):
+      if time.perf_counter() >= deadline:
+        break
+      started = time.perf_counter()
+      try:
+        status = await client.request(method, path, form)
+      except (OSError, ValueError, asyncio.IncompleteReadError):
+        status = None
+        client.close()
+      latencies.append((time.perf_counter() - started) * 1000)
+      if status != 200:
+        errors[0] += 1
+    client.close()
+
+  await asyncio.gather(*[client_loop(n) for n in range(CONCURRENCY)])
+  return latencies, errors[0]
+
+
+def percentile(ordered, fraction):
+  return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def wait_ready(port, process, timeout=30):
+  deadline = time.perf_counter() + timeout
+  while time.perf_counter() < deadline:
+    if process.poll() is not None:
+      raise RuntimeError('server exited with %d' % process.returncode)
+    try:
+      with socket.create_connection(('127.0.0.1', port), timeout=1):
+        return
+    except OSError:
+      time.sleep(0.1)
+  raise RuntimeError('server did not start')
+
+
+def main():
+  app, db = create_bench_app()
+  from seeder import seed_database
+  seed_database(VENUES, ARTISTS, SHOWS, seed=SEED)
+  db.session.remove()
+
+  environment = dict(
+    os.environ,
+    FYYUR_ENV='production',
+    DATABASE_URL=app.config['SQLALCHEMY_DATABASE_URI'],
+    SECRET_KEY='bench',
+    FYYUR_LOG_FILE='',
+    LOG_LEVEL='WARNING',
+    SQL_LOG_LEVEL='WARNING',
+    PYTHONWARNINGS='ignore',
+  )
+  print('%d clients, %.0fs per server' % (CONCURRENCY, DURATION))
+  port = free_port()
+  for name, command, extra in servers(port):
+    process = subprocess.Popen(command, cwd=ROOT, env=dict(environment, **extra),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      wait_ready(port, process)
+      asyncio.run(drive(port, WARMUP, SEED))
+      latencies, errors = asyncio.run(drive(port, DURATION, SEED))
+    finally:
+      process.terminate()
+      process.wait()
+    latencies.sort()
+    print('%-17s %6.0f req/s  p50=%6.1fms p95=%6.1fms p99=%6.1fms errors=%d' % (
+      name, len(latencies) / DURATION, percentile(latencies, 0.50), percentile(latencies, 0.95),
+      percentile(latencies, 0.99), errors))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,70 @@
+#----------------------------------------------------------------------------#
+# /shows must cost one query per page and stay flat as the Show table grows,
+# including for pages deep into the feed.
+#
+#   python benchmarks/bench_shows.py
+#----------------------------------------------------------------------------#
+
+from support import create_bench_app, count_queries, timed
+
+SIZES = [1000, 10000, 100000]
+VENUES = ARTISTS = 200
+
+
+def walk(queries, when, per_page):
+  # Every show of the feed, following next_cursor to the end.
+  seen = []
+  after = None
+  while True:
+    page = queries.shows_page(after=after, per_page=per_page, when=when)
+    seen.extend(show['start_time'] for show in page['shows'])
+    after = page['next_cursor']
+    if after is None:
+      return seen
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Show
+  from seeder import Seeder
+  import queries
+  client = app.test_client()
+
+  # Shows start on whole hours, so many share a start_date and the id
+  # tiebreak in the cursor is exercised.
+  seeder = Seeder(0)
+  seeder.venues(VENUES)
+  seeder.artists(ARTISTS)
+  seeded = 0
+  for size in SIZES:
+    seeder.shows(size - seeded)
+    seeded = size
+
+    with app.test_request_context():
+      middle = db.session.query(Show.start_date, Show.id) \
+        .order_by(Show.start_date, Show.id) \
+        .offset(size // 2) \
+        .first()
+      deep_cursor = queries.encode_show_cursor(middle.start_date, middle.id)
+
+    for label, path in (('first', '/shows'), ('middle', '/shows?after=' + deep_cursor)):
+      with count_queries() as counter:
+        response = client.get(path)
+      assert response.status_code == 200, response.status_code
+      assert counter.count == 1, counter.count
+
+      ms = timed(lambda: client.get(path))
+      print('shows=%-7d page=%-6s queries=%-3d best=%.1fms' % (size, label, counter.count, ms))
+
+  with app.test_request_context():
+    upcoming = walk(queries, 'upcoming', 1000)
+    past = walk(queries, 'past', 1000)
+    assert len(upcoming) + len(past) == SIZES[-1]
+    assert upcoming == sorted(upcoming) and past == sorted(past, reverse=True)
+
+  assert client.get('/shows?after=nonsense').status_code == 400
+  assert client.get('/shows?when=someday').status_code == 400
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,109 @@
+#----------------------------------------------------------------------------#
+# Cold start after a deploy: time to import the app and latency of the
+# first request to each page, in fresh processes, per template mode:
+#
+#   development        templates compiled on first use and re-checked on
+#                      every render
+#   production lazy    no auto-reload, compiled on first use
+#   production cold    precompiled at startup into an empty bytecode cache
+#                      (the first process after a deploy)
+#   production warm    precompiled at startup from the bytecode cache
+#                      (every later worker or restart)
+#
+#   python benchmarks/bench_startup.py
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from support import create_bench_app
+
+RUNS = 5
+PATHS = ['/venues', '/venues/1', '/artists/1', '/shows', '/venues/create', '/artists/create', '/shows/create']
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Run in each fresh process: prints startup and per-page timings as JSON.
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import config
+config.ProductionConfig.TEMPLATE_PRECOMPILE = %(precompile)r
+config.ProductionConfig.WARM_UP = %(precompile)r
+from app import app
+startup = (time.perf_counter() - started) * 1000
+client = app.test_client()
+first, second = {}, {}
+for timings in (first, second):
+  for path in %(paths)r:
+    started = time.perf_counter()
+    response = client.get(path)
+    response.data
+    timings[path] = (time.perf_counter() - started) * 1000
+    assert response.status_code == 200, (path, response.status_code)
+print(json.dumps({'startup': startup, 'first': first, 'second': second}))
+'''
+
+MODES = [
+  ('development', 'development', False, False),
+  ('production lazy', 'production', False, False),
+  ('production cold', 'production', True, True),
+  ('production warm', 'production', True, False),
+]
+
+
+def run(environment, precompile):
+  output = subprocess.check_output(
+    [sys.executable, '-c', CHILD % {'precompile': precompile, 'paths': PATHS}],
+    cwd=ROOT, env=environment, stderr=subprocess.DEVNULL,
+  )
+  return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def median(values):
+  values = sorted(values)
+  return values[len(values) // 2]
+
+
+def main():
+  app, db = create_bench_app()
+  from seeder import seed_database
+  seed_database(200, 200, 2000, seed=1)
+  db.session.remove()
+
+  cache_dir = tempfile.mkdtemp(prefix='fyyur-jinja-')
+  base = dict(
+    os.environ,
+    DATABASE_URL=app.config['SQLALCHEMY_DATABASE_URI'],
+    SECRET_KEY='bench',
+    FYYUR_LOG_FILE='',
+    FYYUR_TEMPLATE_CACHE_DIR=cache_dir,
+    CACHE_BACKEND='memory',
+    LOG_LEVEL='WARNING',
+    SQL_LOG_LEVEL='WARNING',
+    PYTHONWARNINGS='ignore',
+  )
+  print('%-16s %9s %13s %13s %13s' % ('', 'startup', 'first pages', 'slowest first', 'warm pages'))
+  try:
+    for name, env_name, precompile, clear_cache in MODES:
+      results = []
+      for _ in range(RUNS):
+        if clear_cache:
+          shutil.rmtree(cache_dir, ignore_errors=True)
+        results.append(run(dict(base, FYYUR_ENV=env_name), precompile))
+      print('%-16s %7.1fms %11.1fms %11.1fms %11.1fms' % (
+        name,
+        median([r['startup'] for r in results]),
+        median([sum(r['first'].values()) for r in results]),
+        median([max(r['first'].values()) for r in results]),
+        median([sum(r['second'].values()) for r in results]),
+      ))
+  finally:
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+  main()
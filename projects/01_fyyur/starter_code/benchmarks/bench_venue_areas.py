@@ -0,0 +1,42 @@
+#----------------------------------------------------------------------------#
+# /venues must cost the same number of queries however many venues, cities
+# and shows exist.
+#
+#   python benchmarks/bench_venue_areas.py
+#----------------------------------------------------------------------------#
+
+from support import create_bench_app, count_queries, timed
+
+SIZES = [100, 1000, 5000]
+SHOWS_PER_VENUE = 3
+
+
+def main():
+  app, db = create_bench_app()
+  from seeder import Seeder
+  import counters
+  client = app.test_client()
+
+  # Venues only: their shows have no artist.
+  seeder = Seeder(0)
+  seeded = 0
+  counts = []
+  for size in SIZES:
+    seeder.venues(size - seeded)
+    seeder.shows((size - seeded) * SHOWS_PER_VENUE)
+    counters.reconcile()
+    seeded = size
+
+    with count_queries() as counter:
+      response = client.get('/venues')
+    assert response.status_code == 200, response.status_code
+    counts.append(counter.count)
+
+    ms = timed(lambda: client.get('/venues'))
+    print('venues=%-6d queries=%-3d best=%.1fms' % (size, counter.count, ms))
+
+  assert len(set(counts)) == 1, 'query count grew with data: %r' % counts
+
+
+if __name__ == '__main__':
+  main()
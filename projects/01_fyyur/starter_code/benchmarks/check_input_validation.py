@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# Submits malformed input to the bulk and edit endpoints and the importer,
+# and fails if any of it is guessed at and written instead of rejected, or
+# rejected for the wrong reason.
+#
+#   python benchmarks/check_input_validation.py
+#----------------------------------------------------------------------------#
+
+import io
+import json
+
+from support import create_bench_app
+
+VENUES = 20
+
+
+def main():
+  app, db = create_bench_app()
+  from models import Venue
+  from seeder import Seeder
+  client = app.test_client()
+
+  seeder = Seeder(5)
+  seeder.venues(VENUES)
+  seeder.finish()
+
+  def venue_ids():
+    return {venue_id for venue_id, in db.session.query(Venue.id)}
+
+  # Bulk ids: a list of integers, or of digit strings from a form.
+  for ids in ('15', [True], [1.7], ['1x'], [None], {'1': 1}, []):
+    response = client.delete('/venues', data=json.dumps({'ids': ids}), content_type='application/json')
+    assert response.status_code == 400, (ids, response.status_code)
+  assert venue_ids() == set(range(1, VENUES + 1))
+  response = client.delete('/venues', data={'ids': ['15', '5']})
+  assert response.status_code == 200 and response.get_json()['deleted'] == 2, response.get_data()
+  assert venue_ids() == set(range(1, VENUES + 1)) - {5, 15}
+  print('bulk ids ok')
+
+  # Edits go through the venue form: nothing is written when it fails.
+  venue = Venue.query.get(1)
+  before = (venue.name, venue.state)
+  data = {
+    'name': '', 'city': 'Denver', 'state': 'ZZ', 'address': '1 Main Street',
+    'phone': '', 'genres': ['Jazz'], 'facebook_link': '',
+  }
+  response = client.post('/venues/1/edit', data=data)
+  assert response.status_code == 400, response.status_code
+  page = response.get_data(as_text=True)
+  assert 'name: This field is required.' in page and 'state: Not a valid choice' in page
+  db.session.expire_all()
+  venue = Venue.query.get(1)
+  assert (venue.name, venue.state) == before, (venue.name, venue.state)
+
+  data.update(name='The Renamed Room', state='CO')
+  assert client.post('/venues/1/edit', data=data).status_code == 302
+  db.session.expire_all()
+  venue = Venue.query.get(1)
+  assert (venue.name, venue.state, venue.facebook_link) == ('The Renamed Room', 'CO', ''), venue.facebook_link
+  assert client.post('/venues/%d/edit' % (VENUES + 1), data=data).status_code == 404
+  print('edit ok')
+
+  # Imported rows get the form errors: a row without genres is missing
+  # them, not holding an invalid one.
+  import importer
+  rejected = {}
+  rows = '\n'.join([
+    '{"name": "No Genres", "city": "Denver", "state": "CO", "address": "1 Main Street"}',
+    '{"name": "Empty Genres", "city": "Denver", "state": "CO", "address": "1 Main Street", "genres": []}',
+    '{"name": "Bad Genre", "city": "Denver", "state": "CO", "address": "1 Main Street", "genres": ["Polka"]}',
+  ])
+  with app.test_request_context():
+    report = importer.run_import('venues', io.StringIO(rows), format='jsonl', on_reject=rejected.__setitem__)
+  assert report.loaded == 0, str(report)
+  assert rejected[1] == rejected[2] == {'genres': ['This field is required.']}, rejected
+  assert rejected[3] == {'genres': ["'Polka' is not a valid choice for this field"]}, rejected
+  print('import ok')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,40 @@
+#----------------------------------------------------------------------------#
+# Submits the create forms against a database made by db.create_all() (no
+# migrations run) with query budgets enforced, and fails if any of them
+# errors or goes over its budget.
+#
+#   python benchmarks/check_query_budgets.py
+#----------------------------------------------------------------------------#
+
+from support import create_bench_app, count_queries
+
+SUBMISSIONS = [
+  ('/venues/create', {
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+    'phone': '123-123-1234', 'genres': ['Jazz'], 'facebook_link': '',
+  }),
+  ('/artists/create', {
+    'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA', 'phone': '', 'genres': ['Jazz'],
+    'facebook_link': '',
+  }),
+  ('/shows/create', {'venue_id': '1', 'artist_id': '1', 'start_time': '2035-04-01 20:00:00'}),
+]
+
+
+def main():
+  app, db = create_bench_app()
+  app.config['QUERY_BUDGET_ENFORCE'] = True
+  client = app.test_client()
+
+  for path, data in SUBMISSIONS:
+    with count_queries() as counter:
+      response = client.post(path, data=data)
+    assert response.status_code == 200, (path, response.status_code)
+    print('%-16s %2d queries' % (path, counter.count))
+
+  from models import Show
+  assert db.session.query(Show).count() == 1
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,150 @@
+#----------------------------------------------------------------------------#
+# Runs EXPLAIN on every query issued by the list, search and detail routes
+# against a seeded database built from the migrations, and fails if any of
+# them scans a hot table sequentially.
+#
+#   python benchmarks/check_query_plans.py
+#   FYYUR_BENCH_DATABASE_URL=postgresql://localhost/fyyur_bench \
+#     python benchmarks/check_query_plans.py
+#
+# On Postgres the plans are taken with enable_seqscan off, so a Seq Scan
+# only shows up when no index can serve the query at all.
+#----------------------------------------------------------------------------#
+
+import re
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from support import create_bench_app
+
+# Tables that grow with bookings and must always be reached through an index.
+HOT_TABLES = {'Show', 'Genre', 'venue_genre', 'artist_genre'}
+
+# (method, path, form data, tables only Postgres can index for this route).
+ROUTES = [
+  ('GET', '/venues', None, set()),
+  ('POST', '/venues/search', {'search_term': 'hop'}, {'Venue'}),
+  ('GET', '/venues/1', None, set()),
+  ('GET', '/artists', None, set()),
+  ('POST', '/artists/search', {'search_term': 'band'}, {'Artist'}),
+  ('GET', '/artists/1', None, set()),
+  ('GET', '/shows', None, set()),
+  ('GET', '/shows?when=upcoming', None, set()),
+  ('GET', '/shows?when=past', None, set()),
+  ('GET', '/venues/nearby?city=San+Francisco&state=CA', None, {'Venue'}),
+  ('GET', '/api/v1/venues/1', None, set()),
+  ('GET', '/api/v1/artists/1', None, set()),
+  ('GET', '/api/v1/shows?when=upcoming', None, set()),
+]
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on "?(\w+)"?')
+
+
+def seed(db, Venue, Artist, Show, Genre):
+  now = datetime.now()
+  # In place of the genres create_all() seeds.
+  db.session.query(Genre).delete()
+  db.session.bulk_insert_mappings(Genre, [{'id': 1, 'name': 'Jazz'}])
+  db.session.bulk_insert_mappings(Venue, [
+    {'id': i, 'name': 'The Musical Hop %d' % i, 'city': 'City %d' % (i % 50), 'state': 'CA', 'address': 'Main Street', 'seeking_talent': False}
+    for i in range(1, 501)
+  ])
+  db.session.bulk_insert_mappings(Artist, [
+    {'id': i, 'name': 'The Wild Sax Band %d' % i, 'city': 'City', 'state': 'CA', 'seeking_venue': False}
+    for i in range(1, 501)
+  ])
+  db.session.bulk_insert_mappings(Show, [
+    {'venue_id': i % 500 + 1, 'artist_id': i * 7 % 500 + 1, 'start_date': now + timedelta(hours=i - 5000)}
+    for i in range(10000)
+  ])
+  db.session.execute("INSERT INTO venue_genre (venue_id, genre_id) VALUES (1, 1)")
+  db.session.execute("INSERT INTO artist_genre (artist_id, genre_id) VALUES (1, 1)")
+  db.session.commit()
+
+
+def capture_selects(engine, run):
+  statements = []
+
+  def record(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith('SELECT'):
+      statements.append((statement, parameters))
+
+  event.listen(engine, 'before_cursor_execute', record)
+  try:
+    run()
+  finally:
+    event.remove(engine, 'before_cursor_execute', record)
+  return statements
+
+
+def sequential_scans(engine, statement, parameters):
+  # Tables scanned sequentially by the plan of one captured statement.
+  connection = engine.raw_connection()
+  try:
+    cursor = connection.cursor()
+    if engine.dialect.name == 'postgresql':
+      cursor.execute('SET enable_seqscan = off')
+      cursor.execute('EXPLAIN ' + statement, parameters)
+      lines = [row[0] for row in cursor.fetchall()]
+      matches = (POSTGRES_SCAN.search(line) for line in lines)
+    else:
+      cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+      lines = [row[-1] for row in cursor.fetchall()]
+      matches = (SQLITE_SCAN.match(line) for line in lines)
+    return {match.group(1) for match in matches if match}, lines
+  finally:
+    connection.rollback()
+    connection.close()
+
+
+def main():
+  app, db = create_bench_app()
+  from flask_migrate import upgrade
+  from models import Venue, Artist, Show, Genre
+  import counters
+  import fulltext
+
+  # Build the schema from the migrations so their indexes are what is checked.
+  with app.app_context():
+    db.drop_all()
+    db.engine.execute('DROP TABLE IF EXISTS alembic_version')
+    upgrade()
+  seed(db, Venue, Artist, Show, Genre)
+  counters.reconcile()
+  if db.engine.dialect.name == 'postgresql':
+    db.engine.execute('ANALYZE')
+
+  # The in-memory search index is read in full once per process; build it
+  # up front so only per-request queries are checked.
+  with app.test_request_context():
+    fulltext.refresh(Venue)
+    fulltext.refresh(Artist)
+    fulltext.search_results(Venue, 'hop')
+    fulltext.search_results(Artist, 'band')
+
+  client = app.test_client()
+  failures = 0
+  for method, path, data, postgres_hot in ROUTES:
+    hot = HOT_TABLES | (postgres_hot if db.engine.dialect.name == 'postgresql' else set())
+    statements = capture_selects(db.engine, lambda: client.open(path, method=method, data=data))
+    for statement, parameters in statements:
+      scanned, plan = sequential_scans(db.engine, statement, parameters)
+      bad = scanned & hot
+      status = 'FAIL' if bad else 'ok'
+      print('%-4s %-4s %s' % (status, method, path))
+      if bad:
+        failures += 1
+        print('     sequential scan on %s' % ', '.join(sorted(bad)))
+        print('     ' + ' '.join(statement.split()))
+        for line in plan:
+          print('       ' + line)
+
+  if failures:
+    sys.exit('%d queries scan a hot table' % failures)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,68 @@
+#----------------------------------------------------------------------------#
+# Shared helpers for the Fyyur benchmarks and checks.
+#
+# By default they run against a throwaway SQLite database so they can be
+# executed without a local Postgres:
+#
+#   python benchmarks/bench_venue_areas.py
+#
+# Set FYYUR_BENCH_DATABASE_URL to run them against another database instead.
+# Its tables are dropped and recreated. The app loads the testing settings
+# unless FYYUR_ENV says otherwise.
+#----------------------------------------------------------------------------#
+
+import atexit
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('FYYUR_ENV', 'testing')
+
+
+def bench_database_url():
+  url = os.environ.get('FYYUR_BENCH_DATABASE_URL')
+  if url:
+    return url
+  fd, path = tempfile.mkstemp(prefix='fyyur-bench-', suffix='.db')
+  os.close(fd)
+  atexit.register(os.remove, path)
+  return 'sqlite:///' + path
+
+
+def create_bench_app(page_cache=False):
+  # Imports the app bound to an empty benchmark database. The page cache is
+  # off unless asked for, so that every request reaches the database.
+  from app import app
+  from models import db
+  from cache import page_cache as cache
+  cache.enabled = page_cache
+  cache.clear()
+  app.config['SQLALCHEMY_DATABASE_URI'] = bench_database_url()
+  app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+  app.config['WTF_CSRF_ENABLED'] = False
+  app.config['TESTING'] = True
+  logging.getLogger('fyyur.sql').setLevel(logging.WARNING)
+  db.drop_all()
+  db.create_all()
+  return app, db
+
+
+def count_queries():
+  # Stats (count, milliseconds, fingerprints) of the statements this thread
+  # runs inside the block, test client requests included.
+  from instrumentation import capture
+  return capture()
+
+
+def timed(fn, repeat=5):
+  # Best wall-clock time of `repeat` calls, in milliseconds.
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    best = elapsed if best is None else min(best, elapsed)
+  return best
@@ -0,0 +1,158 @@
+#----------------------------------------------------------------------------#
+# Show booking rules.
+#
+# Every show occupies its venue and its artist for SHOW_LENGTH from its
+# start. Two shows of the same venue (or artist) overlap exactly when their
+# starts are less than SHOW_LENGTH apart, so a conflict check is a bounded
+# range scan of the (venue_id, date) / (artist_id, date) indexes rather than
+# an interval search over every show.
+#
+# On Postgres the same rule is enforced by exclusion constraints over
+# tsrange(date, date + SHOW_LENGTH) (migration 1d6f0a3c5b27), which catch
+# concurrent bookings the check cannot see. Other databases serialize the
+# check and the insert with a process-local lock instead.
+#----------------------------------------------------------------------------#
+
+import bisect
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import and_
+
+from models import db, Show
+from datetimes import format_datetime
+
+# Keep in sync with the exclusion constraints of migration 1d6f0a3c5b27.
+SHOW_LENGTH = timedelta(hours=2)
+
+EXCLUSION_VIOLATION = '23P01'
+CONSTRAINTS = {
+  'Show_venue_id_overlap_excl': 'venue',
+  'Show_artist_id_overlap_excl': 'artist',
+}
+
+_lock = threading.Lock()
+
+
+class BookingConflict(Exception):
+  pass
+
+
+def overlapping(start_date, length=SHOW_LENGTH):
+  return and_(Show.start_date > start_date - length, Show.start_date < start_date + length)
+
+
+def find_conflict(venue_id, artist_id, start_date):
+  # ('venue' or 'artist', the conflicting Show), or None. One index range
+  # lookup per side.
+  for side, column, value in (('venue', Show.venue_id, venue_id), ('artist', Show.artist_id, artist_id)):
+    if value is None:
+      continue
+    show = Show.query \
+      .filter(column == int(value), overlapping(start_date)) \
+      .order_by(Show.start_date) \
+      .first()
+    if show is not None:
+      return side, show
+  return None
+
+
+def check_available(venue_id, artist_id, start_date):
+  conflict = find_conflict(venue_id, artist_id, start_date)
+  if conflict is not None:
+    side, show = conflict
+    raise BookingConflict('the {} is already booked for a show on {}'.format(
+      side, format_datetime(show.start_date, 'full')))
+
+
+@contextmanager
+def reserve(venue_id, artist_id, start_date):
+  # Checks that the slot is free; the caller inserts and commits the show
+  # inside the block.
+  if db.session.bind.dialect.name == 'postgresql':
+    check_available(venue_id, artist_id, start_date)
+    yield
+    return
+  with _lock:
+    check_available(venue_id, artist_id, start_date)
+    yield
+
+
+def conflict_message(error):
+  # The reason a booking was refused, or None when `error` is not a
+  # booking conflict.
+  if isinstance(error, BookingConflict):
+    return str(error)
+  if isinstance(error, IntegrityError) and getattr(error.orig, 'pgcode', None) == EXCLUSION_VIOLATION:
+    side = CONSTRAINTS.get(error.orig.diag.constraint_name, 'venue or artist')
+    return 'the {} is already booked at that time'.format(side)
+  return None
+
+
+class BookingIndex(object):
+  # Sorted show starts per venue and per artist, for checking many bookings
+  # at once (bulk imports): loaded with one query per side, then every
+  # check is a binary search.
+
+  def __init__(self, length=SHOW_LENGTH):
+    self.length = length
+    self.starts = {'venue': {}, 'artist': {}}
+
+  def load(self, venue_ids, artist_ids, first, last):
+    # The shows of these venues and artists that can block a booking
+    # starting between `first` and `last`.
+    for side, column, ids in (('venue', Show.venue_id, venue_ids), ('artist', Show.artist_id, artist_ids)):
+      starts = self.starts[side]
+      for entity_id in ids:
+        starts.setdefault(entity_id, [])
+      if not ids:
+        continue
+      rows = db.session.query(column, Show.start_date) \
+        .filter(column.in_(ids), Show.start_date > first - self.length, Show.start_date < last + self.length) \
+        .order_by(column, Show.start_date)
+      for entity_id, start_date in rows:
+        starts[entity_id].append(start_date)
+
+  def conflict(self, venue_id, artist_id, start_date):
+    # 'venue' or 'artist' when the booking overlaps a loaded or added show.
+    for side, entity_id in (('venue', venue_id), ('artist', artist_id)):
+      starts = self.starts[side].get(entity_id, ())
+      i = bisect.bisect_right(starts, start_date - self.length)
+      if i < len(starts) and starts[i] < start_date + self.length:
+        return side
+    return None
+
+  def add(self, venue_id, artist_id, start_date):
+    for side, entity_id in (('venue', venue_id), ('artist', artist_id)):
+      bisect.insort(self.starts[side].setdefault(entity_id, []), start_date)
+
+
+def free_slots(column, ids, start, end, length=SHOW_LENGTH):
+  # {id: [(first, last), ...]} for every venue or artist in `ids` (column is
+  # Show.venue_id or Show.artist_id): the ranges of start times between
+  # `start` and `end` at which a show can still be booked. One query for
+  # all ids, over the shows that can block that period.
+  rows = db.session.query(column, Show.start_date) \
+    .filter(column.in_(ids), Show.start_date > start - length, Show.start_date < end + length) \
+    .order_by(column, Show.start_date) \
+    .all()
+
+  booked = {entity_id: [] for entity_id in ids}
+  for entity_id, start_date in rows:
+    booked[entity_id].append(start_date)
+
+  slots = {}
+  for entity_id, starts in booked.items():
+    free = []
+    first = start
+    for booked_start in starts:
+      last = booked_start - length
+      if last >= first and first <= end:
+        free.append((first, min(last, end)))
+      first = max(first, booked_start + length)
+    if first <= end:
+      free.append((first, end))
+    slots[entity_id] = free
+  return slots
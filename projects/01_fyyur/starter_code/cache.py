@@ -0,0 +1,178 @@
+#----------------------------------------------------------------------------#
+# Rendered page cache.
+#
+# Pages that only change when a create, edit or delete handler runs are
+# cached under a key naming the route and, for detail pages, the entity id
+# (see the *_key helpers). Those handlers invalidate exactly the keys they
+# affect; the TTL bounds how stale "upcoming" counts can get as shows pass.
+#
+# Backends:
+#   memory  in-process LRU dict (default); only for a single process,
+#           since the other processes would keep serving what a write
+#           invalidated until the TTL runs out
+#   redis   any Redis-compatible server at CACHE_REDIS_URL; needs `redis`
+#           (the production default)
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, session
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def venues_key():
+  return 'venues'
+
+
+def artists_key():
+  return 'artists'
+
+
+def venue_key(venue_id):
+  return 'venue:{}'.format(venue_id)
+
+
+def artist_key(artist_id):
+  return 'artist:{}'.format(artist_id)
+
+
+class MemoryBackend(object):
+  # LRU dict of key -> (expires_at, value).
+
+  def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+    self.max_entries = max_entries
+    self.entries = OrderedDict()
+    self.lock = threading.Lock()
+
+  def get(self, key):
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is None:
+        return None
+      if entry[0] <= time.monotonic():
+        del self.entries[key]
+        return None
+      self.entries.move_to_end(key)
+      return entry[1]
+
+  def set(self, key, value, ttl):
+    with self.lock:
+      self.entries[key] = (time.monotonic() + ttl, value)
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+
+  def delete(self, *keys):
+    with self.lock:
+      for key in keys:
+        self.entries.pop(key, None)
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+
+
+class RedisBackend(object):
+  # Eviction is left to the server's maxmemory-policy.
+
+  def __init__(self, client, prefix='fyyur:page:'):
+    self.client = client
+    self.prefix = prefix
+
+  def get(self, key):
+    value = self.client.get(self.prefix + key)
+    return value.decode('utf-8') if value is not None else None
+
+  def set(self, key, value, ttl):
+    self.client.setex(self.prefix + key, ttl, value.encode('utf-8'))
+
+  def delete(self, *keys):
+    if keys:
+      self.client.delete(*[self.prefix + key for key in keys])
+
+  def clear(self):
+    keys = list(self.client.scan_iter(match=self.prefix + '*'))
+    if keys:
+      self.client.delete(*keys)
+
+
+class PageCache(object):
+
+  def __init__(self, backend=None, ttl=DEFAULT_TTL):
+    self.backend = backend or MemoryBackend()
+    self.ttl = ttl
+    self.enabled = True
+    self.hits = 0
+    self.misses = 0
+    self.lock = threading.Lock()
+
+  def init_app(self, app):
+    kind = app.config.get('CACHE_BACKEND', 'memory')
+    if kind == 'memory':
+      self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    elif kind == 'redis':
+      import redis
+      self.backend = RedisBackend(redis.from_url(app.config['CACHE_REDIS_URL']))
+    else:
+      raise ValueError('unknown CACHE_BACKEND: {}'.format(kind))
+    self.ttl = app.config.get('CACHE_TTL', DEFAULT_TTL)
+    self.enabled = app.config.get('CACHE_ENABLED', True)
+
+  def get(self, key):
+    value = self.backend.get(key)
+    with self.lock:
+      if value is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+    return value
+
+  def set(self, key, value):
+    self.backend.set(key, value, self.ttl)
+
+  def invalidate(self, *keys):
+    self.backend.delete(*keys)
+
+  def clear(self):
+    self.backend.clear()
+    with self.lock:
+      self.hits = self.misses = 0
+
+  def stats(self):
+    with self.lock:
+      return {'hits': self.hits, 'misses': self.misses}
+
+  def cached(self, key_for):
+    # Decorator for views returning rendered HTML. `key_for` receives the
+    # view arguments. A request with pending flash messages bypasses the
+    # cache, since the layout renders and consumes them.
+    def decorator(view):
+      @wraps(view)
+      def wrapper(*args, **kwargs):
+        if not self.enabled or session.get('_flashes'):
+          return view(*args, **kwargs)
+
+        key = key_for(*args, **kwargs)
+        body = self.get(key)
+        status = 'HIT'
+        if body is None:
+          body = view(*args, **kwargs)
+          self.set(key, body)
+          status = 'MISS'
+        response = make_response(body)
+        response.headers['X-Cache'] = status
+        return response
+      return wrapper
+    return decorator
+
+
+page_cache = PageCache()
+
+
+def setup_cache(app):
+  page_cache.init_app(app)
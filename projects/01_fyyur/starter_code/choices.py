@@ -0,0 +1,46 @@
+#----------------------------------------------------------------------------#
+# Choice lists of the select fields in forms.py.
+#
+# A ChoiceSet is built once and shared by every form instance: fields read
+# its (value, label) pairs instead of copying them per form, validate
+# submitted values against its frozenset, and render its <option> tags
+# pre-rendered in both states. States are fixed; genres come from
+# genre_registry.genre_choices().
+#----------------------------------------------------------------------------#
+
+from wtforms.widgets import Select
+
+
+class ChoiceSet(object):
+
+  def __init__(self, values):
+    values = tuple(values)
+    self.choices = tuple((value, value) for value in values)
+    self.values = frozenset(values)
+    # (value, <option> tag, selected <option> tag)
+    self.options = tuple(
+      (value, Select.render_option(value, label, False), Select.render_option(value, label, True))
+      for value, label in self.choices
+    )
+
+  def __contains__(self, value):
+    return value in self.values
+
+  def __len__(self):
+    return len(self.choices)
+
+
+STATES = ChoiceSet((
+  'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID',
+  'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM',
+  'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'PA',
+  'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+))
+
+# The genres a new database starts with: inserted by the Genre migration
+# and by db.create_all() (see models.py), offered by the forms until then.
+DEFAULT_GENRES = (
+  'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+  'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+  'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other',
+)
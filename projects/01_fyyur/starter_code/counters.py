@@ -0,0 +1,181 @@
+#----------------------------------------------------------------------------#
+# Denormalized show counters.
+#
+# Venue and Artist carry upcoming_shows_count and past_shows_count so that
+# list pages read plain columns instead of aggregating Show. A show counts
+# as past once it starts before the CounterState watermark:
+#
+#   record_show() / forget_show()  adjust the counters in the caller's
+#                                  transaction when a show is added/removed
+#   record_shows()                 same as record_show() for a batch of shows
+#   forget_shows()                 same as forget_show() for every show
+#                                  matching a condition, set-based
+#   roll_over()                    moves shows that started since the last
+#                                  run from upcoming to past, then advances
+#                                  the watermark (run it periodically)
+#   reconcile()                    rebuilds every counter from Show
+#
+# The last two bump the collection versions (versions.py) when the
+# counters change, since API responses are split at the watermark.
+#
+# The watermark row is locked by roll_over() and reconcile() and share
+# locked by the record/forget functions, so no show is counted on the
+# wrong side of a concurrent roll-over.
+#----------------------------------------------------------------------------#
+
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy.sql import and_, bindparam, func, select
+from models import db, Venue, Artist, Show, CounterState
+import versions
+
+STATE_ID = 1
+
+
+def counted(model):
+  # (model, the Show column pointing at it)
+  return (model, Show.venue_id if model is Venue else Show.artist_id)
+
+
+COUNTED = [counted(Venue), counted(Artist)]
+
+
+def watermark(lock=False, share=False):
+  query = db.session.query(CounterState)
+  if lock or share:
+    query = query.with_for_update(read=share)
+  return query.get(STATE_ID)
+
+
+def counter_column(start_date, rolled_at):
+  return 'upcoming_shows_count' if start_date >= rolled_at else 'past_shows_count'
+
+
+def shared_watermark():
+  state = watermark(share=True)
+  return state.rolled_at if state is not None else datetime.now()
+
+
+def adjust(venue_id, artist_id, start_date, step):
+  column = counter_column(start_date, shared_watermark())
+  for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+    if entity_id is None:
+      continue
+    db.session.query(model) \
+      .filter(model.id == entity_id) \
+      .update({column: getattr(model, column) + step}, synchronize_session=False)
+
+
+def record_show(venue_id, artist_id, start_date):
+  adjust(venue_id, artist_id, start_date, 1)
+
+
+def forget_show(venue_id, artist_id, start_date):
+  adjust(venue_id, artist_id, start_date, -1)
+
+
+def record_shows(shows):
+  # Bulk record_show() for (venue_id, artist_id, start_date) tuples: one
+  # executemany UPDATE per model and counter column.
+  rolled_at = shared_watermark()
+  for (model, _), position in zip(COUNTED, (0, 1)):
+    steps = Counter(
+      (show[position], counter_column(show[2], rolled_at))
+      for show in shows
+      if show[position] is not None
+    )
+    table = model.__table__
+    for column in ('upcoming_shows_count', 'past_shows_count'):
+      params = [
+        {'entity_id': entity_id, 'step': step}
+        for (entity_id, name), step in steps.items()
+        if name == column
+      ]
+      if params:
+        db.session.execute(
+          table.update()
+            .where(table.c.id == bindparam('entity_id'))
+            .values({column: table.c[column] + bindparam('step')}),
+          params,
+        )
+
+
+def forget_shows(condition, models=(Venue, Artist)):
+  # Set-based forget_show() for the shows matching `condition`, before they
+  # are deleted: one UPDATE per model, of the rows those shows point at.
+  rolled_at = shared_watermark()
+  for model, fk in COUNTED:
+    if model not in models:
+      continue
+    table = model.__table__
+    shows_here = lambda when: select([func.count(Show.id)]) \
+      .where(and_(fk == table.c.id, condition, when)) \
+      .as_scalar()
+    db.session.execute(
+      table.update()
+        .where(table.c.id.in_(select([fk]).where(condition)))
+        .values(
+          upcoming_shows_count=table.c.upcoming_shows_count - shows_here(Show.start_date >= rolled_at),
+          past_shows_count=table.c.past_shows_count - shows_here(Show.start_date < rolled_at),
+        )
+    )
+
+
+def roll_over(now=None):
+  # Returns the number of shows moved from upcoming to past.
+  now = now or datetime.now()
+  state = watermark(lock=True)
+  if state is None:
+    db.session.rollback()
+    return reconcile(now)
+  if now <= state.rolled_at:
+    db.session.rollback()
+    return 0
+
+  passed = and_(Show.start_date >= state.rolled_at, Show.start_date < now)
+  moved = db.session.query(func.count(Show.id)).filter(passed).scalar()
+  for model, fk in COUNTED:
+    table = model.__table__
+    passed_here = select([func.count(Show.id)]) \
+      .where(and_(fk == table.c.id, passed)) \
+      .as_scalar()
+    db.session.execute(
+      table.update()
+        .where(table.c.id.in_(select([fk]).where(passed)))
+        .values(
+          upcoming_shows_count=table.c.upcoming_shows_count - passed_here,
+          past_shows_count=table.c.past_shows_count + passed_here,
+        )
+    )
+  if moved:
+    versions.bump(versions.VENUES, versions.ARTISTS, versions.SHOWS)
+  state.rolled_at = now
+  db.session.commit()
+  return moved
+
+
+def reconcile(now=None):
+  # Recomputes every counter from Show and moves the watermark to `now`.
+  # Returns the number of shows counted as past.
+  now = now or datetime.now()
+  state = watermark(lock=True)
+  if state is None:
+    state = CounterState(id=STATE_ID, rolled_at=now)
+    db.session.add(state)
+
+  for model, fk in COUNTED:
+    table = model.__table__
+    shows_here = lambda condition: select([func.count(Show.id)]) \
+      .where(and_(fk == table.c.id, condition)) \
+      .as_scalar()
+    db.session.execute(
+      table.update().values(
+        upcoming_shows_count=shows_here(Show.start_date >= now),
+        past_shows_count=shows_here(Show.start_date < now),
+      )
+    )
+  versions.bump(versions.VENUES, versions.ARTISTS, versions.SHOWS)
+  state.rolled_at = now
+  db.session.commit()
+  return db.session.query(func.count(Show.id)).filter(Show.start_date < now).scalar()
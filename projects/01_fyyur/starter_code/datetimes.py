@@ -0,0 +1,45 @@
+#----------------------------------------------------------------------------#
+# Date/time formatting for the templates.
+#
+# Equivalent to babel.dates.format_datetime() for the patterns Fyyur uses,
+# but each (format, locale) pair is parsed once and reused, and datetime
+# values are formatted as-is instead of round-tripping through strings.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import dateutil.parser
+from babel import Locale
+from babel.dates import LC_TIME, parse_pattern
+
+FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def formatter(format='medium', locale=None):
+  # Callable formatting one datetime with the named or literal pattern.
+  pattern = parse_pattern(FORMATS.get(format, format))
+  locale = Locale.parse(locale or LC_TIME)
+
+  def apply(value):
+    if isinstance(value, str):
+      value = dateutil.parser.parse(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+      # babel treats naive values as UTC without converting them.
+      value = value.replace(tzinfo=timezone.utc)
+    return pattern.apply(value, locale)
+  return apply
+
+
+def format_datetime(value, format='medium', locale=None):
+  return formatter(format, locale)(value)
+
+
+def format_datetimes(values, format='medium', locale=None):
+  # Batch variant of format_datetime() for a list of show times.
+  apply = formatter(format, locale)
+  return [apply(value) for value in values]
@@ -0,0 +1,250 @@
+#----------------------------------------------------------------------------#
+# Full-text search over venues and artists.
+#
+# Name, city, state and genres are indexed with decreasing weights. Every
+# word of the search term must match, the last one as a prefix of an indexed
+# word, and results are ranked by how strongly they match.
+#
+# On Postgres the index is the `search_vector` tsvector column (GIN indexed)
+# and ranking is ts_rank. Other databases, e.g. the SQLite benchmarks, use an
+# in-memory inverted index built on first use.
+#
+# Writes to Venue, Artist or their genres must call refresh() afterwards.
+#----------------------------------------------------------------------------#
+
+import heapq
+import re
+import threading
+from bisect import bisect_left
+
+from sqlalchemy import text
+from sqlalchemy.sql import func
+from models import db, Venue, Genre, venue_genre, artist_genre
+import queries
+
+WORD = re.compile(r'\w+', re.UNICODE)
+
+# Relative weight of each indexed field, as Postgres' A, B and C labels.
+NAME_WEIGHT = 1.0
+PLACE_WEIGHT = 0.4
+GENRE_WEIGHT = 0.2
+
+
+def tokenize(value):
+  return WORD.findall((value or '').lower())
+
+
+def is_postgres():
+  return db.engine.dialect.name == 'postgresql'
+
+
+def search_results(model, search_term, page=1, per_page=queries.SEARCH_RESULTS_PER_PAGE):
+  # Same result structure as queries.search_results(), ranked by relevance.
+  # An empty search term lists everything by name.
+  tokens = tokenize(search_term)
+  if not tokens:
+    return queries.search_results(model, '', page=page, per_page=per_page)
+
+  page = max(page, 1)
+  offset = (page - 1) * per_page
+  if is_postgres():
+    rows, count = postgres_search(model, tokens, offset, per_page)
+  else:
+    rows, count = memory_search(model, tokens, offset, per_page)
+
+  return {
+    "count": count,
+    "page": page,
+    "per_page": per_page,
+    "has_next": page * per_page < count,
+    "data": [
+      {
+        "id": row.id,
+        "name": row.name,
+        "num_upcoming_shows": row.num_upcoming_shows,
+      }
+      for row in rows
+    ],
+  }
+
+
+def refresh(model, ids=None):
+  # Re-indexes the given rows of `model`, or all of them.
+  if is_postgres():
+    statement = SEARCH_VECTOR_SQL.format(**linked_tables(model))
+    if ids is not None:
+      if not ids:
+        return
+      statement += ' WHERE id IN ({})'.format(', '.join(str(int(i)) for i in ids))
+    db.session.execute(text(statement))
+    db.session.commit()
+  else:
+    with _lock:
+      index = _memory_indexes.get(model)
+    if index is not None:
+      index.load(model, ids)
+
+
+def linked_tables(model):
+  if model is Venue:
+    return {'table': 'Venue', 'link': 'venue_genre', 'fk': 'venue_id'}
+  return {'table': 'Artist', 'link': 'artist_genre', 'fk': 'artist_id'}
+
+
+#  Postgres
+#  ----------------------------------------------------------------
+
+SEARCH_VECTOR_SQL = (
+  'UPDATE "{table}" SET search_vector = '
+  "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+  "setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B') || "
+  "setweight(to_tsvector('simple', coalesce(("
+  'SELECT string_agg(genre.name, \' \') FROM "Genre" genre '
+  'JOIN {link} link ON link.genre_id = genre.id '
+  'WHERE link.{fk} = "{table}".id'
+  "), '')), 'C')"
+)
+
+
+def postgres_search(model, tokens, offset, limit):
+  query = func.to_tsquery('simple', ' & '.join(tokens[:-1] + [tokens[-1] + ':*']))
+  matches = model.search_vector.op('@@')(query)
+  rank = func.ts_rank(model.search_vector, query)
+
+  rows = db.session.query(
+      model.id,
+      model.name,
+      model.upcoming_shows_count.label('num_upcoming_shows'),
+    ) \
+    .filter(matches) \
+    .order_by(rank.desc(), model.name, model.id) \
+    .limit(limit) \
+    .offset(offset) \
+    .all()
+
+  if offset == 0 and len(rows) < limit:
+    count = len(rows)
+  else:
+    count = db.session.query(func.count(model.id)).filter(matches).scalar()
+  return rows, count
+
+
+#  In-memory fallback
+#  ----------------------------------------------------------------
+
+class InvertedIndex(object):
+  # word -> {id: weight}, with the words kept sorted so that a prefix lookup
+  # is a bisect plus a walk over the matching words.
+
+  def __init__(self):
+    self.postings = {}
+    self.documents = {}
+    self.words = []
+    self.lock = threading.Lock()
+
+  def load(self, model, ids=None):
+    # (Re)indexes the given ids of `model`, or every row, in two queries.
+    links = venue_genre if model is Venue else artist_genre
+    fk = links.c.venue_id if model is Venue else links.c.artist_id
+
+    rows = db.session.query(model.id, model.name, model.city, model.state)
+    genres = db.session.query(fk, Genre.name).join(Genre, Genre.id == links.c.genre_id)
+    if ids is not None:
+      rows = rows.filter(model.id.in_(ids))
+      genres = genres.filter(fk.in_(ids))
+
+    genre_names = {}
+    for owner_id, name in genres.all():
+      genre_names.setdefault(owner_id, []).append(name)
+
+    with self.lock:
+      for doc_id in (ids if ids is not None else list(self.documents)):
+        self.remove(doc_id)
+      for row in rows.all():
+        weights = {}
+        for fields, weight in (
+            ([row.name], NAME_WEIGHT),
+            ([row.city, row.state], PLACE_WEIGHT),
+            (genre_names.get(row.id, []), GENRE_WEIGHT)):
+          for word in tokenize(' '.join(fields)):
+            weights[word] = max(weights.get(word, 0), weight)
+        self.add(row.id, row.name, weights)
+      self.words = sorted(self.postings)
+
+  def add(self, doc_id, name, weights):
+    self.documents[doc_id] = (name, weights)
+    for word, weight in weights.items():
+      self.postings.setdefault(word, {})[doc_id] = weight
+
+  def remove(self, doc_id):
+    document = self.documents.pop(doc_id, None)
+    if document is None:
+      return
+    for word in document[1]:
+      postings = self.postings[word]
+      del postings[doc_id]
+      if not postings:
+        del self.postings[word]
+
+  def lookup(self, token, prefix):
+    # {id: weight} of the documents containing `token`, or a word starting
+    # with it when `prefix` is set.
+    if not prefix:
+      return self.postings.get(token, {})
+    found = {}
+    i = bisect_left(self.words, token)
+    while i < len(self.words) and self.words[i].startswith(token):
+      for doc_id, weight in self.postings[self.words[i]].items():
+        found[doc_id] = max(found.get(doc_id, 0), weight)
+      i += 1
+    return found
+
+  def search(self, tokens, offset, limit):
+    # (number of ids matching every token, the requested slice of them best
+    # first). Ties are broken by name then id; only the slice is sorted.
+    with self.lock:
+      scores = None
+      for i, token in enumerate(tokens):
+        found = self.lookup(token, prefix=i == len(tokens) - 1)
+        if scores is None:
+          scores = dict(found)
+        else:
+          scores = {doc_id: score + found[doc_id] for doc_id, score in scores.items() if doc_id in found}
+        if not scores:
+          return 0, []
+      best = heapq.nsmallest(
+        offset + limit,
+        scores,
+        key=lambda doc_id: (-scores[doc_id], self.documents[doc_id][0], doc_id),
+      )
+      return len(scores), best[offset:]
+
+
+_lock = threading.Lock()
+_memory_indexes = {}
+
+
+def memory_index(model):
+  with _lock:
+    index = _memory_indexes.get(model)
+    if index is None:
+      index = _memory_indexes[model] = InvertedIndex()
+      index.load(model)
+  return index
+
+
+def memory_search(model, tokens, offset, limit):
+  count, page_ids = memory_index(model).search(tokens, offset, limit)
+  if not page_ids:
+    return [], count
+
+  rows = db.session.query(
+      model.id,
+      model.name,
+      model.upcoming_shows_count.label('num_upcoming_shows'),
+    ) \
+    .filter(model.id.in_(page_ids)) \
+    .all()
+  position = {doc_id: i for i, doc_id in enumerate(page_ids)}
+  rows.sort(key=lambda row: position[row.id])
+  return rows, count
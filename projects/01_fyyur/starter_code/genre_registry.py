@@ -0,0 +1,120 @@
+#----------------------------------------------------------------------------#
+# Genre registry.
+#
+# Resolves genre names submitted by the venue and artist forms to Genre rows
+# with at most one IN query, inserting missing names with an upsert so that
+# concurrent submissions cannot create duplicates. Resolved ids are kept in a
+# process-local name -> id cache.
+#
+# It also holds the genre choices of the venue and artist forms, loaded
+# from the Genre table at most every CHOICES_TTL seconds and again as soon
+# as this process inserts a genre.
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import make_transient_to_detached
+from models import db, Genre
+from choices import ChoiceSet, DEFAULT_GENRES
+
+# Bounds how long other processes' new genres take to show up in the forms.
+CHOICES_TTL = 300
+
+_lock = threading.Lock()
+_genre_ids = {}
+# (ChoiceSet, monotonic time it was loaded)
+_choices = None
+_default_choices = ChoiceSet(sorted(DEFAULT_GENRES))
+
+
+def invalidate(names=None):
+  # Drops the given names from the cache, or the whole cache, and the
+  # genre choices.
+  global _choices
+  with _lock:
+    if names is None:
+      _genre_ids.clear()
+    else:
+      for name in names:
+        _genre_ids.pop(name, None)
+    _choices = None
+
+
+def cached_ids(names):
+  with _lock:
+    return {name: _genre_ids[name] for name in names if name in _genre_ids}
+
+
+def insert_missing(names):
+  # Inserts the names in their own committed transaction, skipping the ones
+  # another request inserted first. The transaction is separate from the
+  # caller's so that a failed venue or artist insert cannot roll back a genre
+  # id that is already cached.
+  table = Genre.__table__
+  rows = [{'name': name} for name in names]
+  with db.engine.begin() as connection:
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+      statement = pg_insert(table).on_conflict_do_nothing(index_elements=['name'])
+    elif dialect == 'sqlite':
+      statement = table.insert().prefix_with('OR IGNORE')
+    else:
+      statement = table.insert()
+    connection.execute(statement, rows)
+  invalidate(names)
+
+
+def resolve_ids(names):
+  # Maps every name to its Genre id, creating the missing genres.
+  names = list(dict.fromkeys(names))
+  ids = cached_ids(names)
+  missing = [name for name in names if name not in ids]
+  if not missing:
+    return {name: ids[name] for name in names}
+
+  found = dict(
+    db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(missing)).all()
+  )
+  unknown = [name for name in missing if name not in found]
+  if unknown:
+    insert_missing(unknown)
+    found.update(
+      db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(unknown)).all()
+    )
+
+  with _lock:
+    _genre_ids.update(found)
+  ids.update(found)
+  return {name: ids[name] for name in names}
+
+
+def resolve_genres(names):
+  # Genre instances for `names`, in order, attached to the current session
+  # without loading them: assigning them to Venue.genres or Artist.genres
+  # only needs their primary key.
+  genres = []
+  for name, genre_id in resolve_ids(names).items():
+    genre = Genre(id=genre_id, name=name)
+    make_transient_to_detached(genre)
+    genres.append(db.session.merge(genre, load=False))
+  return genres
+
+
+def genre_choices():
+  # ChoiceSet of every genre name, ordered by name. Only reads: the Genre
+  # table is seeded by its migration, or on create. Until it has rows the
+  # forms offer DEFAULT_GENRES.
+  global _choices
+  loaded = _choices
+  if loaded is not None and time.monotonic() - loaded[1] < CHOICES_TTL:
+    return loaded[0]
+
+  names = [name for name, in db.session.query(Genre.name).order_by(Genre.name)]
+  if not names:
+    return _default_choices
+  choices = ChoiceSet(names)
+  with _lock:
+    _choices = (choices, time.monotonic())
+  return choices
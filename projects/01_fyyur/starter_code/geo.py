@@ -0,0 +1,259 @@
+#----------------------------------------------------------------------------#
+# Venue locations and proximity search.
+#
+# Venues are geocoded from their city and state with the local lookup table
+# data/us_cities.csv when they are created, edited or imported. Each venue
+# stores its latitude, longitude and geohash; the geohash column is indexed,
+# and every cell of a geohash grid is a contiguous range of that index. A
+# radius or bounding-box query covers its area with a handful of cells and
+# reads only those index ranges, then checks exact distances in Python.
+#----------------------------------------------------------------------------#
+
+import csv
+import math
+import os
+from functools import lru_cache
+
+from sqlalchemy.sql import and_, or_
+
+from models import db, Venue
+
+PLACES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'us_cities.csv')
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+MAX_CELLS = 16
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+DEFAULT_RADIUS_KM = 20
+MAX_RADIUS_KM = 500
+NEARBY_LIMIT = 100
+
+
+#  Geocoding
+#  ----------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def places():
+  # {(city, state): (latitude, longitude)}, city lowercased.
+  with open(PLACES_PATH, encoding='utf-8') as places_file:
+    return {
+      (row['city'].lower(), row['state'].upper()): (float(row['latitude']), float(row['longitude']))
+      for row in csv.DictReader(places_file)
+    }
+
+
+def geocode(city, state):
+  # (latitude, longitude) of the city, or None when it is not in the table.
+  return places().get(((city or '').strip().lower(), (state or '').strip().upper()))
+
+
+def location(city, state):
+  # Column values locating a venue in `city`, all None when unknown.
+  point = geocode(city, state)
+  if point is None:
+    return {'latitude': None, 'longitude': None, 'geohash': None}
+  return {'latitude': point[0], 'longitude': point[1], 'geohash': encode(*point)}
+
+
+def locate(venue):
+  for column, value in location(venue.city, venue.state).items():
+    setattr(venue, column, value)
+
+
+def geocode_missing():
+  # Locates every venue without coordinates, one UPDATE per city. Returns
+  # the number of venues located.
+  located = 0
+  pairs = db.session.query(Venue.city, Venue.state) \
+    .filter(Venue.geohash.is_(None)) \
+    .distinct() \
+    .all()
+  for city, state in pairs:
+    values = location(city, state)
+    if values['geohash'] is None:
+      continue
+    located += db.session.query(Venue) \
+      .filter(Venue.city == city, Venue.state == state, Venue.geohash.is_(None)) \
+      .update(values, synchronize_session=False)
+  return located
+
+
+#  Geohash
+#  ----------------------------------------------------------------
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+  south, north = -90.0, 90.0
+  west, east = -180.0, 180.0
+  chars = []
+  value = bits = 0
+  even = True
+  while len(chars) < precision:
+    if even:
+      middle = (west + east) / 2
+      if longitude >= middle:
+        value = value * 2 + 1
+        west = middle
+      else:
+        value = value * 2
+        east = middle
+    else:
+      middle = (south + north) / 2
+      if latitude >= middle:
+        value = value * 2 + 1
+        south = middle
+      else:
+        value = value * 2
+        north = middle
+    even = not even
+    bits += 1
+    if bits == 5:
+      chars.append(BASE32[value])
+      value = bits = 0
+  return ''.join(chars)
+
+
+def cell_size(precision):
+  # (height, width) in degrees of a geohash cell.
+  bits = 5 * precision
+  return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def cover(south, west, north, east, max_cells=MAX_CELLS):
+  # Geohash prefixes of the finest precision whose cells, at most
+  # `max_cells` of them, cover the box. [''] covers everything.
+  for precision in range(GEOHASH_PRECISION, 0, -1):
+    height, width = cell_size(precision)
+    first_row, last_row = int((south + 90) // height), int((north + 90) // height)
+    first_col, last_col = int((west + 180) // width), int((east + 180) // width)
+    if (last_row - first_row + 1) * (last_col - first_col + 1) > max_cells:
+      continue
+    return sorted({
+      encode(
+        min((row + 0.5) * height - 90, 90.0),
+        min((col + 0.5) * width - 180, 180.0),
+        precision,
+      )
+      for row in range(first_row, last_row + 1)
+      for col in range(first_col, last_col + 1)
+    })
+  return ['']
+
+
+def in_cells(prefixes):
+  # Geohash condition matching every cell in `prefixes`, one index range
+  # each. Relies on byte order, hence the "C" collation on Postgres.
+  if prefixes == ['']:
+    return Venue.geohash.isnot(None)
+  return or_(*[
+    and_(Venue.geohash >= prefix, Venue.geohash < prefix + '~')
+    for prefix in prefixes
+  ])
+
+
+#  Queries
+#  ----------------------------------------------------------------
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+  # Haversine great-circle distance.
+  phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+  half_dphi = (other_phi - phi) / 2
+  half_dlambda = math.radians(other_longitude - longitude) / 2
+  a = math.sin(half_dphi) ** 2 + math.cos(phi) * math.cos(other_phi) * math.sin(half_dlambda) ** 2
+  return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def clamp_box(south, west, north, east):
+  # Boxes crossing the antimeridian are cut at it.
+  return max(south, -90.0), max(west, -180.0), min(north, 90.0), min(east, 180.0)
+
+
+def radius_box(latitude, longitude, radius_km):
+  dlat = radius_km / KM_PER_DEGREE
+  cos_lat = math.cos(math.radians(latitude))
+  dlon = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+  return clamp_box(latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon)
+
+
+def venues_in_box(south, west, north, east):
+  # Located venues inside the box, read through the covering geohash cells.
+  south, west, north, east = clamp_box(south, west, north, east)
+  return db.session.query(
+      Venue.id,
+      Venue.name,
+      Venue.city,
+      Venue.state,
+      Venue.latitude,
+      Venue.longitude,
+      Venue.upcoming_shows_count.label('num_upcoming_shows'),
+    ) \
+    .filter(in_cells(cover(south, west, north, east))) \
+    .filter(Venue.latitude.between(south, north), Venue.longitude.between(west, east)) \
+    .all()
+
+
+def format_venue(row, distance=None):
+  venue = {
+    "id": row.id,
+    "name": row.name,
+    "city": row.city,
+    "state": row.state,
+    "latitude": row.latitude,
+    "longitude": row.longitude,
+    "num_upcoming_shows": row.num_upcoming_shows,
+  }
+  if distance is not None:
+    venue["distance_km"] = round(distance, 2)
+  return venue
+
+
+def nearby(latitude, longitude, radius_km=DEFAULT_RADIUS_KM, limit=NEARBY_LIMIT):
+  # Venues within `radius_km` of the point, closest first.
+  matches = []
+  for row in venues_in_box(*radius_box(latitude, longitude, radius_km)):
+    distance = distance_km(latitude, longitude, row.latitude, row.longitude)
+    if distance <= radius_km:
+      matches.append((distance, row.name, row))
+  matches.sort(key=lambda match: match[:2])
+  return {
+    "count": len(matches),
+    "data": [format_venue(row, distance) for distance, _, row in matches[:limit]],
+  }
+
+
+def in_box(south, west, north, east, limit=NEARBY_LIMIT):
+  # Venues inside the box, by name.
+  rows = sorted(venues_in_box(south, west, north, east), key=lambda row: (row.name, row.id))
+  return {
+    "count": len(rows),
+    "data": [format_venue(row) for row in rows[:limit]],
+  }
+
+
+def search(args):
+  # Runs the query described by request arguments: bbox=south,west,north,east
+  # or a centre (lat and lon, or city and state) with radius_km. Returns None
+  # when no area is given, raises ValueError for invalid arguments.
+  if args.get('bbox'):
+    south, west, north, east = (float(part) for part in args['bbox'].split(','))
+    if not (south <= north and west <= east):
+      raise ValueError('bbox must be south,west,north,east')
+    return dict(in_box(south, west, north, east), bbox=[south, west, north, east])
+
+  if args.get('lat') or args.get('lon'):
+    point = float(args.get('lat', '')), float(args.get('lon', ''))
+  elif args.get('city'):
+    point = geocode(args['city'], args.get('state'))
+    if point is None:
+      raise ValueError('unknown city: {}, {}'.format(args['city'], args.get('state', '')))
+  else:
+    return None
+  if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180):
+    raise ValueError('lat and lon out of range')
+
+  radius_km = float(args.get('radius_km') or DEFAULT_RADIUS_KM)
+  if not 0 < radius_km <= MAX_RADIUS_KM:
+    raise ValueError('radius_km must be between 0 and {}'.format(MAX_RADIUS_KM))
+  return dict(nearby(point[0], point[1], radius_km), center=list(point), radius_km=radius_km)
@@ -0,0 +1,78 @@
+#----------------------------------------------------------------------------#
+# Gunicorn settings for serving Fyyur (see wsgi.py):
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# FYYUR_WORKER_CLASS picks the worker model:
+#
+#   gthread (default)  WEB_CONCURRENCY processes of FYYUR_THREADS threads.
+#                      Each thread holds a database connection while it
+#                      serves a request, so the pool of every process is
+#                      sized to its threads.
+#   gevent             WEB_CONCURRENCY processes serving up to
+#                      FYYUR_WORKER_CONNECTIONS requests each on greenlets
+#                      (pip install gevent, and psycogreen on Postgres so
+#                      that queries yield). Requests beyond the pool size
+#                      wait DB_POOL_TIMEOUT for a connection.
+#   sync               WEB_CONCURRENCY processes serving one request each.
+#----------------------------------------------------------------------------#
+
+import multiprocessing
+import os
+
+os.environ.setdefault('FYYUR_ENV', 'production')
+
+worker_class = os.environ.get('FYYUR_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('FYYUR_THREADS', 4))
+worker_connections = int(os.environ.get('FYYUR_WORKER_CONNECTIONS', 100))
+
+bind = os.environ.get('FYYUR_BIND', '0.0.0.0:{}'.format(os.environ.get('PORT', 8000)))
+backlog = 2048
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+
+# Restart workers now and then so that a slow leak cannot grow unbounded;
+# the jitter keeps them from restarting together.
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = os.environ.get('FYYUR_ACCESS_LOG') or None
+errorlog = '-'
+
+# Connections per process: config.py reads these when the app is loaded.
+if worker_class == 'gthread':
+  os.environ.setdefault('DB_POOL_SIZE', str(threads))
+  os.environ.setdefault('DB_MAX_OVERFLOW', '0')
+elif worker_class == 'gevent':
+  os.environ.setdefault('DB_POOL_SIZE', '10')
+  os.environ.setdefault('DB_MAX_OVERFLOW', '10')
+
+
+def on_starting(server):
+  # The memory page cache is per process: a write would only clear it in
+  # the worker that handled it, and the others would serve stale pages.
+  from config import get_config
+  if workers > 1 and get_config().CACHE_BACKEND == 'memory':
+    raise RuntimeError('CACHE_BACKEND=memory with {} workers: use CACHE_BACKEND=redis, '
+                       'or WEB_CONCURRENCY=1'.format(workers))
+
+
+def post_fork(server, worker):
+  if worker_class == 'gevent':
+    try:
+      from psycogreen.gevent import patch_psycopg
+    except ImportError:
+      server.log.warning('psycogreen is not installed: Postgres queries block the worker')
+    else:
+      patch_psycopg()
+
+
+def post_worker_init(worker):
+  # With --preload the app, and possibly its engine, was created in the
+  # master: drop any connection inherited from it.
+  from models import db
+  from flask_sqlalchemy import get_state
+  for connector in get_state(db.app).connectors.values():
+    connector.get_engine().dispose()
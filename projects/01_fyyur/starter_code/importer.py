@@ -0,0 +1,331 @@
+#----------------------------------------------------------------------------#
+# Bulk import of venues, artists and shows (flask fyyur-import).
+#
+# Rows are streamed from CSV or JSONL, validated with the same field rules
+# as VenueForm, ArtistForm and ShowForm, and loaded in chunks, each in its
+# own transaction:
+#
+#   * genres of the whole chunk are resolved with genre_registry
+#   * venues are geocoded from their city with geo.py
+#   * ids are allocated up front so genre links need no RETURNING round trip
+#   * rows go in with COPY on Postgres and executemany elsewhere
+#   * shows overlapping an existing or earlier booking are rejected
+#   * show counters, the analytics queue and collection versions are
+#     updated in the same transaction, the search index right after it
+#     commits
+#
+# Rejected rows are reported with their line number and form errors.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.sql import func
+from werkzeug.datastructures import MultiDict
+from wtforms import SelectMultipleField
+
+from models import db, Venue, Artist, Show, venue_genre, artist_genre, VENUE_FIELDS, ARTIST_FIELDS
+from forms import VenueForm, ArtistForm, ShowForm
+from genre_registry import resolve_ids
+from bookings import BookingIndex
+from cache import page_cache
+import analytics
+import counters
+import fulltext
+import geo
+import versions
+
+CHUNK_SIZE = 1000
+FORMATS = ('csv', 'jsonl')
+
+# Separators accepted between genres in a CSV cell.
+GENRE_SEPARATORS = re.compile(r'\s*[;,]\s*')
+
+
+class ImportReport(object):
+
+  def __init__(self, kind):
+    self.kind = kind
+    self.read = 0
+    self.loaded = 0
+    self.rejected = 0
+    self.started = time.perf_counter()
+    self.elapsed = 0.0
+
+  def finish(self):
+    self.elapsed = time.perf_counter() - self.started
+
+  @property
+  def rows_per_second(self):
+    return self.loaded / self.elapsed if self.elapsed else 0.0
+
+  def __str__(self):
+    return '{}: {} read, {} loaded, {} rejected in {:.2f}s ({:.0f} rows/s)'.format(
+      self.kind, self.read, self.loaded, self.rejected, self.elapsed, self.rows_per_second)
+
+
+#  Reading
+#  ----------------------------------------------------------------
+
+def guess_format(filename):
+  return 'jsonl' if filename.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, format):
+  # Yields (line number, dict) pairs; the dict is None for a line that
+  # cannot be parsed.
+  if format == 'csv':
+    reader = csv.DictReader(stream)
+    for row in reader:
+      if 'genres' in row:
+        row['genres'] = [name for name in GENRE_SEPARATORS.split(row['genres'] or '') if name]
+      yield reader.line_num, row
+  else:
+    for line_num, line in enumerate(stream, 1):
+      if not line.strip():
+        continue
+      try:
+        row = json.loads(line)
+      except ValueError:
+        row = None
+      yield line_num, row if isinstance(row, dict) else None
+
+
+def chunked(rows, size):
+  chunk = []
+  for row in rows:
+    chunk.append(row)
+    if len(chunk) == size:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+
+#  Validation
+#  ----------------------------------------------------------------
+
+class RowValidator(object):
+  # Validates rows with one reused form instance.
+
+  def __init__(self, form_class):
+    self.form = form_class(formdata=None, meta={'csrf': False})
+
+  def formdata(self, row):
+    # Every field is present, so that a missing value fails its validators
+    # instead of falling back to the field default. A multiple select is
+    # left out instead: with no values it has no data, which DataRequired
+    # reports, where '' would be an invalid choice.
+    items = []
+    for name, field in self.form._fields.items():
+      value = row.get(name)
+      if isinstance(value, (list, tuple)):
+        items.extend((name, str(item)) for item in value)
+      elif value is not None:
+        items.append((name, str(value)))
+      elif not isinstance(field, SelectMultipleField):
+        items.append((name, ''))
+    return MultiDict(items)
+
+  def __call__(self, row):
+    # (data, None) for a valid row, (None, errors) otherwise.
+    if row is None:
+      return None, {'row': ['Not a valid JSON object.']}
+    self.form.process(self.formdata(row))
+    if not self.form.validate():
+      return None, self.form.errors
+    return dict(self.form.data), None
+
+
+#  Loading
+#  ----------------------------------------------------------------
+
+def allocate_ids(model, count):
+  # Ids for `count` new rows. Postgres draws them from the serial sequence;
+  # elsewhere they continue from the current maximum, which assumes a
+  # single writer (the import) while it runs.
+  if db.session.bind.dialect.name == 'postgresql':
+    return [row[0] for row in db.session.execute(
+      text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+      {'table': '"{}"'.format(model.__tablename__), 'count': count},
+    )]
+  start = db.session.query(func.max(model.id)).scalar() or 0
+  return list(range(start + 1, start + count + 1))
+
+
+def copy_value(value):
+  if value is None:
+    return None
+  if isinstance(value, bool):
+    return 'true' if value else 'false'
+  if isinstance(value, datetime):
+    return value.isoformat(' ')
+  return value
+
+
+def insert_rows(table, rows):
+  # COPY on Postgres, a single executemany INSERT elsewhere. Runs on the
+  # session's connection, inside its transaction.
+  if not rows:
+    return
+  connection = db.session.connection()
+  if connection.dialect.name != 'postgresql':
+    connection.execute(table.insert(), rows)
+    return
+
+  columns = list(rows[0])
+  buffer = io.StringIO()
+  # Quoting every string keeps '' apart from NULL, which is left unquoted.
+  writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+  for row in rows:
+    writer.writerow([copy_value(row[column]) for column in columns])
+  buffer.seek(0)
+  statement = 'COPY "{}" ({}) FROM STDIN WITH (FORMAT csv)'.format(
+    table.name, ', '.join('"{}"'.format(table.c[column].name) for column in columns))
+  cursor = connection.connection.cursor()
+  try:
+    cursor.copy_expert(statement, buffer)
+  finally:
+    cursor.close()
+
+
+def load_listings(model, links, fk, fields, defaults, chunk, extra=None):
+  # Inserts venues or artists with their genre links. Returns the new ids.
+  # extra(data) gives more column values for a row.
+  genre_ids = resolve_ids(name for data in chunk for name in data['genres'])
+  ids = allocate_ids(model, len(chunk))
+  rows = []
+  for entity_id, data in zip(ids, chunk):
+    row = dict(defaults, id=entity_id, **{field: data[field] or None for field in fields})
+    if extra is not None:
+      row.update(extra(data))
+    rows.append(row)
+  insert_rows(model.__table__, rows)
+  insert_rows(links, [
+    {fk: entity_id, 'genre_id': genre_id}
+    for entity_id, data in zip(ids, chunk)
+    for genre_id in {genre_ids[name] for name in data['genres']}
+  ])
+  return ids
+
+
+def load_venues(chunk):
+  ids = load_listings(Venue, venue_genre, 'venue_id', VENUE_FIELDS, {'seeking_talent': False}, chunk,
+                      extra=lambda data: geo.location(data['city'], data['state']))
+  versions.bump(versions.VENUES)
+  return lambda: fulltext.refresh(Venue, ids)
+
+
+def load_artists(chunk):
+  ids = load_listings(Artist, artist_genre, 'artist_id', ARTIST_FIELDS, {'seeking_venue': False}, chunk)
+  versions.bump(versions.ARTISTS)
+  return lambda: fulltext.refresh(Artist, ids)
+
+
+def check_shows(rows):
+  # Adds errors to shows whose venue or artist does not exist or is already
+  # booked, with two IN queries per side for the whole chunk.
+  for key, model in (('venue_id', Venue), ('artist_id', Artist)):
+    wanted = set()
+    for data, errors in rows:
+      if data is None:
+        continue
+      try:
+        data[key] = int(data[key])
+        wanted.add(data[key])
+      except ValueError:
+        errors.setdefault(key, []).append('Not a valid id.')
+    found = {entity_id for entity_id, in db.session.query(model.id).filter(model.id.in_(wanted))}
+    for data, errors in rows:
+      if data is not None and isinstance(data[key], int) and data[key] not in found:
+        errors.setdefault(key, []).append('No such {}.'.format(model.__tablename__.lower()))
+
+  # Overlapping bookings, against the database and earlier rows alike.
+  bookable = [(data, errors) for data, errors in rows if data is not None and not errors]
+  if not bookable:
+    return
+  starts = [data['start_time'] for data, _ in bookable]
+  index = BookingIndex()
+  index.load(
+    {data['venue_id'] for data, _ in bookable},
+    {data['artist_id'] for data, _ in bookable},
+    min(starts), max(starts),
+  )
+  for data, errors in bookable:
+    side = index.conflict(data['venue_id'], data['artist_id'], data['start_time'])
+    if side is not None:
+      errors['start_time'] = ['The {} is already booked at that time.'.format(side)]
+    else:
+      index.add(data['venue_id'], data['artist_id'], data['start_time'])
+
+
+def load_shows(chunk):
+  # Core rows are keyed by column name: Show.start_date is the date column.
+  insert_rows(Show.__table__, [
+    {'venue_id': data['venue_id'], 'artist_id': data['artist_id'], 'date': data['start_time']}
+    for data in chunk
+  ])
+  counters.record_shows([(data['venue_id'], data['artist_id'], data['start_time']) for data in chunk])
+  analytics.record_shows([(data['venue_id'], data['start_time']) for data in chunk])
+  versions.bump(versions.SHOWS, versions.VENUES, versions.ARTISTS)
+
+
+# kind -> (form, loader)
+KINDS = {
+  'venues': (VenueForm, load_venues),
+  'artists': (ArtistForm, load_artists),
+  'shows': (ShowForm, load_shows),
+}
+
+
+def run_import(kind, stream, format='csv', chunk_size=CHUNK_SIZE, on_reject=None):
+  # Imports every valid row of `stream` and returns an ImportReport.
+  # on_reject(line number, errors) is called for every rejected row.
+  form_class, load = KINDS[kind]
+  validate = RowValidator(form_class)
+  report = ImportReport(kind)
+
+  def reject(line_num, errors):
+    report.rejected += 1
+    if on_reject is not None:
+      on_reject(line_num, errors)
+
+  for chunk in chunked(read_rows(stream, format), chunk_size):
+    report.read += len(chunk)
+    checked = []
+    for line_num, row in chunk:
+      data, errors = validate(row)
+      checked.append((line_num, data, errors or {}))
+    if kind == 'shows':
+      check_shows([(data, errors) for _, data, errors in checked])
+
+    valid = []
+    for line_num, data, errors in checked:
+      if errors:
+        reject(line_num, errors)
+      else:
+        valid.append((line_num, data))
+    if not valid:
+      continue
+
+    try:
+      after_commit = load([data for _, data in valid])
+      db.session.commit()
+    except Exception as error:
+      db.session.rollback()
+      for line_num, _ in valid:
+        reject(line_num, {'chunk': [str(error).splitlines()[0]]})
+      continue
+    if after_commit is not None:
+      after_commit()
+    report.loaded += len(valid)
+
+  if report.loaded:
+    page_cache.clear()
+  report.finish()
+  return report
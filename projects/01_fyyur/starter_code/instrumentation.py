@@ -0,0 +1,182 @@
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#
+# Every statement executed on any engine is timed (before/after
+# cursor_execute) and recorded in the stats of the current request and of
+# any active capture() block:
+#
+#   * responses get a Server-Timing header with the query count and the
+#     time spent in the database
+#   * each request is logged to the "fyyur.sql" logger as one JSON line at
+#     INFO, or at WARNING when a statement fingerprint repeats
+#     N_PLUS_ONE_THRESHOLD times or more (a loop issuing one query per row)
+#   * views decorated with @query_budget(n) fail with QueryBudgetExceeded
+#     when they run more than n statements and budgets are enforced
+#     (QUERY_BUDGET_ENFORCE, on when testing); otherwise it is logged
+#----------------------------------------------------------------------------#
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+N_PLUS_ONE_THRESHOLD = 5
+REPEATED_LOGGED = 5
+
+logger = logging.getLogger('fyyur.sql')
+
+_local = threading.local()
+
+# Bind parameter lists such as IN (?, ?, ?) or IN (%(id_1)s, %(id_2)s)
+PARAMETER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)')
+NUMBER = re.compile(r'\b\d+\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+  pass
+
+
+def fingerprint(statement):
+  # The statement with literals and parameter lists folded, so that the
+  # same query issued for different rows has the same fingerprint.
+  statement = STRING.sub('?', statement)
+  statement = NUMBER.sub('?', statement)
+  statement = PARAMETER_LIST.sub('(...)', statement)
+  return WHITESPACE.sub(' ', statement).strip()
+
+
+class QueryStats(object):
+
+  def __init__(self):
+    self.count = 0
+    self.seconds = 0.0
+    self.fingerprints = Counter()
+
+  def record(self, statement, seconds):
+    self.count += 1
+    self.seconds += seconds
+    self.fingerprints[fingerprint(statement)] += 1
+
+  @property
+  def milliseconds(self):
+    return self.seconds * 1000
+
+  def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+    # [(fingerprint, count)] of the statements run `threshold` times or more.
+    return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+
+def active_stats():
+  stats = list(getattr(_local, 'captures', ()))
+  if has_app_context() and 'sql_stats' in g:
+    stats.append(g.sql_stats)
+  return stats
+
+
+@contextmanager
+def capture():
+  # Stats of every statement the current thread executes inside the block.
+  stats = QueryStats()
+  captures = getattr(_local, 'captures', None)
+  if captures is None:
+    captures = _local.captures = []
+  captures.append(stats)
+  try:
+    yield stats
+  finally:
+    captures.remove(stats)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  # A connection runs one statement at a time.
+  conn.info['query_started'] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  stats = active_stats()
+  if stats:
+    elapsed = time.perf_counter() - conn.info.pop('query_started')
+    for target in stats:
+      target.record(statement, elapsed)
+
+
+def query_budget(limit):
+  # Maximum number of statements a view may run per request.
+  def decorator(view):
+    view.query_budget = limit
+    return view
+  return decorator
+
+
+#  Requests
+#  ----------------------------------------------------------------
+
+def start_request():
+  g.sql_stats = QueryStats()
+  g.request_started = time.perf_counter()
+
+
+def finish_request(response, app):
+  stats = g.pop('sql_stats', None)
+  if stats is None:
+    return response
+  total_ms = (time.perf_counter() - g.pop('request_started')) * 1000
+  response.headers.add(
+    'Server-Timing',
+    'db;dur={:.2f};desc="{} queries", app;dur={:.2f}'.format(stats.milliseconds, stats.count, total_ms),
+  )
+
+  view = app.view_functions.get(request.endpoint)
+  budget = getattr(view, 'query_budget', None)
+  over_budget = budget is not None and stats.count > budget
+  repeated = stats.repeated()
+  entry = {
+    'event': 'request',
+    'method': request.method,
+    'path': request.path,
+    'endpoint': request.endpoint,
+    'status': response.status_code,
+    'queries': stats.count,
+    'db_ms': round(stats.milliseconds, 2),
+    'total_ms': round(total_ms, 2),
+  }
+  if budget is not None:
+    entry['query_budget'] = budget
+  if repeated:
+    entry['repeated'] = [{'sql': sql, 'count': count} for sql, count in repeated[:REPEATED_LOGGED]]
+  level = logging.WARNING if repeated or over_budget else logging.INFO
+  if logger.isEnabledFor(level):
+    logger.log(level, json.dumps(entry))
+
+  enforce = app.config['QUERY_BUDGET_ENFORCE']
+  if over_budget and (app.testing if enforce is None else enforce):
+    raise QueryBudgetExceeded('{} ran {} queries, budget is {}:\n{}'.format(
+      request.endpoint, stats.count, budget,
+      '\n'.join('{:>4} x {}'.format(count, sql) for sql, count in stats.fingerprints.most_common())))
+  return response
+
+
+def setup_instrumentation(app):
+  # QUERY_BUDGET_ENFORCE left at None follows app.testing.
+  app.config.setdefault('QUERY_BUDGET_ENFORCE', None)
+  logger.setLevel(app.config.get('SQL_LOG_LEVEL', 'INFO'))
+  if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+  @app.before_request
+  def instrument_request():
+    start_request()
+
+  @app.after_request
+  def report_request(response):
+    return finish_request(response, app)
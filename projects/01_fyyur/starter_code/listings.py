@@ -0,0 +1,213 @@
+#----------------------------------------------------------------------------#
+# Editing and deleting venues and artists.
+#
+# Each operation runs a fixed number of set-based statements in one
+# transaction, however many rows it touches:
+#
+#   update_listing()   one UPDATE of the row; its genre links are replaced
+#                      with one DELETE and one INSERT
+#   delete_listings()  the shows of the listings are taken off the counters
+#                      of the artists (or venues) they were with and queued
+#                      for analytics, then the shows, genre links and
+#                      listings go with one DELETE each
+#   set_seeking()      one UPDATE of the seeking flag of many listings
+#
+# Each bumps the collection versions in the same transaction, then refreshes
+# the search index and drops the cached pages that showed the rows.
+#----------------------------------------------------------------------------#
+
+import re
+
+from sqlalchemy.orm import selectinload
+
+from models import db, Venue, Artist, Show, venue_genre, artist_genre, VENUE_FIELDS, ARTIST_FIELDS
+from genre_registry import resolve_ids
+from cache import page_cache, venues_key, artists_key, venue_key, artist_key
+import analytics
+import counters
+import fulltext
+import geo
+import versions
+
+# Ids accepted by one bulk request, so that they fit one IN list.
+MAX_BULK_IDS = 1000
+# An id submitted as a form field.
+DIGITS = re.compile(r'[0-9]+\Z')
+
+
+class Listing(object):
+  # How venues or artists are stored, linked to shows and cached.
+
+  def __init__(self, model, links, link_fk, show_fk, other, version, list_key, detail_key, seeking, fields):
+    self.model = model
+    self.links = links
+    self.link_fk = links.c[link_fk]
+    self.show_fk = show_fk
+    self.other = other
+    self.version = version
+    self.list_key = list_key
+    self.detail_key = detail_key
+    self.seeking = seeking
+    self.fields = fields
+
+
+LISTINGS = {
+  Venue: Listing(Venue, venue_genre, 'venue_id', Show.venue_id, Artist, versions.VENUES,
+                 venues_key, venue_key, Venue.seeking_talent, VENUE_FIELDS),
+  Artist: Listing(Artist, artist_genre, 'artist_id', Show.artist_id, Venue, versions.ARTISTS,
+                  artists_key, artist_key, Artist.seeking_venue, ARTIST_FIELDS),
+}
+
+
+def parse_ids(values):
+  # Distinct ids from a request, in order. Raises ValueError when they are
+  # not a list of integers (or of digit strings, from a form), missing or
+  # too many. Nothing is coerced: "15", true and 1.7 are rejected rather
+  # than read as 1 and 5, 1 and 1.
+  if not isinstance(values, list):
+    raise ValueError('ids must be a list of integers')
+  ids = []
+  for value in values:
+    if type(value) is int:
+      ids.append(value)
+    elif isinstance(value, str) and DIGITS.match(value):
+      ids.append(int(value))
+    else:
+      raise ValueError('ids must be a list of integers')
+  ids = list(dict.fromkeys(ids))
+  if not ids:
+    raise ValueError('ids are required')
+  if len(ids) > MAX_BULK_IDS:
+    raise ValueError('at most {} ids per request'.format(MAX_BULK_IDS))
+  return ids
+
+
+def load_listing(model, entity_id):
+  # The venue or artist with its genres, for the edit forms.
+  return model.query.options(selectinload(model.genres)).get(entity_id)
+
+
+def related_ids(listing, ids):
+  # Ids of the artists (or venues) that have shows with these listings.
+  other_fk = Show.artist_id if listing.model is Venue else Show.venue_id
+  return [
+    other_id for other_id, in db.session.query(other_fk)
+      .filter(listing.show_fk.in_(ids), other_fk.isnot(None))
+      .distinct()
+  ]
+
+
+def other_detail_key(listing):
+  return LISTINGS[listing.other].detail_key
+
+
+#  Edit
+#  ----------------------------------------------------------------
+
+def update_listing(model, entity_id, values, genres=None):
+  # Updates the form fields in `values` of one venue or artist, and
+  # replaces its genres unless `genres` is None. Returns False when it does
+  # not exist.
+  listing = LISTINGS[model]
+  values = {field: value for field, value in values.items() if field in listing.fields}
+  if model is Venue and ('city' in values or 'state' in values):
+    current = db.session.query(Venue.city, Venue.state).filter(Venue.id == entity_id).first()
+    if current is None:
+      return False
+    values.update(geo.location(values.get('city', current.city), values.get('state', current.state)))
+  genre_ids = resolve_ids(genres) if genres is not None else None
+
+  try:
+    updated = db.session.query(model) \
+      .filter(model.id == entity_id) \
+      .update(values, synchronize_session=False)
+    if not updated:
+      db.session.rollback()
+      return False
+    if genre_ids is not None:
+      db.session.execute(listing.links.delete().where(listing.link_fk == entity_id))
+      if genre_ids:
+        db.session.execute(listing.links.insert(), [
+          {listing.link_fk.name: entity_id, 'genre_id': genre_id}
+          for genre_id in set(genre_ids.values())
+        ])
+    if model is Venue and (genre_ids is not None or 'city' in values or 'state' in values):
+      # Its shows now count for another city or other genres.
+      analytics.touch_venues([entity_id])
+    # Names also appear in the show feed and on the pages of the other side.
+    renamed = 'name' in values
+    others = related_ids(listing, [entity_id]) if renamed else []
+    versions.bump(listing.version, *([versions.SHOWS] if renamed else []))
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+
+  fulltext.refresh(model, [entity_id])
+  page_cache.invalidate(
+    listing.list_key(),
+    listing.detail_key(entity_id),
+    *[other_detail_key(listing)(other_id) for other_id in others]
+  )
+  return True
+
+
+def set_seeking(model, ids, seeking, description=None):
+  # Sets seeking_talent (venues) or seeking_venue (artists) of many
+  # listings, and their seeking_description when given. Returns the number
+  # of rows updated.
+  listing = LISTINGS[model]
+  values = {listing.seeking: bool(seeking)}
+  if description is not None:
+    values[model.seeking_description] = description or None
+  try:
+    updated = db.session.query(model) \
+      .filter(model.id.in_(ids)) \
+      .update(values, synchronize_session=False)
+    if updated:
+      versions.bump(listing.version)
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+  page_cache.invalidate(*[listing.detail_key(entity_id) for entity_id in ids])
+  return updated
+
+
+#  Delete
+#  ----------------------------------------------------------------
+
+def delete_listings(model, ids):
+  # Deletes venues or artists with their shows and genre links. Returns the
+  # number of listings deleted.
+  listing = LISTINGS[model]
+  try:
+    others = related_ids(listing, ids)
+    if others:
+      counters.forget_shows(listing.show_fk.in_(ids), models=(listing.other,))
+    analytics.forget_shows(listing.show_fk.in_(ids))
+    shows = db.session.execute(Show.__table__.delete().where(listing.show_fk.in_(ids))).rowcount
+    db.session.execute(listing.links.delete().where(listing.link_fk.in_(ids)))
+    deleted = db.session.query(model) \
+      .filter(model.id.in_(ids)) \
+      .delete(synchronize_session=False)
+    changed = [listing.version] if deleted else []
+    if shows:
+      changed.append(versions.SHOWS)
+    if others:
+      changed.append(LISTINGS[listing.other].version)
+    if changed:
+      versions.bump(*changed)
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+
+  fulltext.refresh(model, ids)
+  keys = [listing.list_key()] + [listing.detail_key(entity_id) for entity_id in ids]
+  keys += [other_detail_key(listing)(other_id) for other_id in others]
+  if others and model is Artist:
+    # The venue list shows upcoming show counts.
+    keys.append(venues_key())
+  page_cache.invalidate(*keys)
+  return deleted
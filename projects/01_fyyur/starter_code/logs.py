@@ -0,0 +1,45 @@
+#----------------------------------------------------------------------------#
+# Logging.
+#
+# Records go to stderr, and to LOG_FILE when it is set, at LOG_LEVEL. Below
+# that level loggers drop a record before it is built or formatted, so the
+# debug records of the app and its libraries cost a level check in
+# production. With LOG_CALLER off (production) records are also built
+# without their caller, thread and process, which spares a stack walk per
+# record.
+#----------------------------------------------------------------------------#
+
+import logging
+
+FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+CALLER_FORMAT = FORMAT + ' [in %(pathname)s:%(lineno)d]'
+
+# Libraries that log every statement or request at INFO and below.
+QUIET_LOGGERS = ('sqlalchemy', 'alembic')
+
+
+def setup_logging(app):
+  level = logging.getLevelName(app.config['LOG_LEVEL'])
+  caller = app.config['LOG_CALLER']
+  if not caller:
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+  formatter = logging.Formatter(CALLER_FORMAT if caller else FORMAT)
+
+  root = logging.getLogger()
+  root.setLevel(level)
+  if not root.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    root.addHandler(handler)
+  if app.config.get('LOG_FILE'):
+    file_handler = logging.FileHandler(app.config['LOG_FILE'])
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(max(level, logging.INFO))
+    root.addHandler(file_handler)
+
+  app.logger.setLevel(level)
+  for name in QUIET_LOGGERS:
+    logging.getLogger(name).setLevel(max(level, logging.WARNING))
@@ -0,0 +1,43 @@
+"""unique genre names
+
+Revision ID: 05e25c4b848a
+Revises: a914fe28dca7
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '05e25c4b848a'
+down_revision = 'a914fe28dca7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Genres used to be inserted without checking for concurrent submissions,
+    # so fold duplicate names onto their lowest id before adding the index.
+    for table, owner in (('venue_genre', 'venue_id'), ('artist_genre', 'artist_id')):
+        op.execute(
+            'INSERT INTO {table} ({owner}, genre_id) '
+            'SELECT DISTINCT link.{owner}, keep.id FROM {table} link '
+            'JOIN "Genre" genre ON genre.id = link.genre_id '
+            'JOIN (SELECT name, MIN(id) AS id FROM "Genre" GROUP BY name) keep '
+            'ON keep.name = genre.name '
+            'WHERE genre.id <> keep.id AND NOT EXISTS ('
+            'SELECT 1 FROM {table} other '
+            'WHERE other.{owner} = link.{owner} AND other.genre_id = keep.id)'
+            .format(table=table, owner=owner)
+        )
+        op.execute(
+            'DELETE FROM {table} WHERE genre_id NOT IN '
+            '(SELECT MIN(id) FROM "Genre" GROUP BY name)'.format(table=table)
+        )
+    op.execute('DELETE FROM "Genre" WHERE id NOT IN (SELECT MIN(id) FROM "Genre" GROUP BY name)')
+    op.create_index(op.f('ix_Genre_name'), 'Genre', ['name'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_Genre_name'), table_name='Genre')
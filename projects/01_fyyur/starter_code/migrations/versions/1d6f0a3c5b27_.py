@@ -0,0 +1,40 @@
+"""exclusion constraints against overlapping show bookings
+
+Revision ID: 1d6f0a3c5b27
+Revises: 97cce999525d
+Create Date: 2026-10-18 17:21:09.774130
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d6f0a3c5b27'
+down_revision = '97cce999525d'
+branch_labels = None
+depends_on = None
+
+# bookings.SHOW_LENGTH
+SHOW_LENGTH = '2 hours'
+
+
+def upgrade():
+    # Postgres only: elsewhere bookings.py checks overlaps before inserting.
+    # Fails if existing shows already overlap; move or delete them first.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for column in ('venue_id', 'artist_id'):
+        op.execute(
+            'ALTER TABLE "Show" ADD CONSTRAINT "Show_{column}_overlap_excl" '
+            'EXCLUDE USING gist ({column} WITH =, tsrange(date, date + interval \'{length}\') WITH &&)'
+            .format(column=column, length=SHOW_LENGTH)
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for column in ('artist_id', 'venue_id'):
+        op.execute('ALTER TABLE "Show" DROP CONSTRAINT "Show_{column}_overlap_excl"'.format(column=column))
@@ -0,0 +1,47 @@
+"""show counters on venues and artists
+
+Revision ID: 3ece4a461f40
+Revises: bcbb9c4a1b68
+Create Date: 2026-10-18 14:48:03.113952
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3ece4a461f40'
+down_revision = 'bcbb9c4a1b68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app compares show dates with the local datetime.now(), not the
+    # database clock, so the rebuild does too.
+    now = datetime.now()
+    op.create_table('CounterState',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for table, fk in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        # Same rebuild as counters.reconcile().
+        op.execute(sa.text(
+            'UPDATE "{table}" SET '
+            'upcoming_shows_count = (SELECT COUNT(*) FROM "Show" WHERE "Show".{fk} = "{table}".id AND "Show".date >= :now), '
+            'past_shows_count = (SELECT COUNT(*) FROM "Show" WHERE "Show".{fk} = "{table}".id AND "Show".date < :now)'
+            .format(table=table, fk=fk)
+        ).bindparams(now=now))
+    op.execute(sa.text('INSERT INTO "CounterState" (id, rolled_at) VALUES (1, :now)').bindparams(now=now))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_table('CounterState')
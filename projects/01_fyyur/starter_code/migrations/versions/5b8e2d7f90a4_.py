@@ -0,0 +1,31 @@
+"""venue coordinates and geohash index
+
+Revision ID: 5b8e2d7f90a4
+Revises: 1d6f0a3c5b27
+Create Date: 2026-10-18 18:05:52.361904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2d7f90a4'
+down_revision = '1d6f0a3c5b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing venues are located afterwards with "flask geocode-venues".
+    op.add_column('Venue', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('geohash', sa.String(length=12).with_variant(sa.String(length=12, collation='C'), 'postgresql'), nullable=True))
+    op.create_index('ix_Venue_geohash', 'Venue', ['geohash'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Venue_geohash', table_name='Venue')
+    op.drop_column('Venue', 'geohash')
+    op.drop_column('Venue', 'longitude')
+    op.drop_column('Venue', 'latitude')
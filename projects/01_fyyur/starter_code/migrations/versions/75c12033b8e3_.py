@@ -0,0 +1,41 @@
+"""indexes for list, detail and search filters
+
+Revision ID: 75c12033b8e3
+Revises: 05e25c4b848a
+Create Date: 2026-10-18 11:02:17.540391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '75c12033b8e3'
+down_revision = '05e25c4b848a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_date', 'Show', ['venue_id', 'date'], unique=False)
+    op.create_index('ix_Show_artist_id_date', 'Show', ['artist_id', 'date'], unique=False)
+    op.create_index('ix_Show_date_id', 'Show', ['date', 'id'], unique=False)
+    op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city'], unique=False)
+
+    # Name search is upper(name) LIKE upper('%term%'), which only a trigram
+    # index can serve. Other databases keep scanning Venue and Artist.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX "ix_Venue_upper_name_trgm" ON "Venue" USING gin (upper(name) gin_trgm_ops)')
+        op.execute('CREATE INDEX "ix_Artist_upper_name_trgm" ON "Artist" USING gin (upper(name) gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX "ix_Artist_upper_name_trgm"')
+        op.execute('DROP INDEX "ix_Venue_upper_name_trgm"')
+
+    op.drop_index('ix_Venue_state_city', table_name='Venue')
+    op.drop_index('ix_Show_date_id', table_name='Show')
+    op.drop_index('ix_Show_artist_id_date', table_name='Show')
+    op.drop_index('ix_Show_venue_id_date', table_name='Show')
@@ -0,0 +1,31 @@
+"""collection versions for API ETags
+
+Revision ID: 97cce999525d
+Revises: 3ece4a461f40
+Create Date: 2026-10-18 16:02:41.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '97cce999525d'
+down_revision = '3ece4a461f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    version_table = op.create_table('DataVersion',
+    sa.Column('name', sa.String(length=32), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(version_table, [
+        {'name': name, 'version': 0} for name in ('venues', 'artists', 'shows')
+    ])
+
+
+def downgrade():
+    op.drop_table('DataVersion')
@@ -0,0 +1,44 @@
+"""full-text search vectors on venues and artists
+
+Revision ID: bcbb9c4a1b68
+Revises: 75c12033b8e3
+Create Date: 2026-10-18 13:26:55.904127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'bcbb9c4a1b68'
+down_revision = '75c12033b8e3'
+branch_labels = None
+depends_on = None
+
+# Same document as fulltext.SEARCH_VECTOR_SQL.
+SEARCH_VECTOR_SQL = (
+    'UPDATE "{table}" SET search_vector = '
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(("
+    'SELECT string_agg(genre.name, \' \') FROM "Genre" genre '
+    'JOIN {link} link ON link.genre_id = genre.id '
+    'WHERE link.{fk} = "{table}".id'
+    "), '')), 'C')"
+)
+
+
+def upgrade():
+    search_vector = sa.Text().with_variant(postgresql.TSVECTOR(), 'postgresql')
+    for table, link, fk in (('Venue', 'venue_genre', 'venue_id'), ('Artist', 'artist_genre', 'artist_id')):
+        op.add_column(table, sa.Column('search_vector', search_vector, nullable=True))
+        op.create_index('ix_{}_search_vector'.format(table), table, ['search_vector'], unique=False, postgresql_using='gin')
+        if op.get_bind().dialect.name == 'postgresql':
+            op.execute(SEARCH_VECTOR_SQL.format(table=table, link=link, fk=fk))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_index('ix_{}_search_vector'.format(table), table_name=table)
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,69 @@
+"""analytics rollups and change queue
+
+Revision ID: c4e8a2f6d913
+Revises: 5b8e2d7f90a4
+Create Date: 2026-10-18 21:14:37.502816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f6d913'
+down_revision = '5b8e2d7f90a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing shows are counted afterwards with "flask analytics-refresh --rebuild".
+    op.create_table('VenueDayStats',
+    sa.Column('venue_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('shows', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('venue_id', 'day')
+    )
+    op.create_index('ix_VenueDayStats_state_city_month', 'VenueDayStats', ['state', 'city', 'month'], unique=False)
+    op.create_table('CityMonthStats',
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('shows', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('state', 'city', 'month')
+    )
+    op.create_index('ix_CityMonthStats_month', 'CityMonthStats', ['month'], unique=False)
+    op.create_table('GenreCityMonthStats',
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('shows', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+    sa.PrimaryKeyConstraint('state', 'city', 'month', 'genre_id')
+    )
+    op.create_index('ix_GenreCityMonthStats_genre_id_month', 'GenreCityMonthStats', ['genre_id', 'month'], unique=False)
+    op.create_table('AnalyticsChange',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('batch', sa.String(length=32), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_AnalyticsChange_batch', 'AnalyticsChange', ['batch'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_AnalyticsChange_batch', table_name='AnalyticsChange')
+    op.drop_table('AnalyticsChange')
+    op.drop_index('ix_GenreCityMonthStats_genre_id_month', table_name='GenreCityMonthStats')
+    op.drop_table('GenreCityMonthStats')
+    op.drop_index('ix_CityMonthStats_month', table_name='CityMonthStats')
+    op.drop_table('CityMonthStats')
+    op.drop_index('ix_VenueDayStats_state_city_month', table_name='VenueDayStats')
+    op.drop_table('VenueDayStats')
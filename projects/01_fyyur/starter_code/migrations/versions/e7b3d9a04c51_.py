@@ -0,0 +1,30 @@
+"""drop the name trigram indexes
+
+Revision ID: e7b3d9a04c51
+Revises: c4e8a2f6d913
+Create Date: 2026-10-18 23:40:12.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3d9a04c51'
+down_revision = 'c4e8a2f6d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Name search matches word prefixes through search_vector (fulltext.py);
+    # upper(name) LIKE is only left for an empty term, which no index serves.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS "ix_Artist_upper_name_trgm"')
+        op.execute('DROP INDEX IF EXISTS "ix_Venue_upper_name_trgm"')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE INDEX "ix_Venue_upper_name_trgm" ON "Venue" USING gin (upper(name) gin_trgm_ops)')
+        op.execute('CREATE INDEX "ix_Artist_upper_name_trgm" ON "Artist" USING gin (upper(name) gin_trgm_ops)')
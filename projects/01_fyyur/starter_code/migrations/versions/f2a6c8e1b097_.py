@@ -0,0 +1,39 @@
+"""seed the default genres
+
+Revision ID: f2a6c8e1b097
+Revises: e7b3d9a04c51
+Create Date: 2026-10-19 00:12:45.603127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6c8e1b097'
+down_revision = 'e7b3d9a04c51'
+branch_labels = None
+depends_on = None
+
+# choices.DEFAULT_GENRES when this migration was written.
+GENRES = (
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+    'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+    'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other',
+)
+
+
+def upgrade():
+    # The form pages used to insert these into an empty Genre table on
+    # first read; only the ones missing are added.
+    genre = sa.table('Genre', sa.column('name', sa.String()))
+    bind = op.get_bind()
+    existing = {name for name, in bind.execute(sa.select([genre.c.name]))}
+    missing = [name for name in GENRES if name not in existing]
+    if missing:
+        op.bulk_insert(genre, [{'name': name} for name in missing])
+
+
+def downgrade():
+    # Genres stay: venues and artists may refer to them.
+    pass
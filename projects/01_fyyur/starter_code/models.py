@@ -0,0 +1,258 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.pool import QueuePool
+
+from choices import DEFAULT_GENRES
+
+
+def engine_options(config, url):
+  # create_engine() options from the DB_* settings (see config.py) for the
+  # database at `url`.
+  options = {
+    'pool_pre_ping': bool(config.get('DB_POOL_PRE_PING')),
+  }
+  if config.get('DB_POOL_RECYCLE') is not None:
+    options['pool_recycle'] = config['DB_POOL_RECYCLE']
+
+  in_memory = url.drivername.startswith('sqlite') and url.database in (None, '', ':memory:')
+  if config.get('DB_POOL_SIZE') and not in_memory:
+    options['pool_size'] = config['DB_POOL_SIZE']
+    options['max_overflow'] = config.get('DB_MAX_OVERFLOW', 10)
+    options['pool_timeout'] = config.get('DB_POOL_TIMEOUT', 30)
+    if url.drivername.startswith('sqlite'):
+      # SQLite files are not pooled by default; a pooled connection moves
+      # between threads.
+      options['poolclass'] = QueuePool
+      options['connect_args'] = {'check_same_thread': False}
+
+  timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+  if timeout and url.drivername.startswith('postgres'):
+    options['connect_args'] = {'options': '-c statement_timeout={:d}'.format(int(timeout))}
+  return options
+
+
+class FyyurSQLAlchemy(SQLAlchemy):
+  # Applies engine_options() when the engine is created, so that settings
+  # changed after setup_db() (a test database URL) are honoured.
+
+  def apply_driver_hacks(self, app, sa_url, options):
+    options.update(engine_options(app.config, sa_url))
+    return super(FyyurSQLAlchemy, self).apply_driver_hacks(app, sa_url, options)
+
+
+db = FyyurSQLAlchemy()
+
+# Full-text search document of a Venue or Artist, maintained by fulltext.py.
+# Only Postgres has a tsvector type; elsewhere the column stays empty.
+SearchVector = db.Text().with_variant(TSVECTOR(), 'postgresql')
+
+# Geohash of a venue, see geo.py. Prefix ranges must follow byte order,
+# which Postgres only guarantees under the "C" collation.
+Geohash = db.String(12).with_variant(db.String(12, collation='C'), 'postgresql')
+
+'''
+setup_db(app)
+    binds a flask application and a SQLAlchemy service
+'''
+def setup_db(app):
+  db.app = app
+  db.init_app(app)
+
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+artist_genre = db.Table('artist_genre',
+  db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True)
+)
+
+venue_genre = db.Table('venue_genre',
+  db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True)
+)
+
+class Show(db.Model):
+    __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_date', 'venue_id', 'date'),
+        db.Index('ix_Show_artist_id_date', 'artist_id', 'date'),
+        db.Index('ix_Show_date_id', 'date', 'id'),
+    )
+
+    id = db.Column('id', db.Integer, primary_key=True)
+    venue_id = db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'))
+    start_date = db.Column('date', db.DateTime(), nullable=False)
+    artist_id = db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'))
+
+
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+        db.Index('ix_Venue_geohash', 'geohash'),
+        db.Index('ix_Venue_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    address = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120))
+    website = db.Column(db.String(500))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(1000))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(Geohash)
+    genres = db.relationship('Genre', secondary=venue_genre, backref=db.backref('Venue', lazy=True))
+    shows = db.relationship('Show', backref='Venue', lazy=True)
+    search_vector = db.deferred(db.Column(SearchVector))
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(), nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120))
+    website = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(1000))
+    image_link = db.Column(db.String(500))
+    genres = db.relationship('Genre', secondary=artist_genre, backref=db.backref('Artist', lazy=True))
+    shows = db.relationship('Show', backref='Artist', lazy=True)
+    search_vector = db.deferred(db.Column(SearchVector))
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+
+# Columns set from form fields of the same name, by the bulk import and the
+# edit handlers alike.
+VENUE_FIELDS = ('name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link')
+ARTIST_FIELDS = ('name', 'city', 'state', 'phone', 'image_link', 'facebook_link')
+
+
+
+class Genre(db.Model):
+  __tablename__ = 'Genre'
+
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String(), nullable=False, unique=True, index=True)
+
+
+
+class CounterState(db.Model):
+  # Single row recording up to when the show counters on Venue and Artist
+  # have been rolled over: shows starting before `rolled_at` are counted as
+  # past, the others as upcoming. Maintained by counters.py.
+  __tablename__ = 'CounterState'
+
+  id = db.Column(db.Integer, primary_key=True)
+  rolled_at = db.Column(db.DateTime(), nullable=False)
+
+
+
+class DataVersion(db.Model):
+  # Version number of a collection ('venues', 'artists', 'shows'), bumped
+  # by every write to it. Used for API ETags, see versions.py.
+  __tablename__ = 'DataVersion'
+
+  name = db.Column(db.String(32), primary_key=True)
+  version = db.Column(db.Integer, nullable=False, default=0)
+
+
+@event.listens_for(Genre.__table__, 'after_create')
+def seed_genres(table, connection, **kwargs):
+  # As the migration does, so that the forms have genres to offer.
+  connection.execute(table.insert(), [{'name': name} for name in DEFAULT_GENRES])
+
+
+@event.listens_for(DataVersion.__table__, 'after_create')
+def seed_data_versions(table, connection, **kwargs):
+  # As the migration does, so that tables made by db.create_all() also have
+  # a row to bump and writes stay within their query budgets.
+  connection.execute(table.insert(), [
+    {'name': name, 'version': 0} for name in ('venues', 'artists', 'shows')
+  ])
+
+
+
+#  Analytics rollups, maintained by analytics.py
+#  ----------------------------------------------------------------
+
+class VenueDayStats(db.Model):
+    # Shows per venue per day, with the venue's city when counted.
+    __tablename__ = 'VenueDayStats'
+    __table_args__ = (
+        db.Index('ix_VenueDayStats_state_city_month', 'state', 'city', 'month'),
+    )
+
+    venue_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    month = db.Column(db.Date, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    shows = db.Column(db.Integer, nullable=False)
+
+
+
+class CityMonthStats(db.Model):
+    # Shows per city per month (first day of the month).
+    __tablename__ = 'CityMonthStats'
+    __table_args__ = (
+        db.Index('ix_CityMonthStats_month', 'month'),
+    )
+
+    state = db.Column(db.String(120), primary_key=True)
+    city = db.Column(db.String(120), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    shows = db.Column(db.Integer, nullable=False)
+
+
+
+class GenreCityMonthStats(db.Model):
+    # Shows per genre (of the venue) per city per month.
+    __tablename__ = 'GenreCityMonthStats'
+    __table_args__ = (
+        db.Index('ix_GenreCityMonthStats_genre_id_month', 'genre_id', 'month'),
+    )
+
+    state = db.Column(db.String(120), primary_key=True)
+    city = db.Column(db.String(120), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    genre_id = db.Column(db.Integer, db.ForeignKey('Genre.id'), primary_key=True, autoincrement=False)
+    shows = db.Column(db.Integer, nullable=False)
+
+
+
+class AnalyticsChange(db.Model):
+    # A venue day whose shows changed since the last refresh. Rows are
+    # claimed by a refresh through `batch`, which also stages the city
+    # months it recomputes (rows without venue_id, `day` is the month).
+    __tablename__ = 'AnalyticsChange'
+    __table_args__ = (
+        db.Index('ix_AnalyticsChange_batch', 'batch'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    day = db.Column(db.Date, nullable=False)
+    batch = db.Column(db.String(32))
@@ -0,0 +1,337 @@
+#----------------------------------------------------------------------------#
+# Query layer shared by the views.
+#
+# Each helper issues a fixed number of statements regardless of how many
+# rows it returns, and shapes the result into the structures the templates
+# expect.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import func, and_, or_
+from models import db, Venue, Artist, Show
+
+SEARCH_RESULTS_PER_PAGE = 20
+SHOWS_PER_PAGE = 30
+MAX_SHOWS_PER_PAGE = 100
+SHOW_FILTERS = ('all', 'upcoming', 'past')
+EXPORT_BATCH_SIZE = 1000
+
+ARTIST_IMAGE_PLACEHOLDER = 'https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80'
+VENUE_IMAGE_PLACEHOLDER = 'https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80'
+
+
+def partition_shows(rows, now, format_row):
+  # Splits show rows into (past, upcoming) lists of formatted dicts.
+  past_shows = []
+  upcoming_shows = []
+  for row in rows:
+    target = upcoming_shows if row.start_date >= now else past_shows
+    target.append(format_row(row))
+  return past_shows, upcoming_shows
+
+
+def iter_listing(model, batch_size):
+  # (id, name, city, state, show counters) of every Venue or Artist, one
+  # query per `batch_size` rows, keyset on id.
+  last_id = 0
+  while True:
+    rows = db.session.query(
+        model.id,
+        model.name,
+        model.city,
+        model.state,
+        model.upcoming_shows_count,
+        model.past_shows_count,
+      ) \
+      .filter(model.id > last_id) \
+      .order_by(model.id) \
+      .limit(batch_size) \
+      .all()
+    for row in rows:
+      yield {
+        "id": row.id,
+        "name": row.name,
+        "city": row.city,
+        "state": row.state,
+        "upcoming_shows_count": row.upcoming_shows_count,
+        "past_shows_count": row.past_shows_count,
+      }
+    if len(rows) < batch_size:
+      return
+    last_id = rows[-1].id
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+def iter_venues(batch_size=EXPORT_BATCH_SIZE):
+  # Every venue with its show counters, in keyset batches by id.
+  return iter_listing(Venue, batch_size)
+
+
+def venue_areas():
+  # One query over (state, city, venue, upcoming show count), folded into
+  # the list of areas rendered by pages/venues.html. Counts come from the
+  # counters maintained by counters.py.
+  rows = db.session.query(
+      Venue.state,
+      Venue.city,
+      Venue.id,
+      Venue.name,
+      Venue.upcoming_shows_count.label('num_upcoming_shows'),
+    ) \
+    .order_by(Venue.state, Venue.city, Venue.upcoming_shows_count, Venue.id) \
+    .all()
+
+  areas = []
+  for row in rows:
+    if not areas or areas[-1]['state'] != row.state or areas[-1]['city'] != row.city:
+      areas.append(
+        {
+          "city": row.city,
+          "state": row.state,
+          "venues": [],
+        }
+      )
+    areas[-1]['venues'].append(
+      {
+        "id": row.id,
+        "name": row.name,
+        "num_upcoming_shows": row.num_upcoming_shows,
+      }
+    )
+  return areas
+
+
+def venue_detail(venue_id, now=None):
+  # The venue with its genres (selectinload), then every show joined to its
+  # artist in a single query, split into past and upcoming against one `now`.
+  # Returns None when the venue does not exist.
+  now = now or datetime.now()
+  venue = Venue.query.options(selectinload(Venue.genres)).get(venue_id)
+  if venue is None:
+    return None
+
+  rows = db.session.query(Show.start_date, Artist.id, Artist.name) \
+    .join(Artist, Show.artist_id == Artist.id) \
+    .filter(Show.venue_id == venue.id) \
+    .order_by(Show.start_date, Show.id) \
+    .all()
+
+  past_shows, upcoming_shows = partition_shows(rows, now, lambda row: {
+    "artist_id": row.id,
+    "artist_name": row.name,
+    "artist_image_link": ARTIST_IMAGE_PLACEHOLDER,
+    "start_time": row.start_date,
+  })
+
+  return {
+    "id": venue.id,
+    "name": venue.name,
+    "genres": [genre.name for genre in venue.genres],
+    "address": venue.address,
+    "city": venue.city,
+    "state": venue.state,
+    "phone": venue.phone,
+    "website": venue.website,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "latitude": venue.latitude,
+    "longitude": venue.longitude,
+    "image_link": VENUE_IMAGE_PLACEHOLDER,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows),
+  }
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+def iter_artists(batch_size=EXPORT_BATCH_SIZE):
+  # Every artist with its show counters, in keyset batches by id.
+  return iter_listing(Artist, batch_size)
+
+
+def artist_detail(artist_id, now=None):
+  # Mirror of venue_detail(): the artist with its genres, then every show
+  # joined to its venue. Returns None when the artist does not exist.
+  now = now or datetime.now()
+  artist = Artist.query.options(selectinload(Artist.genres)).get(artist_id)
+  if artist is None:
+    return None
+
+  rows = db.session.query(Show.start_date, Venue.id, Venue.name) \
+    .join(Venue, Show.venue_id == Venue.id) \
+    .filter(Show.artist_id == artist.id) \
+    .order_by(Show.start_date, Show.id) \
+    .all()
+
+  past_shows, upcoming_shows = partition_shows(rows, now, lambda row: {
+    "venue_id": row.id,
+    "venue_name": row.name,
+    "venue_image_link": VENUE_IMAGE_PLACEHOLDER,
+    "start_time": row.start_date,
+  })
+
+  return {
+    "id": artist.id,
+    "name": artist.name,
+    "genres": [genre.name for genre in artist.genres],
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "seeking_venue": artist.seeking_venue,
+    "image_link": ARTIST_IMAGE_PLACEHOLDER,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows),
+  }
+
+
+#  Search
+#  ----------------------------------------------------------------
+
+def search_results(model, search_term, page=1, per_page=SEARCH_RESULTS_PER_PAGE):
+  # Case-insensitive partial name search over Venue or Artist, one page of
+  # matches with their upcoming show counters. The total is only counted
+  # separately when the page is full or past the first one.
+  page = max(page, 1)
+  matches = func.upper(model.name).like(func.upper('%{}%'.format(search_term)))
+
+  rows = db.session.query(
+      model.id,
+      model.name,
+      model.upcoming_shows_count.label('num_upcoming_shows'),
+    ) \
+    .filter(matches) \
+    .order_by(model.name, model.id) \
+    .limit(per_page) \
+    .offset((page - 1) * per_page) \
+    .all()
+
+  if page == 1 and len(rows) < per_page:
+    count = len(rows)
+  else:
+    count = db.session.query(func.count(model.id)).filter(matches).scalar()
+
+  return {
+    "count": count,
+    "page": page,
+    "per_page": per_page,
+    "has_next": page * per_page < count,
+    "data": [
+      {
+        "id": row.id,
+        "name": row.name,
+        "num_upcoming_shows": row.num_upcoming_shows,
+      }
+      for row in rows
+    ],
+  }
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def encode_show_cursor(start_date, show_id):
+  return '{}_{}'.format(start_date.strftime('%Y%m%dT%H%M%S%f'), show_id)
+
+
+def decode_show_cursor(cursor):
+  # Raises ValueError for anything encode_show_cursor() could not have made.
+  start_date, show_id = cursor.split('_')
+  return datetime.strptime(start_date, '%Y%m%dT%H%M%S%f'), int(show_id)
+
+
+def show_rows(after=None, when='all', now=None):
+  # Show-Venue-Artist join in listing order for `when`, starting after the
+  # cursor `after`. Past shows are listed most recent first, everything
+  # else soonest first.
+  if when not in SHOW_FILTERS:
+    raise ValueError('unknown show filter: {}'.format(when))
+  now = now or datetime.now()
+  descending = when == 'past'
+
+  query = db.session.query(
+      Show.id,
+      Show.start_date,
+      Venue.id.label('venue_id'),
+      Venue.name.label('venue_name'),
+      Artist.id.label('artist_id'),
+      Artist.name.label('artist_name'),
+    ) \
+    .join(Venue, Show.venue_id == Venue.id) \
+    .join(Artist, Show.artist_id == Artist.id)
+
+  if when == 'upcoming':
+    query = query.filter(Show.start_date >= now)
+  elif when == 'past':
+    query = query.filter(Show.start_date < now)
+
+  if after:
+    start_date, show_id = decode_show_cursor(after)
+    if descending:
+      query = query.filter(or_(
+        Show.start_date < start_date,
+        and_(Show.start_date == start_date, Show.id < show_id),
+      ))
+    else:
+      query = query.filter(or_(
+        Show.start_date > start_date,
+        and_(Show.start_date == start_date, Show.id > show_id),
+      ))
+
+  if descending:
+    return query.order_by(Show.start_date.desc(), Show.id.desc())
+  return query.order_by(Show.start_date, Show.id)
+
+
+def format_show(row):
+  return {
+    "venue_id": row.venue_id,
+    "venue_name": row.venue_name,
+    "artist_id": row.artist_id,
+    "artist_name": row.artist_name,
+    "artist_image_link": ARTIST_IMAGE_PLACEHOLDER,
+    "start_time": row.start_date,
+  }
+
+
+def shows_page(after=None, per_page=SHOWS_PER_PAGE, when='all', now=None):
+  # One query per page, paginated by keyset on (start_date, id) so that
+  # deep pages cost the same as the first one. `after` is the cursor
+  # returned as `next_cursor` by the previous page.
+  per_page = min(max(per_page, 1), MAX_SHOWS_PER_PAGE)
+  rows = show_rows(after, when, now).limit(per_page + 1).all()
+  next_cursor = None
+  if len(rows) > per_page:
+    rows = rows[:per_page]
+    next_cursor = encode_show_cursor(rows[-1].start_date, rows[-1].id)
+
+  return {
+    "when": when,
+    "per_page": per_page,
+    "next_cursor": next_cursor,
+    "shows": [format_show(row) for row in rows],
+  }
+
+
+def iter_shows(when='all', now=None, batch_size=EXPORT_BATCH_SIZE):
+  # Every show for `when`, fetched in keyset batches so that memory stays
+  # flat however many shows there are. Each yielded dict also carries the
+  # show id.
+  now = now or datetime.now()
+  after = None
+  while True:
+    rows = show_rows(after, when, now).limit(batch_size).all()
+    for row in rows:
+      show = format_show(row)
+      show["id"] = row.id
+      yield show
+    if len(rows) < batch_size:
+      return
+    after = encode_show_cursor(rows[-1].start_date, rows[-1].id)
@@ -0,0 +1,355 @@
+#----------------------------------------------------------------------------#
+# Deterministic sample data (flask fyyur-seed, and the benchmarks).
+#
+# The same seed and day give the same venues, artists and shows:
+#
+#   * venues and artists are spread over the cities of data/us_cities.csv
+#     with a long tail (a few big cities hold most of them), and get one to
+#     three genres weighted by popularity
+#   * a few venues and artists book most shows (Pareto weights)
+#   * shows start on a grid of evening slots from PAST_DAYS before to
+#     FUTURE_DAYS after the day, busier at weekends and thinning out
+#     further ahead; slots are more than SHOW_LENGTH apart and no venue or
+#     artist is booked twice in a slot, so shows never overlap
+#   * when the weighted picks keep landing on booked slots, picks turn
+#     uniform and at last scan for a free slot, so any number of shows the
+#     slots can hold is placed; more than that is refused before anything
+#     is inserted
+#
+# Rows go in with importer.insert_rows() (COPY on Postgres) in chunks, and
+# finish() rebuilds the show counters, analytics rollups, search index and
+# versions once. seed_database() deletes what it inserted when it fails.
+#----------------------------------------------------------------------------#
+
+import bisect
+import csv
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy.sql import func
+
+from models import db, Venue, Artist, Show, venue_genre, artist_genre
+from genre_registry import resolve_ids
+from importer import allocate_ids, insert_rows
+from bookings import SHOW_LENGTH
+from cache import page_cache
+import analytics
+import counters
+import fulltext
+import geo
+import versions
+
+CHUNK_SIZE = 10000
+PAST_DAYS = 730
+FUTURE_DAYS = 365
+SLOT_HOURS = (17, 20, 23)
+MAX_ATTEMPTS = 50
+
+# Relative booking activity per weekday (Monday first) and slot hour.
+WEEKDAY_WEIGHTS = (0.6, 0.6, 0.8, 1.0, 1.6, 1.8, 1.0)
+HOUR_WEIGHTS = {17: 0.5, 20: 1.0, 23: 0.6}
+# Weight of the last future slot relative to today's.
+FUTURE_FALLOFF = 0.2
+
+GENRE_WEIGHTS = {
+  'Rock n Roll': 10, 'Pop': 9, 'Hip-Hop': 8, 'Alternative': 7, 'Jazz': 6,
+  'Electronic': 6, 'Country': 5, 'R&B': 5, 'Folk': 4, 'Blues': 4, 'Soul': 3,
+  'Punk': 3, 'Heavy Metal': 3, 'Reggae': 2, 'Classical': 2, 'Funk': 2,
+  'Instrumental': 1, 'Musical Theatre': 1, 'Other': 1,
+}
+SEEKING_RATE = 0.3
+
+ADJECTIVES = (
+  'Blue', 'Golden', 'Velvet', 'Silver', 'Electric', 'Lucky', 'Grand', 'Little',
+  'Crimson', 'Hidden', 'Rusty', 'Midnight', 'Wild', 'Neon', 'Painted', 'Broken',
+)
+VENUE_NOUNS = (
+  'Room', 'Hall', 'Lounge', 'Club', 'Theater', 'Tavern', 'Ballroom', 'Cellar',
+  'Garden', 'Warehouse', 'Stage', 'Saloon', 'Bar', 'Pavilion', 'Depot', 'Attic',
+)
+ARTIST_NOUNS = (
+  'Wolves', 'Petals', 'Rivers', 'Ghosts', 'Machines', 'Sparrows', 'Lions', 'Echoes',
+  'Hearts', 'Satellites', 'Horses', 'Lanterns', 'Mirrors', 'Thieves', 'Tides', 'Owls',
+)
+STREETS = (
+  'Main Street', 'Market Street', 'Broadway', '2nd Avenue', 'Oak Street',
+  'Elm Street', 'Mission Street', 'Sunset Boulevard', 'Park Avenue', 'River Road',
+)
+
+assert timedelta(hours=min(b - a for a, b in zip(SLOT_HOURS, SLOT_HOURS[1:]))) > SHOW_LENGTH
+assert timedelta(hours=24 + SLOT_HOURS[0] - SLOT_HOURS[-1]) > SHOW_LENGTH
+
+
+def cities():
+  # [(city, state)] in file order.
+  with open(geo.PLACES_PATH, encoding='utf-8') as places_file:
+    return [(row['city'], row['state']) for row in csv.DictReader(places_file)]
+
+
+def is_free(mask, slot):
+  return not mask[slot >> 3] & (1 << (slot & 7))
+
+
+def book(mask, slot):
+  mask[slot >> 3] |= 1 << (slot & 7)
+
+
+class Seeder(object):
+  # Generates and inserts venues, artists and shows. Shows are kept apart
+  # from the other shows of the same Seeder, not from rows already in the
+  # database.
+
+  def __init__(self, seed=0, today=None, past_days=PAST_DAYS, future_days=FUTURE_DAYS, chunk_size=CHUNK_SIZE):
+    self.rng = random.Random(seed)
+    self.chunk_size = chunk_size
+    today = today or datetime.now()
+    self.first_day = datetime(today.year, today.month, today.day) - timedelta(days=past_days)
+
+    places = cities()
+    self.rng.shuffle(places)
+    self.cities = places
+    self.city_weights = list(accumulate(1.0 / rank for rank in range(1, len(places) + 1)))
+    self.genre_names = sorted(GENRE_WEIGHTS)
+    self.genre_weights = list(accumulate(GENRE_WEIGHTS[name] for name in self.genre_names))
+
+    weights = []
+    self.slot_starts = []
+    for day in range(past_days + future_days):
+      date = self.first_day + timedelta(days=day)
+      ahead = max(0, day - past_days) / float(future_days or 1)
+      for hour in SLOT_HOURS:
+        weights.append(WEEKDAY_WEIGHTS[date.weekday()] * HOUR_WEIGHTS[hour] * (1 - (1 - FUTURE_FALLOFF) * ahead))
+        self.slot_starts.append(date + timedelta(hours=hour))
+    self.slot_weights = list(accumulate(weights))
+    self.mask_bytes = (len(weights) + 7) // 8
+    # Shows booked per slot.
+    self.slot_shows = [0] * len(weights)
+
+    # Per side: ids, cumulative booking weights and booked-slot bitmaps.
+    self.sides = {
+      'venue': {'ids': [], 'weights': [], 'masks': []},
+      'artist': {'ids': [], 'weights': [], 'masks': []},
+    }
+    self.created = {Venue: [], Artist: []}
+    # Largest Show id before the first show of this Seeder.
+    self.shows_after = None
+
+  #  Choices
+  #  ----------------------------------------------------------------
+
+  def pick(self, cumulative, values=None):
+    i = bisect.bisect(cumulative, self.rng.random() * cumulative[-1])
+    return i if values is None else values[i]
+
+  def city(self):
+    return self.pick(self.city_weights, self.cities)
+
+  def genres(self, most):
+    count = self.rng.randint(1, most)
+    names = set()
+    while len(names) < count:
+      names.add(self.pick(self.genre_weights, self.genre_names))
+    return sorted(names)
+
+  def phone(self):
+    return '{}-{}-{:04d}'.format(self.rng.randint(200, 999), self.rng.randint(200, 999), self.rng.randint(0, 9999))
+
+  def add_side(self, side, ids):
+    entries = self.sides[side]
+    total = entries['weights'][-1] if entries['weights'] else 0.0
+    for entity_id in ids:
+      total += self.rng.paretovariate(1.5)
+      entries['ids'].append(entity_id)
+      entries['weights'].append(total)
+      entries['masks'].append(bytearray(self.mask_bytes))
+
+  #  Loading
+  #  ----------------------------------------------------------------
+
+  def listings(self, model, links, fk, count, row):
+    # Inserts `count` venues or artists built by row(id) -> (columns,
+    # genre names). Returns their ids.
+    genre_ids = resolve_ids(self.genre_names)
+    new_ids = []
+    for start in range(0, count, self.chunk_size):
+      ids = allocate_ids(model, min(self.chunk_size, count - start))
+      rows, link_rows = [], []
+      for entity_id in ids:
+        columns, genres = row(entity_id)
+        rows.append(columns)
+        link_rows.extend({fk: entity_id, 'genre_id': genre_ids[name]} for name in genres)
+      insert_rows(model.__table__, rows)
+      insert_rows(links, link_rows)
+      db.session.commit()
+      new_ids.extend(ids)
+    self.created[model].extend(new_ids)
+    return new_ids
+
+  def venue_row(self, venue_id):
+    city, state = self.city()
+    name = 'The {} {}'.format(self.rng.choice(ADJECTIVES), self.rng.choice(VENUE_NOUNS))
+    seeking = self.rng.random() < SEEKING_RATE
+    columns = {
+      'id': venue_id,
+      'name': name,
+      'city': city,
+      'state': state,
+      'address': '{} {}'.format(self.rng.randint(1, 9999), self.rng.choice(STREETS)),
+      'phone': self.phone(),
+      'website': 'https://venue{}.example.com'.format(venue_id),
+      'image_link': None,
+      'facebook_link': 'https://www.facebook.com/venue{}'.format(venue_id),
+      'seeking_talent': seeking,
+      'seeking_description': 'Looking for local {} acts.'.format(city) if seeking else None,
+    }
+    columns.update(geo.location(city, state))
+    return columns, self.genres(3)
+
+  def artist_row(self, artist_id):
+    city, state = self.city()
+    seeking = self.rng.random() < SEEKING_RATE
+    columns = {
+      'id': artist_id,
+      'name': '{} {}'.format(self.rng.choice(ADJECTIVES), self.rng.choice(ARTIST_NOUNS)),
+      'city': city,
+      'state': state,
+      'phone': self.phone(),
+      'website': None,
+      'image_link': None,
+      'facebook_link': 'https://www.facebook.com/artist{}'.format(artist_id),
+      'seeking_venue': seeking,
+      'seeking_description': 'Touring, looking for venues.' if seeking else None,
+    }
+    return columns, self.genres(2)
+
+  def venues(self, count):
+    ids = self.listings(Venue, venue_genre, 'venue_id', count, self.venue_row)
+    self.add_side('venue', ids)
+    return ids
+
+  def artists(self, count):
+    ids = self.listings(Artist, artist_genre, 'artist_id', count, self.artist_row)
+    self.add_side('artist', ids)
+    return ids
+
+  def capacity(self, venues, artists):
+    # Most shows `venues` venues and `artists` artists can hold: each show
+    # takes a slot of one venue and, when there are artists, of one artist.
+    return len(self.slot_starts) * (min(venues, artists) if artists else venues)
+
+  def free_capacity(self):
+    return self.capacity(len(self.sides['venue']['ids']), len(self.sides['artist']['ids'])) - sum(self.slot_shows)
+
+  def reserve(self, slot, v, a):
+    venues, artists = self.sides['venue'], self.sides['artist']
+    book(venues['masks'][v], slot)
+    if a is not None:
+      book(artists['masks'][a], slot)
+    self.slot_shows[slot] += 1
+    return venues['ids'][v], artists['ids'][a] if a is not None else None, self.slot_starts[slot]
+
+  def first_free(self, masks, slot):
+    for i, mask in enumerate(masks):
+      if is_free(mask, slot):
+        return i
+    return None
+
+  def booking(self):
+    # (venue_id, artist_id, start) of a free slot; artist_id is None when
+    # there are no artists. Weighted picks first, uniform ones once the
+    # popular venues, artists and evenings are booked up, then a scan from
+    # a random slot, which finds one whenever free_capacity() is positive.
+    venues, artists = self.sides['venue'], self.sides['artist']
+    uniform = lambda cumulative: self.rng.randrange(len(cumulative))
+    for pick in (self.pick, uniform):
+      for _ in range(MAX_ATTEMPTS):
+        slot = pick(self.slot_weights)
+        v = pick(venues['weights'])
+        if not is_free(venues['masks'][v], slot):
+          continue
+        if not artists['ids']:
+          return self.reserve(slot, v, None)
+        a = pick(artists['weights'])
+        if is_free(artists['masks'][a], slot):
+          return self.reserve(slot, v, a)
+
+    # A slot with fewer shows than venues (and artists) has a free venue
+    # (and artist).
+    limit = min(len(venues['ids']), len(artists['ids'])) if artists['ids'] else len(venues['ids'])
+    start = self.rng.randrange(len(self.slot_starts))
+    for i in range(len(self.slot_starts)):
+      slot = (start + i) % len(self.slot_starts)
+      if self.slot_shows[slot] < limit:
+        a = self.first_free(artists['masks'], slot) if artists['ids'] else None
+        return self.reserve(slot, self.first_free(venues['masks'], slot), a)
+    raise ValueError('no free slot left: too many shows for the venues, artists and days')
+
+  def shows(self, count):
+    # Inserts `count` shows between the venues and artists of this Seeder,
+    # or those already in the database when it made none.
+    for side, model in (('venue', Venue), ('artist', Artist)):
+      if not self.sides[side]['ids']:
+        self.add_side(side, [entity_id for entity_id, in db.session.query(model.id).order_by(model.id)])
+    if not self.sides['venue']['ids']:
+      raise ValueError('shows need venues')
+    if count > self.free_capacity():
+      raise ValueError('{} shows do not fit: {} venues and {} artists have {} free slots over {} days'.format(
+        count, len(self.sides['venue']['ids']), len(self.sides['artist']['ids']), self.free_capacity(),
+        len(self.slot_starts) // len(SLOT_HOURS)))
+    if self.shows_after is None:
+      self.shows_after = db.session.query(func.max(Show.id)).scalar() or 0
+
+    for start in range(0, count, self.chunk_size):
+      rows = []
+      for _ in range(min(self.chunk_size, count - start)):
+        venue_id, artist_id, start_date = self.booking()
+        # Core rows are keyed by column name: Show.start_date is the date column.
+        rows.append({'venue_id': venue_id, 'artist_id': artist_id, 'date': start_date})
+      insert_rows(Show.__table__, rows)
+      db.session.commit()
+
+  def finish(self):
+    # Rebuilds the show counters, the analytics rollups, the search index of
+    # the new rows and the collection versions, and empties the page cache.
+    counters.reconcile()
+    analytics.rebuild()
+    for model, ids in self.created.items():
+      if ids:
+        fulltext.refresh(model, ids)
+    versions.bump(versions.VENUES, versions.ARTISTS, versions.SHOWS)
+    db.session.commit()
+    page_cache.clear()
+
+  def discard(self):
+    # Deletes the shows, venues and artists this Seeder inserted, before
+    # finish(). Like allocate_ids(), assumes it was the only writer: its
+    # rows are the ones after the ids it started from.
+    db.session.rollback()
+    if self.shows_after is not None:
+      db.session.query(Show).filter(Show.id > self.shows_after).delete(synchronize_session=False)
+    for model, links, fk in ((Venue, venue_genre, 'venue_id'), (Artist, artist_genre, 'artist_id')):
+      if self.created[model]:
+        first = min(self.created[model])
+        db.session.execute(links.delete().where(links.c[fk] >= first))
+        db.session.query(model).filter(model.id >= first).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def seed_database(venues, artists, shows, seed=0, today=None, chunk_size=CHUNK_SIZE):
+  # All or nothing: the show count is checked before anything is inserted,
+  # and the rows are deleted again when a later step fails.
+  seeder = Seeder(seed, today=today, chunk_size=chunk_size)
+  # (Without venues of its own, shows() checks the ones in the database.)
+  if venues and shows > seeder.capacity(venues, artists):
+    raise ValueError('{} shows do not fit: {} venues and {} artists have {} slots over {} days'.format(
+      shows, venues, artists, seeder.capacity(venues, artists), len(seeder.slot_starts) // len(SLOT_HOURS)))
+  try:
+    seeder.venues(venues)
+    seeder.artists(artists)
+    seeder.shows(shows)
+  except Exception:
+    seeder.discard()
+    raise
+  seeder.finish()
+  return seeder
@@ -0,0 +1,95 @@
+#----------------------------------------------------------------------------#
+# Template loading and start-up warm-up per environment.
+#
+# In development templates are checked for changes and recompiled. In
+# production (see config.py):
+#
+#   TEMPLATES_AUTO_RELOAD = False   compiled templates are never re-checked
+#   TEMPLATE_BYTECODE_CACHE         compiled templates are kept as bytecode
+#                                   in TEMPLATE_CACHE_DIR, so that a fresh
+#                                   process loads them instead of parsing
+#                                   and compiling the sources again
+#   TEMPLATE_PRECOMPILE             every template is compiled (or loaded
+#                                   from the bytecode cache) at startup,
+#                                   before the first request needs it
+#   WARM_UP                         so is everything else the first request
+#                                   would load: the locale data of the
+#                                   datetime filters, the ORM mapper
+#                                   configuration and the database engine
+#----------------------------------------------------------------------------#
+
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.orm import configure_mappers
+
+from models import db
+from datetimes import FORMATS, format_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class AtomicBytecodeCache(FileSystemBytecodeCache):
+  # Writes each file under a temporary name and renames it into place, so
+  # that processes starting together never read a half-written file.
+
+  def dump_bytecode(self, bucket):
+    filename = self._get_cache_filename(bucket)
+    fd, temporary = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        bucket.write_bytecode(f)
+      os.replace(temporary, filename)
+    except OSError:
+      # The cache is an optimization: a read-only directory only costs
+      # compile time.
+      try:
+        os.remove(temporary)
+      except OSError:
+        pass
+
+
+def precompile(app):
+  # Compiles every template of the app and its blueprints into the Jinja
+  # cache. Returns their number.
+  env = app.jinja_env
+  names = [name for name in env.list_templates() if name.endswith('.html')]
+  for name in names:
+    env.get_template(name)
+  return len(names)
+
+
+def warm_up(app):
+  for format in FORMATS:
+    format_datetime(datetime(2000, 1, 1, 20), format)
+  configure_mappers()
+  # Creates the engine and its pool; connections are opened on use.
+  db.get_engine(app)
+
+
+def setup_templates(app):
+  # Call after the filters are registered: templates using a filter the
+  # environment does not know fail to compile.
+  env = app.jinja_env
+  auto_reload = app.config.get('TEMPLATES_AUTO_RELOAD')
+  env.auto_reload = app.debug if auto_reload is None else auto_reload
+
+  if app.config.get('TEMPLATE_BYTECODE_CACHE'):
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    env.bytecode_cache = AtomicBytecodeCache(directory)
+
+  if app.config.get('TEMPLATE_PRECOMPILE'):
+    started = time.perf_counter()
+    count = precompile(app)
+    logger.info('%d templates compiled in %.1fms', count, (time.perf_counter() - started) * 1000)
+
+  if app.config.get('WARM_UP'):
+    started = time.perf_counter()
+    warm_up(app)
+    logger.info('warmed up in %.1fms', (time.perf_counter() - started) * 1000)
@@ -0,0 +1,46 @@
+#----------------------------------------------------------------------------#
+# Collection versions.
+#
+# Every write to venues, artists or shows bumps the matching DataVersion row
+# in the same transaction, so "has anything changed?" is a primary key
+# lookup. The JSON API builds its ETags from these numbers.
+#----------------------------------------------------------------------------#
+
+from models import db, DataVersion
+
+VENUES = 'venues'
+ARTISTS = 'artists'
+SHOWS = 'shows'
+
+
+def current(*names):
+  # {name: version} for the given collections; unknown names are at 0.
+  found = dict(
+    db.session.query(DataVersion.name, DataVersion.version)
+      .filter(DataVersion.name.in_(names))
+      .all()
+  )
+  return {name: found.get(name, 0) for name in names}
+
+
+def bump(*names):
+  updated = db.session.query(DataVersion) \
+    .filter(DataVersion.name.in_(names)) \
+    .update({DataVersion.version: DataVersion.version + 1}, synchronize_session=False)
+  if updated < len(names):
+    # Only reached on databases created without the migrations.
+    existing = {name for name, in db.session.query(DataVersion.name).filter(DataVersion.name.in_(names))}
+    for name in names:
+      if name not in existing:
+        db.session.add(DataVersion(name=name, version=1))
+
+
+def etag(*parts):
+  # ETag value made of fixed parts and the current version of every
+  # collection named in `parts`.
+  collections = [part for part in parts if part in (VENUES, ARTISTS, SHOWS)]
+  numbers = current(*collections)
+  return '-'.join(
+    '{}{}'.format(part, numbers[part]) if part in numbers else str(part)
+    for part in parts
+  )
@@ -0,0 +1,13 @@
+#----------------------------------------------------------------------------#
+# Production entry point:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# app.py's app.run() is the single-process development server.
+#----------------------------------------------------------------------------#
+
+import os
+
+os.environ.setdefault('FYYUR_ENV', 'production')
+
+from app import app  # noqa: E402
@@ -0,0 +1,118 @@
+#----------------------------------------------------------------------------#
+# POST /quizzes latency and queries over a bank of 1M questions, as a quiz
+# goes on (previous_questions growing), in one category and in all of them:
+# the request, random_question() alone (the request less encoding and
+# parsing previous_questions), and loading every candidate and calling
+# random.choice.
+#
+# Runs on a temporary SQLite database unless DATABASE_URL is set (to an
+# empty database: the questions and categories tables are filled).
+#
+#   python benchmarks/bench_quizzes.py
+#----------------------------------------------------------------------------#
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+
+directory = tempfile.mkdtemp(prefix='trivia-bench-')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(directory, 'trivia.db'))
+
+from sqlalchemy import event
+
+from flaskr import create_app, random_question
+from models import db, Question, Category
+
+QUESTIONS = 1000000
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports']
+PLAYED = [0, 10, 100, 1000, 10000, 100000]
+NAIVE_PLAYED = [0, 1000, 10000]
+REPEAT = 20
+CHUNK = 50000
+
+
+def load(seed=0):
+  rng = random.Random(seed)
+  db.session.execute(Category.__table__.insert(), [{'id': i, 'type': t} for i, t in enumerate(CATEGORIES, 1)])
+  for start in range(1, QUESTIONS + 1, CHUNK):
+    db.session.execute(Question.__table__.insert(), [
+      {'id': i, 'question': 'Question {}?'.format(i), 'answer': 'Answer {}'.format(i),
+       'category': str(rng.randint(1, len(CATEGORIES))), 'difficulty': rng.randint(1, 5)}
+      for i in range(start, min(start + CHUNK, QUESTIONS + 1))
+    ])
+  db.session.commit()
+
+
+def naive_question(category_id, previous_ids):
+  query = Question.query
+  if category_id:
+    query = query.filter(Question.category == str(category_id))
+  candidates = query.filter(~Question.id.in_(previous_ids)).all() if previous_ids else query.all()
+  return random.choice(candidates) if candidates else None
+
+
+def median(values):
+  values = sorted(values)
+  return values[len(values) // 2]
+
+
+def measure(fn, repeat):
+  # (median ms, queries per call)
+  queries = []
+  listener = lambda *args: queries.append(1)
+  event.listen(db.engine, 'before_cursor_execute', listener)
+  try:
+    times = []
+    for _ in range(repeat):
+      started = time.perf_counter()
+      fn()
+      times.append((time.perf_counter() - started) * 1000)
+      db.session.remove()
+  finally:
+    event.remove(db.engine, 'before_cursor_execute', listener)
+  return median(times), len(queries) / float(repeat)
+
+
+def main():
+  app = create_app()
+  client = app.test_client()
+  with app.app_context():
+    if not Question.query.first():
+      started = time.perf_counter()
+      load()
+      print('{} questions loaded in {:.1f}s'.format(QUESTIONS, time.perf_counter() - started))
+    ids = {0: [question_id for (question_id,) in db.session.query(Question.id)]}
+    ids[1] = [question_id for (question_id,) in db.session.query(Question.id).filter(Question.category == '1')]
+
+  rng = random.Random(1)
+  print('%-9s %-8s %11s %9s %11s %11s' % ('category', 'played', '/quizzes', 'queries', 'selector', 'load all'))
+  with app.app_context():
+    for category_id, name in ((1, 'Science'), (0, 'all')):
+      for played in PLAYED:
+        previous = rng.sample(ids[category_id], played)
+        body = {'previous_questions': previous, 'quiz_category': {'type': name, 'id': category_id}}
+
+        def request():
+          response = client.post('/quizzes', json=body)
+          assert response.status_code == 200 and response.get_json()['question'], response.status_code
+        endpoint, queries = measure(request, REPEAT)
+        previous_ids = set(previous)
+        selector = measure(lambda: random_question(category_id, previous_ids), REPEAT)[0]
+
+        naive = ''
+        if played in NAIVE_PLAYED:
+          naive = '%.1fms' % measure(lambda: naive_question(category_id, previous), 1)[0]
+        print('%-9s %-8d %9.2fms %9.1f %9.2fms %11s' % (name, played, endpoint, queries, selector, naive))
+
+
+if __name__ == '__main__':
+  try:
+    main()
+  finally:
+    shutil.rmtree(directory, ignore_errors=True)
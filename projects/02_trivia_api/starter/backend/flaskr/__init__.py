@@ -4,9 +4,89 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
 
-from models import setup_db, Question, Category
+from models import setup_db, db, Question, Category, question_count, category_types
 
 QUESTIONS_PER_PAGE = 10
+QUIZ_PROBE_SIZE = 16
+QUIZ_MAX_PROBE_SIZE = 1024
+
+def int_arg(name, default=None):
+  value = request.args.get(name)
+  if value is None:
+    return default
+  try:
+    return int(value)
+  except ValueError:
+    abort(400)
+
+'''
+paginate_questions()
+    the page of questions asked for, by id: after the id in `after` when
+    given (keyset, as cheap for the last page as for the first), else the
+    1-based `page` (LIMIT/OFFSET), 404 past the last. Returns (questions,
+    the `after` of the next page or None on the last one).
+'''
+def paginate_questions():
+  query = Question.query.order_by(Question.id)
+  after = int_arg('after')
+  if after is not None:
+    query = query.filter(Question.id > after)
+  else:
+    page = int_arg('page', 1)
+    if page < 1:
+      abort(400)
+    query = query.offset((page - 1) * QUESTIONS_PER_PAGE)
+  # One row past the page tells whether another follows.
+  questions = query.limit(QUESTIONS_PER_PAGE + 1).all()
+  if not questions and after is None and page > 1:
+    abort(404)
+  if len(questions) > QUESTIONS_PER_PAGE:
+    return questions[:QUESTIONS_PER_PAGE], questions[QUESTIONS_PER_PAGE - 1].id
+  return questions, None
+
+'''
+random_question(category_id, previous_ids)
+    a question drawn uniformly among those of the category (any when
+    category_id is 0) not in previous_ids, or None when none is left.
+    Random ids of the category's id range are looked up by primary key, in
+    batches growing until one holds a question left to play, so the work is
+    a few index lookups however large the bank or previous_ids. Only when
+    the batches keep missing (a sparse category, or one nearly played out)
+    are the questions left counted, in the database, and one read at a
+    random offset.
+'''
+def random_question(category_id, previous_ids):
+  query = Question.query
+  if category_id:
+    query = query.filter(Question.category == str(category_id))
+  # A subquery each, since databases read min() or max() alone off the end
+  # of an index but scan for both together.
+  lowest, highest = db.session.query(
+    query.with_entities(db.func.min(Question.id)).as_scalar(),
+    query.with_entities(db.func.max(Question.id)).as_scalar()
+  ).one()
+  if lowest is None:
+    return None
+
+  ids = range(lowest, highest + 1)
+  size = QUIZ_PROBE_SIZE
+  while size <= QUIZ_MAX_PROBE_SIZE:
+    probe = random.sample(ids, min(size, len(ids)))
+    hits = [question for question in query.filter(Question.id.in_(probe)) if question.id not in previous_ids]
+    if hits:
+      return random.choice(hits)
+    if len(probe) == len(ids):
+      return None
+    size *= 4
+
+  # The NOT IN is as long as the quiz, not the category.
+  remaining = query
+  if previous_ids:
+    remaining = remaining.filter(~Question.id.in_(previous_ids))
+  count = remaining.with_entities(db.func.count(Question.id)).scalar()
+  if not count:
+    return None
+  return remaining.order_by(Question.id).offset(random.randrange(count)).first()
 
 def create_app(test_config=None):
   # create and configure the app
@@ -21,25 +101,27 @@ def create_app(test_config=None):
   @TODO: Use the after_request decorator to set Access-Control-Allow
   '''
 
-  '''
-  @TODO: 
-  Create an endpoint to handle GET requests 
-  for all available categories.
-  '''
-
-
-  '''
-  @TODO: 
-  Create an endpoint to handle GET requests for questions, 
-  including pagination (every 10 questions). 
-  This endpoint should return a list of questions, 
-  number of total questions, current category, categories. 
-
-  TEST: At this point, when you start the application
-  you should see questions and categories generated,
-  ten questions per page and pagination at the bottom of the screen for three pages.
-  Clicking on the page numbers should update the questions. 
-  '''
+  @app.route('/categories')
+  def get_categories():
+    categories = category_types.get()
+    if not categories:
+      abort(404)
+    return jsonify({
+      'success': True,
+      'categories': categories
+    })
+
+  @app.route('/questions')
+  def get_questions():
+    questions, next_cursor = paginate_questions()
+    return jsonify({
+      'success': True,
+      'questions': [question.format() for question in questions],
+      'total_questions': question_count.get(),
+      'categories': category_types.get(),
+      'current_category': None,
+      'next_cursor': next_cursor
+    })
 
   '''
   @TODO: 
@@ -81,23 +163,48 @@ def create_app(test_config=None):
   '''
 
 
-  '''
-  @TODO: 
-  Create a POST endpoint to get questions to play the quiz. 
-  This endpoint should take category and previous question parameters 
-  and return a random questions within the given category, 
-  if provided, and that is not one of the previous questions. 
-
-  TEST: In the "Play" tab, after a user selects "All" or a category,
-  one question at a time is displayed, the user is allowed to answer
-  and shown whether they were correct or not. 
-  '''
-
-  '''
-  @TODO: 
-  Create error handlers for all expected errors 
-  including 404 and 422. 
-  '''
+  @app.route('/quizzes', methods=['POST'])
+  def play_quiz():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+      abort(400)
+    try:
+      category_id = int((body.get('quiz_category') or {}).get('id', 0))
+      previous_ids = {int(question_id) for question_id in body.get('previous_questions') or []}
+    except (AttributeError, TypeError, ValueError):
+      abort(422)
+    if category_id and str(category_id) not in category_types.get():
+      abort(404)
+
+    question = random_question(category_id, previous_ids)
+    return jsonify({
+      'success': True,
+      'question': question.format() if question else None
+    })
+
+  @app.errorhandler(400)
+  def bad_request(error):
+    return jsonify({
+      'success': False,
+      'error': 400,
+      'message': 'bad request'
+    }), 400
+
+  @app.errorhandler(404)
+  def not_found(error):
+    return jsonify({
+      'success': False,
+      'error': 404,
+      'message': 'resource not found'
+    }), 404
+
+  @app.errorhandler(422)
+  def unprocessable(error):
+    return jsonify({
+      'success': False,
+      'error': 422,
+      'message': 'unprocessable'
+    }), 422
   
   return app
 
@@ -1,10 +1,12 @@
 import os
+import threading
+import time
 from sqlalchemy import Column, String, Integer, create_engine
 from flask_sqlalchemy import SQLAlchemy
 import json
 
 database_name = "trivia"
-database_path = "postgres://{}/{}".format('localhost:5432', database_name)
+database_path = os.environ.get('DATABASE_URL', "postgres://{}/{}".format('localhost:5432', database_name))
 
 db = SQLAlchemy()
 
@@ -25,6 +27,8 @@ Question
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
+  # the id range and the ids of a category, see flaskr.random_question()
+  __table_args__ = (db.Index('ix_questions_category_id', 'category', 'id'),)
 
   id = Column(Integer, primary_key=True)
   question = Column(String)
@@ -41,6 +45,7 @@ class Question(db.Model):
   def insert(self):
     db.session.add(self)
     db.session.commit()
+    question_count.invalidate()
   
   def update(self):
     db.session.commit()
@@ -48,6 +53,7 @@ class Question(db.Model):
   def delete(self):
     db.session.delete(self)
     db.session.commit()
+    question_count.invalidate()
 
   def format(self):
     return {
@@ -75,4 +81,58 @@ class Category(db.Model):
     return {
       'id': self.id,
       'type': self.type
-    }
\ No newline at end of file
+    }
+
+'''
+CachedValue
+    the result of `load` kept for `ttl` seconds, or until invalidate().
+    A load that was running when invalidate() was called is not kept.
+'''
+class CachedValue:
+
+  def __init__(self, load, ttl):
+    self.load = load
+    self.ttl = ttl
+    self.lock = threading.Lock()
+    self.generation = 0
+    self.expires = 0
+    self.value = None
+
+  def get(self):
+    with self.lock:
+      if time.monotonic() < self.expires:
+        return self.value
+      generation = self.generation
+    value = self.load()
+    with self.lock:
+      if generation == self.generation:
+        self.value = value
+        self.expires = time.monotonic() + self.ttl
+    return value
+
+  def invalidate(self):
+    with self.lock:
+      self.generation += 1
+      self.expires = 0
+
+'''
+question_count, category_types
+    cached reads, so that listing questions neither counts the whole table
+    nor reloads the categories on every page. The count is invalidated by
+    Question.insert() and delete(); CACHE_TTL bounds how stale either gets
+    when another process writes.
+'''
+CACHE_TTL = 60
+
+def load_question_count():
+  return db.session.query(db.func.count(Question.id)).scalar()
+
+def load_categories():
+  return {str(category.id): category.type for category in Category.query.order_by(Category.id)}
+
+question_count = CachedValue(load_question_count, CACHE_TTL)
+category_types = CachedValue(load_categories, CACHE_TTL)
+
+def clear_caches():
+  question_count.invalidate()
+  category_types.invalidate()
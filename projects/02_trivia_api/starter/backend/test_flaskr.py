@@ -1,10 +1,11 @@
 import os
 import unittest
 import json
+from unittest import mock
 from flask_sqlalchemy import SQLAlchemy
 
-from flaskr import create_app
-from models import setup_db, Question, Category
+from flaskr import create_app, QUESTIONS_PER_PAGE
+from models import setup_db, clear_caches, Question, Category
 
 
 class TriviaTestCase(unittest.TestCase):
@@ -24,6 +25,8 @@ class TriviaTestCase(unittest.TestCase):
             self.db.init_app(self.app)
             # create all tables
             self.db.create_all()
+        # the cached count and categories are of the previous database
+        clear_caches()
     
     def tearDown(self):
         """Executed after reach test"""
@@ -34,6 +37,130 @@ class TriviaTestCase(unittest.TestCase):
     Write at least one test for each test for successful operation and for expected errors.
     """
 
+    def test_get_categories(self):
+        res = self.client().get('/categories')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertTrue(len(data['categories']))
+
+    def test_get_paginated_questions(self):
+        res = self.client().get('/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertTrue(data['total_questions'])
+        self.assertEqual(len(data['questions']), min(data['total_questions'], QUESTIONS_PER_PAGE))
+        self.assertTrue(len(data['categories']))
+        ids = [question['id'] for question in data['questions']]
+        self.assertEqual(ids, sorted(ids))
+
+    def test_404_requesting_beyond_valid_page(self):
+        res = self.client().get('/questions?page=1000')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['message'], 'resource not found')
+
+    def test_400_requesting_invalid_page(self):
+        for page in ('0', 'two'):
+            res = self.client().get('/questions?page=' + page)
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(data['success'], False)
+
+    def test_keyset_pages_match_numbered_pages(self):
+        first = json.loads(self.client().get('/questions').data)
+        if first['next_cursor'] is None:
+            self.skipTest('a single page of questions')
+        by_cursor = json.loads(self.client().get('/questions?after={}'.format(first['next_cursor'])).data)
+        by_number = json.loads(self.client().get('/questions?page=2').data)
+
+        self.assertEqual(by_cursor['questions'], by_number['questions'])
+        self.assertEqual(by_cursor['next_cursor'], by_number['next_cursor'])
+
+    def test_total_questions_follows_insert_and_delete(self):
+        total = json.loads(self.client().get('/questions').data)['total_questions']
+
+        with self.app.app_context():
+            question = Question(question='Which planet is closest to the sun?', answer='Mercury',
+                                category='1', difficulty=1)
+            question.insert()
+            question_id = question.id
+        inserted = json.loads(self.client().get('/questions').data)['total_questions']
+
+        with self.app.app_context():
+            Question.query.get(question_id).delete()
+        deleted = json.loads(self.client().get('/questions').data)['total_questions']
+
+        self.assertEqual(inserted, total + 1)
+        self.assertEqual(deleted, total)
+
+    def test_play_quiz_in_category(self):
+        res = self.client().post('/quizzes', json={'previous_questions': [], 'quiz_category': {'type': 'Science', 'id': 1}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(str(data['question']['category']), '1')
+
+    def test_play_quiz_skips_previous_questions(self):
+        with self.app.app_context():
+            ids = [question.id for question in Question.query.filter(Question.category == '1')]
+        last = ids.pop()
+        res = self.client().post('/quizzes', json={'previous_questions': ids, 'quiz_category': {'type': 'Science', 'id': 1}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['question']['id'], last)
+
+        res = self.client().post('/quizzes', json={'previous_questions': ids + [last], 'quiz_category': {'type': 'Science', 'id': 1}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['question'], None)
+
+    def test_play_quiz_when_the_probes_run_out(self):
+        # Without probes every draw takes the path of a category nearly
+        # played out: counting what is left and reading it at an offset.
+        with self.app.app_context():
+            ids = [question.id for question in Question.query.filter(Question.category == '1')]
+        last = ids.pop(0)
+        body = {'previous_questions': ids, 'quiz_category': {'type': 'Science', 'id': 1}}
+
+        with mock.patch('flaskr.QUIZ_MAX_PROBE_SIZE', 0):
+            data = json.loads(self.client().post('/quizzes', json=body).data)
+            self.assertEqual(data['question']['id'], last)
+
+            body['previous_questions'] = ids + [last]
+            data = json.loads(self.client().post('/quizzes', json=body).data)
+            self.assertEqual(data['question'], None)
+
+    def test_play_quiz_in_all_categories(self):
+        res = self.client().post('/quizzes', json={'previous_questions': [], 'quiz_category': {'type': 'click', 'id': 0}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['question'])
+
+    def test_404_quiz_in_unknown_category(self):
+        res = self.client().post('/quizzes', json={'previous_questions': [], 'quiz_category': {'type': 'Cooking', 'id': 1000}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['success'], False)
+
+    def test_422_quiz_with_invalid_previous_questions(self):
+        res = self.client().post('/quizzes', json={'previous_questions': ['first'], 'quiz_category': {'type': 'click', 'id': 0}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+
 
 # Make the tests conveniently executable
 if __name__ == "__main__":